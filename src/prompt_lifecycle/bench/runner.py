@@ -0,0 +1,240 @@
+"""
+In-repo benchmark runner: times Runtime startup, routing, rendering and full runs
+against a synthetic config (see synthetic.py), writes JSON results, and compares
+them with a stored baseline:
+
+    python -m prompt_lifecycle.cli.main bench --scale medium --output bench_baseline.json
+    python -m prompt_lifecycle.cli.main bench --scale medium --baseline bench_baseline.json
+
+Baselines are machine-specific; record one per machine / CI runner.
+"""
+import json
+import os
+import platform
+import statistics
+import time
+from itertools import cycle
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from prompt_lifecycle.bench.synthetic import SECTION, SyntheticConfig
+from prompt_lifecycle.engine.config_bundle import compile_bundle, default_bundle_path
+from prompt_lifecycle.engine.prompt_loader import TEMPLATE_CACHE
+from prompt_lifecycle.engine.routing import Router
+from prompt_lifecycle.engine.runtime import Runtime
+
+SAMPLE_INPUTS = {"filing_excerpt": "The company operates 12 plants across 4 countries. Revenue grew 8% YoY. " * 20}
+
+
+class Case(NamedTuple):
+    name: str
+    description: str
+    setup: Callable[[SyntheticConfig], Callable[[], Any]]  # returns the zero-arg op to time
+
+
+def _warm_runtime(cfg: SyntheticConfig) -> Runtime:
+    # Case setup only: the bundle (compiled once in run_suite) keeps large-scale setup fast
+    return Runtime(cfg.config_path)
+
+
+def _runtime_init_yaml(cfg: SyntheticConfig) -> Callable[[], Any]:
+    return lambda: Runtime(cfg.config_path, use_bundle=False)
+
+
+def _runtime_init_bundle(cfg: SyntheticConfig) -> Callable[[], Any]:
+    return lambda: Runtime(cfg.config_path)
+
+
+def _router_init(cfg: SyntheticConfig) -> Callable[[], Any]:
+    config = _warm_runtime(cfg).config
+    return lambda: Router(config)
+
+
+def _overrides(cfg: SyntheticConfig) -> Callable[[], Dict[str, Any]]:
+    """Cycles through every (industry, sub_industry) x prompt_version combination."""
+    combos = cycle(
+        {"industry": industry, "sub_industry": sub, "prompt_version": cfg.versions[i % len(cfg.versions)]}
+        for i, (industry, sub) in enumerate(cfg.routes)
+    )
+    return combos.__next__
+
+
+def _route_warm(cfg: SyntheticConfig) -> Callable[[], Any]:
+    router = _warm_runtime(cfg).router
+    overrides = {"industry": cfg.routes[0][0], "sub_industry": cfg.routes[0][1]}
+    return lambda: router.route(SECTION, overrides=overrides)
+
+
+def _route_cold(cfg: SyntheticConfig) -> Callable[[], Any]:
+    # route_cache_size=1 + cycling keys: every call misses the memoized segment table
+    router = Router(_warm_runtime(cfg).config, route_cache_size=1)
+    next_overrides = _overrides(cfg)
+    return lambda: router.route(SECTION, overrides=next_overrides())
+
+
+def _load_warm(cfg: SyntheticConfig) -> Callable[[], Any]:
+    runtime = _warm_runtime(cfg)
+    spec = runtime.router.route(SECTION, inputs=SAMPLE_INPUTS)
+    return lambda: runtime.prompt_loader.load(spec)
+
+
+def _load_cold(cfg: SyntheticConfig) -> Callable[[], Any]:
+    runtime = _warm_runtime(cfg)
+    spec = runtime.router.route(SECTION, inputs=SAMPLE_INPUTS)
+
+    def op() -> Any:
+        TEMPLATE_CACHE.clear()  # every template is stat'ed, read and compiled again
+        return runtime.prompt_loader.load(spec)
+
+    return op
+
+
+def _runtime_run(cfg: SyntheticConfig) -> Callable[[], Any]:
+    runtime = _warm_runtime(cfg)
+    return lambda: runtime.run(SECTION)
+
+
+def _runtime_generate_mixed(cfg: SyntheticConfig) -> Callable[[], Any]:
+    runtime = _warm_runtime(cfg)
+    next_overrides = _overrides(cfg)
+    return lambda: runtime.generate(SECTION, overrides=next_overrides(), inputs=SAMPLE_INPUTS)
+
+
+CASES: Tuple[Case, ...] = (
+    Case("runtime_init_yaml", "Runtime.__init__ parsing every YAML file", _runtime_init_yaml),
+    Case("runtime_init_bundle", "Runtime.__init__ from a fresh compiled bundle", _runtime_init_bundle),
+    Case("router_init", "Router.__init__ (pack + resolution table compile)", _router_init),
+    Case("route_warm", "Router.route, memoized route", _route_warm),
+    Case("route_cold", "Router.route, cycling every industry/sub/version (no memo)", _route_cold),
+    Case("load_warm", "PromptLoader.load with inputs, templates cached", _load_warm),
+    Case("load_cold", "PromptLoader.load with inputs, template cache cleared", _load_cold),
+    Case("runtime_run", "Runtime.run end to end (echo LLM)", _runtime_run),
+    Case("runtime_generate_mixed", "Runtime.generate cycling overrides, with inputs", _runtime_generate_mixed),
+)
+
+
+def measure(op: Callable[[], Any], min_time_s: float = 0.2, repeat: int = 5) -> Dict[str, Any]:
+    """
+    timeit-style: calibrate a loop count so one round takes >= min_time_s / repeat,
+    then time `repeat` rounds. Per-op figures are reported across rounds, so one
+    noisy round shows up in max_ns instead of skewing median_ns.
+    """
+    op()  # warm-up (also surfaces errors before timing)
+    round_target_ns = min_time_s * 1e9 / repeat
+    number = 1
+    while True:
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            op()
+        elapsed = time.perf_counter_ns() - started
+        if elapsed >= round_target_ns or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * round_target_ns / max(elapsed, 1)))
+
+    per_op: List[float] = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            op()
+        per_op.append((time.perf_counter_ns() - started) / number)
+
+    median_ns = statistics.median(per_op)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_ns": round(min(per_op), 1),
+        "median_ns": round(median_ns, 1),
+        "max_ns": round(max(per_op), 1),
+        "ops_per_s": round(1e9 / median_ns, 1) if median_ns else None,
+    }
+
+
+def run_suite(
+    cfg: SyntheticConfig,
+    scale: Dict[str, Any],
+    only: Optional[List[str]] = None,
+    min_time_s: float = 0.2,
+    repeat: int = 5,
+    log: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    compile_bundle(cfg.config_path, default_bundle_path(cfg.config_path))
+    results: Dict[str, Any] = {}
+    for case in CASES:
+        if only and not any(pattern in case.name for pattern in only):
+            continue
+        stats = measure(case.setup(cfg), min_time_s=min_time_s, repeat=repeat)
+        stats["description"] = case.description
+        results[case.name] = stats
+        if log is not None:
+            log(f"{case.name:<24} {_format_ns(stats['median_ns']):>10}/op  ({stats['ops_per_s']} ops/s)")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": scale,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Compares median_ns per case. A case regresses when it is more than `threshold`
+    (fractional) slower than the baseline. Returns (rows, any_regression).
+    """
+    rows = []
+    regressed = False
+    base_results = baseline.get("results", {})
+    for name, stats in current.get("results", {}).items():
+        base = base_results.get(name)
+        if base is None:
+            rows.append({"name": name, "status": "new", "median_ns": stats["median_ns"]})
+            continue
+        ratio = stats["median_ns"] / base["median_ns"] if base["median_ns"] else float("inf")
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressed = True
+        elif ratio < 1 - threshold:
+            status = "faster"
+        rows.append(
+            {
+                "name": name,
+                "status": status,
+                "median_ns": stats["median_ns"],
+                "baseline_ns": base["median_ns"],
+                "ratio": round(ratio, 3),
+            }
+        )
+    if current.get("meta", {}).get("scale") != baseline.get("meta", {}).get("scale"):
+        rows.append({"name": "(meta)", "status": "warning: baseline was recorded at a different scale"})
+    return rows, regressed
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'case':<24} {'baseline':>10} {'current':>10} {'ratio':>7}  status"]
+    for row in rows:
+        if "median_ns" not in row:
+            lines.append(f"{row['name']:<24} {row['status']}")
+            continue
+        baseline = _format_ns(row["baseline_ns"]) if "baseline_ns" in row else "-"
+        ratio = f"{row['ratio']:.2f}x" if "ratio" in row else "-"
+        lines.append(f"{row['name']:<24} {baseline:>10} {_format_ns(row['median_ns']):>10} {ratio:>7}  {row['status']}")
+    return "\n".join(lines)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _format_ns(ns: float) -> str:
+    if ns >= 1e9:
+        return f"{ns / 1e9:.2f}s"
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f}ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f}us"
+    return f"{ns:.0f}ns"
@@ -0,0 +1,144 @@
+import os
+import random
+import shutil
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Real templates are reused so rendering cost stays representative
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts")
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config")
+
+SECTION = "company_overview"
+SECTION_TEMPLATE = os.path.join("company_overview", "prompt_v2025_02_15.md")
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"packs": 100, "versions": 10, "kpis": 200},
+    "medium": {"packs": 1000, "versions": 100, "kpis": 1000},
+    "large": {"packs": 10000, "versions": 1000, "kpis": 5000},
+}
+
+
+class SyntheticConfig(NamedTuple):
+    config_path: str
+    routes: List[Tuple[str, Optional[str]]]  # (industry alias, sub-industry alias) pairs that resolve
+    versions: List[str]
+
+
+def _write_yaml(path: str, doc: Dict[str, Any]) -> None:
+    import yaml
+
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(doc, f, sort_keys=False, allow_unicode=True)
+
+
+def generate_config(
+    out_dir: str,
+    packs: int = 1000,
+    versions: int = 100,
+    kpis: int = 1000,
+    kpis_per_pack: int = 8,
+    subs_per_industry: int = 50,
+    seed: int = 0,
+) -> SyntheticConfig:
+    """
+    Writes a self-contained run-config tree shaped like the real one, scaled up:
+
+      <out_dir>/run_config.yaml
+      <out_dir>/industry_map.yaml   packs / subs_per_industry industries, each with a
+                                    core pack + sub-industry packs, numbered aliases
+      <out_dir>/kpi_packs.yaml      `packs` packs of kpis_per_pack KPI ids
+      <out_dir>/kpi_registry.yaml   `kpis` KPI definitions
+      <out_dir>/models.yaml         copied from the real config
+      <out_dir>/prompts/...         real base / KPI pack / inputs templates, plus
+                                    `versions` section prompt versions
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    prompts_dir = os.path.join(out_dir, "prompts")
+    os.makedirs(os.path.join(prompts_dir, SECTION), exist_ok=True)
+
+    kpi_ids = [f"kpi_{i:05d}" for i in range(kpis)]
+    _write_yaml(
+        os.path.join(out_dir, "kpi_registry.yaml"),
+        {
+            "version": "1.0",
+            "kpis": [
+                {"id": kpi_id, "label": f"KPI {i}", "unit": "USD", "definition": f"Synthetic KPI number {i}."}
+                for i, kpi_id in enumerate(kpi_ids)
+            ],
+        },
+    )
+
+    industry_map: Dict[str, Any] = {}
+    industry_aliases: Dict[str, str] = {}
+    kpi_packs: Dict[str, Any] = {}
+    routes: List[Tuple[str, Optional[str]]] = []
+
+    n_industries = max(1, -(-packs // subs_per_industry))
+    for i in range(n_industries):
+        industry = f"INDUSTRY {i:04d}"
+        industry_aliases[f"{i + 1} {industry}"] = industry
+        core = f"IND{i:04d}__core"
+        kpi_packs[core] = {"label": f"{industry} - Core", "kpi_ids": rng.sample(kpi_ids, min(kpis_per_pack, kpis))}
+
+        sub_industries: Dict[str, str] = {}
+        sub_aliases: Dict[str, str] = {}
+        for j in range(min(subs_per_industry - 1, packs - len(kpi_packs))):
+            sub = f"Sub Industry {j:03d}"
+            pack_id = f"IND{i:04d}__Sub_{j:03d}"
+            kpi_packs[pack_id] = {"label": f"{industry} - {sub}", "kpi_ids": rng.sample(kpi_ids, min(kpis_per_pack, kpis))}
+            sub_industries[sub] = pack_id
+            sub_aliases[f"{i + 1}.{j + 1} {sub}"] = sub
+            routes.append((industry, sub))
+
+        industry_map[industry] = {
+            "default_kpi_pack": core,
+            "sub_industries": sub_industries,
+            "sub_industry_aliases": sub_aliases,
+        }
+        routes.append((industry, None))
+        if len(kpi_packs) >= packs:
+            break
+
+    _write_yaml(
+        os.path.join(out_dir, "industry_map.yaml"),
+        {"version": "1.0", "industry_aliases": industry_aliases, "industry_map": industry_map},
+    )
+    _write_yaml(os.path.join(out_dir, "kpi_packs.yaml"), {"version": "1.0", "kpi_packs": kpi_packs})
+    shutil.copyfile(os.path.join(CONFIG_DIR, "models.yaml"), os.path.join(out_dir, "models.yaml"))
+
+    for name in ("base_system.md", "kpi_pack.md", "inputs.md"):
+        shutil.copyfile(os.path.join(PROMPTS_DIR, name), os.path.join(prompts_dir, name))
+    with open(os.path.join(PROMPTS_DIR, SECTION_TEMPLATE), "r", encoding="utf-8") as f:
+        section_text = f.read()
+
+    version_keys = [f"v{n:05d}" for n in range(versions)]
+    prompt_versions: Dict[str, Any] = {}
+    for key in version_keys:
+        rel_path = os.path.join(SECTION, f"prompt_{key}.md")
+        with open(os.path.join(prompts_dir, rel_path), "w", encoding="utf-8") as f:
+            f.write(section_text.replace("v2025_02_15", key))
+        prompt_versions[key] = {"template_path": rel_path}
+
+    first_industry, first_sub = routes[0]
+    run_config = {
+        "prompts": {"base_dir": prompts_dir},
+        "base_prompt": {"template_path": "base_system.md"},
+        "industry_map_file": "industry_map.yaml",
+        "kpi_packs_file": "kpi_packs.yaml",
+        "kpi_registry_file": "kpi_registry.yaml",
+        "models_file": "models.yaml",
+        "kpi_pack_prompt": {"template_path": "kpi_pack.md"},
+        "inputs_prompt": {"template_path": "inputs.md"},
+        "llm": {"transport": "echo", "model": "fast"},
+        "sections": {
+            SECTION: {
+                "industry": first_industry,
+                "sub_industry": first_sub,
+                "prompt_version": version_keys[-1],
+                "prompt_versions": prompt_versions,
+            }
+        },
+    }
+    config_path = os.path.join(out_dir, "run_config.yaml")
+    _write_yaml(config_path, run_config)
+    return SyntheticConfig(config_path, routes, version_keys)
@@ -1,5 +1,9 @@
 import argparse
+import cProfile
 import json
+import pstats
+import sys
+from typing import List, Optional
 
 from prompt_lifecycle.engine.runtime import Runtime
 
@@ -15,7 +19,7 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--section",
         required=True,
-        help="Section key under config.sections (e.g., company_overview)",
+        help="Section key under config.sections (e.g., company_overview), or 'all' for every section as a graph",
     )
 
     # Optional runtime overrides (lets you experiment without editing YAML)
@@ -47,10 +51,56 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Print only the assembly manifest (JSON).",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the LLM output through the section's guardrails (aborts early on malformed output).",
+    )
+    parser.add_argument(
+        "--filing",
+        action="append",
+        help="Long input document (repeatable): map-reduce over overlapping chunks, then generate the section",
+    )
+    add_cache_argument(parser)
+    add_profile_arguments(parser)
 
     return parser
 
 
+def add_cache_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache",
+        choices=["readwrite", "read", "write", "bypass"],
+        help="LLM response cache mode (default: config response_cache.mode)",
+    )
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-stage latency breakdown (route / load.read / load.render / llm) to stderr",
+    )
+    parser.add_argument(
+        "--profile-out",
+        dest="profile_out",
+        help="Also write a cProfile/pstats dump to this path (implies --profile)",
+    )
+
+
+def report_profile(runtime: Runtime, profile_out: Optional[str], profiles: List[cProfile.Profile]) -> None:
+    print("===== STAGE PROFILE =====", file=sys.stderr)
+    print(runtime.stage_timers.format_table(), file=sys.stderr)
+    llm_metrics = runtime.llm.metrics()
+    if llm_metrics:
+        print("===== LLM SCHEDULER (per model) =====", file=sys.stderr)
+        for model, snapshot in llm_metrics.items():
+            print(f"{model}: {json.dumps(snapshot)}", file=sys.stderr)
+    if profile_out and profiles:
+        pstats.Stats(*profiles).dump_stats(profile_out)
+        print(f"cProfile stats written to {profile_out} (python -m pstats {profile_out})", file=sys.stderr)
+
+
 def collect_overrides(args: argparse.Namespace) -> dict:
     return {
         "section": args.section,
@@ -61,15 +111,284 @@ def collect_overrides(args: argparse.Namespace) -> dict:
     }
 
 
-def main() -> None:
-    args = build_parser().parse_args()
+def build_batch_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="generate-batch",
+        description="Generate one section for many issuers (JSONL in, JSONL out) with one warm Runtime",
+    )
+    parser.add_argument("--config", required=True, help="Path to the run-config YAML")
+    parser.add_argument("--section", required=True, help="Default section key (a record's 'section' wins)")
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="JSONL of issuer records: id, industry, sub_industry, kpi_pack, prompt_version, inputs",
+    )
+    parser.add_argument("--output", default="-", help="Output JSONL path ('-' for stdout)")
+    parser.add_argument("--workers", type=int, default=8, help="Worker threads (default: 8)")
+    parser.add_argument(
+        "--max-in-flight",
+        dest="max_in_flight",
+        type=int,
+        help="Max records queued at once (default: 4 x workers)",
+    )
+    parser.add_argument(
+        "--order",
+        choices=["input", "completion"],
+        default="input",
+        help="Write results in input order or as they complete",
+    )
+    parser.add_argument(
+        "--include-prompt",
+        dest="include_prompt",
+        action="store_true",
+        help="Include the assembled prompt text in every output line",
+    )
+    parser.add_argument(
+        "--group-by-prefix",
+        dest="group_by_prefix",
+        action="store_true",
+        help="Dispatch records grouped by static prompt prefix (improves provider prompt-cache hits)",
+    )
+    parser.add_argument(
+        "--group-window",
+        dest="group_window",
+        type=int,
+        default=1024,
+        help="Records read per grouping window (default: 1024)",
+    )
+    add_cache_argument(parser)
+    add_profile_arguments(parser)
+    return parser
+
 
-    runtime = Runtime(config_path=args.config, overrides=collect_overrides(args))
+def batch_main(argv: List[str]) -> None:
+    from prompt_lifecycle.engine.batch import BatchRunner, read_records
+
+    args = build_batch_parser().parse_args(argv)
+
+    runtime = Runtime(config_path=args.config, cache_mode=args.cache)
+    runner = BatchRunner(
+        runtime,
+        section=args.section,
+        workers=args.workers,
+        order=args.order,
+        max_in_flight=args.max_in_flight,
+        include_prompt=args.include_prompt,
+        group_by_prefix=args.group_by_prefix,
+        group_window=args.group_window,
+        profile=bool(args.profile_out),
+    )
+
+    records = read_records(args.input)
+    try:
+        if args.output == "-":
+            stats = runner.run(records, sys.stdout)
+        else:
+            with open(args.output, "w", encoding="utf-8") as out:
+                stats = runner.run(records, out)
+    finally:
+        runtime.close()
+    if runtime.events.enabled:
+        stats["telemetry"] = runtime.events.stats()
+    print(json.dumps(stats), file=sys.stderr)
+    if args.profile or args.profile_out:
+        report_profile(runtime, args.profile_out, runner.profiles)
+
+
+def build_compile_config_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="compile-config",
+        description="Compile a run config, its referenced YAML files and prompt templates into one binary bundle",
+    )
+    parser.add_argument("--config", required=True, help="Path to the run-config YAML")
+    parser.add_argument("--output", help="Bundle path (default: <config without .yaml>.bundle, picked up by Runtime)")
+    return parser
+
+
+def compile_config_main(argv: List[str]) -> None:
+    from prompt_lifecycle.engine.config_bundle import compile_bundle, default_bundle_path
+
+    args = build_compile_config_parser().parse_args(argv)
+    bundle = compile_bundle(args.config, args.output)
+    print(
+        json.dumps(
+            {
+                "bundle": args.output or default_bundle_path(args.config),
+                "hash": bundle.hash,
+                "sources": [s["path"] for s in bundle.sources],
+                "templates": sorted(bundle.templates),
+            },
+            indent=2,
+        )
+    )
+
+
+def build_bench_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="bench",
+        description="Benchmark Runtime startup, routing and rendering on a synthetic config of a given scale",
+    )
+    parser.add_argument("--scale", choices=["small", "medium", "large"], default="small", help="Preset size (default: small)")
+    parser.add_argument("--packs", type=int, help="KPI packs (overrides the preset; large = 10000)")
+    parser.add_argument("--versions", type=int, help="Section prompt versions (overrides the preset; large = 1000)")
+    parser.add_argument("--kpis", type=int, help="KPI registry size (overrides the preset)")
+    parser.add_argument("--only", action="append", help="Run only cases whose name contains this (repeatable)")
+    parser.add_argument("--min-time", dest="min_time", type=float, default=0.2, help="Seconds of timing per case (default: 0.2)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per case (default: 5)")
+    parser.add_argument("--output", help="Write results JSON here (use it later as a --baseline)")
+    parser.add_argument("--baseline", help="Results JSON to compare against; exits 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs baseline (default: 0.2 = 20%%)")
+    parser.add_argument("--workdir", help="Where to generate the synthetic config (default: a temp dir, removed afterwards)")
+    return parser
+
+
+def bench_main(argv: List[str]) -> None:
+    import shutil
+    import tempfile
+
+    from prompt_lifecycle.bench.runner import compare, format_comparison, load_results, run_suite
+    from prompt_lifecycle.bench.synthetic import SCALES, generate_config
+
+    args = build_bench_parser().parse_args(argv)
+    scale = dict(SCALES[args.scale])
+    for key in ("packs", "versions", "kpis"):
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="prompt_lifecycle_bench_")
+    try:
+        cfg = generate_config(workdir, **scale)
+        log = lambda line: print(line, file=sys.stderr)  # noqa: E731
+        log(f"synthetic config: {scale} -> {cfg.config_path}")
+        results = run_suite(cfg, scale, only=args.only, min_time_s=args.min_time, repeat=args.repeat, log=log)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        rows, regressed = compare(results, load_results(args.baseline), threshold=args.threshold)
+        print(format_comparison(rows), file=sys.stderr)
+        if regressed:
+            sys.exit(1)
+
+
+def build_serve_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="serve",
+        description="Serve /generate, /prompt and /manifest from one warm Runtime, reloading config and prompts on change",
+    )
+    parser.add_argument("--config", required=True, help="Path to the run-config YAML")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument(
+        "--watch-interval",
+        dest="watch_interval",
+        type=float,
+        default=1.0,
+        help="Seconds between config/template change checks (0 = no hot reload; POST /reload still works)",
+    )
+    parser.add_argument(
+        "--max-body-bytes",
+        dest="max_body_bytes",
+        type=int,
+        default=8 * 1024 * 1024,
+        help="Largest accepted request body (default: 8 MiB; larger requests get 413)",
+    )
+    add_cache_argument(parser)
+    return parser
+
+
+def serve_main(argv: List[str]) -> None:
+    import asyncio
+
+    from prompt_lifecycle.engine.server import GenerationServer
+
+    args = build_serve_parser().parse_args(argv)
+    runtime = Runtime(config_path=args.config, cache_mode=args.cache, pin_templates=True)
+
+    async def serve() -> None:
+        server = await GenerationServer(
+            runtime,
+            host=args.host,
+            port=args.port,
+            unix_path=args.unix,
+            watch_interval_s=args.watch_interval,
+            max_body_bytes=args.max_body_bytes,
+        ).start()
+        print(f"serving {args.config} on {server.address}", file=sys.stderr, flush=True)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runtime.close()
+
+
+def eval_main(argv: List[str]) -> None:
+    from prompt_lifecycle.eval.run_tests import main as run_eval
+
+    run_eval(argv)
+
+
+def judge_main(argv: List[str]) -> None:
+    from prompt_lifecycle.eval.llm_judge import main as run_judge
+
+    run_judge(argv)
+
+
+def experiment_main(argv: List[str]) -> None:
+    from prompt_lifecycle.eval.experiment import main as run_experiment
+
+    run_experiment(argv)
+
+
+ALL_SECTIONS = "all"
+
+# Subcommands are dispatched on the first argv token; anything else is the classic
+# single-section generate (kept flag-compatible with existing scripts).
+SUBCOMMANDS = {
+    "generate-batch": batch_main,
+    "compile-config": compile_config_main,
+    "bench": bench_main,
+    "eval": eval_main,
+    "judge": judge_main,
+    "experiment": experiment_main,
+    "serve": serve_main,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in SUBCOMMANDS:
+        SUBCOMMANDS[argv[0]](argv[1:])
+        return
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.section == ALL_SECTIONS:
+        run_all_sections(parser, args)
+        return
+
+    runtime = Runtime(config_path=args.config, overrides=collect_overrides(args), cache_mode=args.cache)
 
     # Lightweight modes for debugging / inspection
     if args.prompt_only or args.manifest_only:
-        prompt_spec = runtime.router.route(args.section)
-        prompt_text, manifest = runtime.prompt_loader.load(prompt_spec)
+        try:
+            prompt_text, manifest = runtime.render(args.section)
+        finally:
+            runtime.close()
 
         if args.manifest_only:
             print(json.dumps(manifest, indent=2))
@@ -77,8 +396,65 @@ def main() -> None:
             print(prompt_text)
         return
 
-    # Default: full run (includes stub LLM output)
-    print(runtime.run(section=args.section))
+    profiler = cProfile.Profile() if args.profile_out else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        if args.filing:
+            result = runtime.generate_long(args.section, args.filing)
+            print("===== PROMPT MANIFEST =====")
+            print(json.dumps(result["manifest"], indent=2))
+            print("\n===== LLM OUTPUT (stub today) =====")
+            print(result["output"])
+        elif args.stream:
+            run_streaming(runtime, args.section)
+        else:
+            # Default: full run (includes stub LLM output)
+            print(runtime.run(section=args.section))
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        runtime.close()
+    if args.profile or args.profile_out:
+        report_profile(runtime, args.profile_out, [profiler] if profiler is not None else [])
+
+
+def run_all_sections(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.prompt_version or args.stream or args.prompt_only or args.manifest_only or args.filing:
+        parser.error("--section all does not support --prompt-version, --stream, --prompt-only, --manifest-only or --filing")
+
+    # Overrides go per call, so they apply to every section (not baked into one)
+    runtime = Runtime(config_path=args.config, cache_mode=args.cache)
+    overrides = {k: v for k, v in collect_overrides(args).items() if k != "section" and v is not None}
+
+    profiler = cProfile.Profile() if args.profile_out else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        print(runtime.run_all(overrides=overrides or None))
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        runtime.close()
+    if args.profile or args.profile_out:
+        report_profile(runtime, args.profile_out, [profiler] if profiler is not None else [])
+
+
+def run_streaming(runtime: Runtime, section: str) -> None:
+    current = {"attempt": 0}
+
+    def on_chunk(attempt: int, chunk: str) -> None:
+        if attempt != current["attempt"]:
+            if current["attempt"]:
+                print("\n----- guardrail abort, retrying -----", flush=True)
+            print(f"===== LLM OUTPUT (streamed, attempt {attempt}) =====", flush=True)
+            current["attempt"] = attempt
+        sys.stdout.write(chunk)
+        sys.stdout.flush()
+
+    result = runtime.generate_stream(section, on_chunk=on_chunk)
+    print("\n\n===== PROMPT MANIFEST =====")
+    print(json.dumps(result["manifest"], indent=2))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+import cProfile
+import json
+import pstats
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple
+
+from prompt_lifecycle.engine.guardrails import GuardrailViolation
+from prompt_lifecycle.engine.llm_client import LLMTimeoutError, ProviderError
+from prompt_lifecycle.engine.routing import OVERRIDE_KEYS
+from prompt_lifecycle.engine.runtime import Runtime
+
+
+def read_records(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Streams (line_index, record) from a JSONL file of issuer records:
+
+      {"id": "...", "industry": "...", "sub_industry": "...", "kpi_pack": "...",
+       "prompt_version": "...", "section": "...", "inputs": {...}}
+
+    Every key is optional; blank lines are skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path}:{line_no}: invalid JSON ({exc.msg})") from None
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{line_no}: each line must be a JSON object")
+            yield line_no - 1, record
+
+
+class BatchRunner:
+    """
+    Runs many issuer records through one warm Runtime.
+
+    - Records are routed with per-call overrides (shared config is never mutated).
+    - Work fans out over a ThreadPoolExecutor; at most max_in_flight records are
+      queued at once, so a 20k-line input never materializes in memory.
+    - Results are written as JSONL, either in input order or completion order.
+    - A failing record (routing, provider, timeout or guardrail error) produces an
+      {"error": ...} line instead of stopping the batch.
+    - group_by_prefix: records are read in windows of group_window and dispatched
+      grouped by their static prompt prefix (Router.prefix_signature), so requests
+      sharing a prefix reach the provider back to back and hit its prompt cache.
+      max_in_flight still applies; in input order a result is written as soon as
+      every earlier record of its window has been.
+    - profile: every worker thread runs records under its own cProfile.Profile;
+      dump_profile() merges them into one pstats file.
+    """
+
+    ORDERS = ("input", "completion")
+
+    def __init__(
+        self,
+        runtime: Runtime,
+        section: str,
+        workers: int = 8,
+        order: str = "input",
+        max_in_flight: Optional[int] = None,
+        include_prompt: bool = False,
+        group_by_prefix: bool = False,
+        group_window: int = 1024,
+        profile: bool = False,
+    ):
+        if order not in self.ORDERS:
+            raise ValueError(f"order must be one of {', '.join(self.ORDERS)}, got '{order}'")
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+
+        self.runtime = runtime
+        self.section = section
+        self.workers = workers
+        self.order = order
+        self.max_in_flight = max_in_flight or workers * 4
+        self.include_prompt = include_prompt
+        self.group_by_prefix = group_by_prefix
+        self.group_window = group_window
+        self.profile = profile
+        self.profiles: List[cProfile.Profile] = []
+        self._profiles_lock = threading.Lock()
+        self._local = threading.local()
+        self._work = self._process_profiled if profile else self.process
+
+    def process(self, index: int, record: Dict[str, Any]) -> Dict[str, Any]:
+        section = record.get("section") or self.section
+        overrides = {k: record.get(k) for k in OVERRIDE_KEYS}
+        result: Dict[str, Any] = {"index": index, "id": record.get("id"), "section": section}
+
+        try:
+            generated = self.runtime.generate(section, overrides=overrides, inputs=record.get("inputs"))
+        except (KeyError, ValueError, ProviderError, LLMTimeoutError, GuardrailViolation) as exc:
+            # Routing errors, and provider errors / timeouts left after retries: one bad
+            # record (or one bad minute at the provider) must not end the batch
+            result["error"] = str(exc)
+            return result
+
+        result["manifest"] = generated["manifest"]
+        if self.include_prompt:
+            result["prompt"] = generated["prompt"]
+        result["output"] = generated["output"]
+        return result
+
+    def _process_profiled(self, index: int, record: Dict[str, Any]) -> Dict[str, Any]:
+        profiler = getattr(self._local, "profiler", None)
+        if profiler is None:
+            profiler = self._local.profiler = cProfile.Profile()
+            with self._profiles_lock:
+                self.profiles.append(profiler)
+        profiler.enable()
+        try:
+            return self.process(index, record)
+        finally:
+            profiler.disable()
+
+    def dump_profile(self, path: str) -> None:
+        if not self.profiles:
+            raise ValueError("No profile data: run the batch with profile=True first")
+        pstats.Stats(*self.profiles).dump_stats(path)
+
+    def run(self, records: Iterable[Tuple[int, Dict[str, Any]]], out: IO[str]) -> Dict[str, Any]:
+        stats = {"records": 0, "errors": 0}
+        if self.group_by_prefix:
+            stats["prefix_groups"] = 0
+        started = time.perf_counter()
+
+        def emit(result: Dict[str, Any]) -> None:
+            stats["records"] += 1
+            if "error" in result:
+                stats["errors"] += 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as pool:
+            if self.group_by_prefix:
+                for window in self._windows(records):
+                    stats["prefix_groups"] += self._run_grouped_window(pool, window, emit)
+            elif self.order == "input":
+                self._run_input_order(pool, records, emit)
+            else:
+                self._run_completion_order(pool, records, emit)
+
+        out.flush()
+        stats["elapsed_s"] = round(time.perf_counter() - started, 3)
+        llm_metrics = self.runtime.llm.metrics()
+        if llm_metrics:
+            stats["llm"] = llm_metrics  # per model: throughput, retries, limiter / AIMD state
+        return stats
+
+    def prefix_signature(self, record: Dict[str, Any]) -> Tuple[str, ...]:
+        section = record.get("section") or self.section
+        overrides = {k: record.get(k) for k in OVERRIDE_KEYS}
+        try:
+            return self.runtime.router.prefix_signature(self.runtime.router.route(section, overrides=overrides))
+        except (KeyError, ValueError):
+            return ()  # the error surfaces (per record) in process()
+
+    def _windows(self, records: Iterable[Tuple[int, Dict[str, Any]]]) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+        window: List[Tuple[int, Dict[str, Any]]] = []
+        for item in records:
+            window.append(item)
+            if len(window) >= self.group_window:
+                yield window
+                window = []
+        if window:
+            yield window
+
+    def _run_grouped_window(self, pool: ThreadPoolExecutor, window, emit) -> int:
+        keyed = [(self.prefix_signature(record), index, record) for index, record in window]
+        keyed.sort(key=lambda item: item[0])  # stable: input order kept within a prefix group
+
+        dispatch = [(index, record) for _, index, record in keyed]
+        if self.order == "input":
+            # Dispatched in prefix order, written in input order: a result that finishes
+            # ahead of an earlier record waits in `ready` (at most one window of results)
+            expected = deque(index for index, _ in window)
+            ready: Dict[int, Dict[str, Any]] = {}
+
+            def in_order(result: Dict[str, Any]) -> None:
+                ready[result["index"]] = result
+                while expected and expected[0] in ready:
+                    emit(ready.pop(expected.popleft()))
+
+            self._run_completion_order(pool, dispatch, in_order)
+        else:
+            self._run_completion_order(pool, dispatch, emit)
+        return len({signature for signature, _, _ in keyed})
+
+    def _run_input_order(self, pool: ThreadPoolExecutor, records, emit) -> None:
+        pending: Deque[Future] = deque()
+        for index, record in records:
+            pending.append(pool.submit(self._work, index, record))
+            # Window is full: block on the oldest record so output stays in input order
+            while len(pending) >= self.max_in_flight:
+                emit(pending.popleft().result())
+        while pending:
+            emit(pending.popleft().result())
+
+    def _run_completion_order(self, pool: ThreadPoolExecutor, records, emit) -> None:
+        pending: Set[Future] = set()
+        for index, record in records:
+            pending.add(pool.submit(self._work, index, record))
+            if len(pending) >= self.max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    emit(fut.result())
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                emit(fut.result())
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import pickle
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from prompt_lifecycle.engine.prompt_loader import TEMPLATE_CACHE, CompiledTemplate, PromptLoader, TemplateCache
+
+# File layout: MAGIC | format version (1 byte) | sha256(payload) (32 bytes) | payload (pickle)
+BUNDLE_MAGIC = b"PLCB"
+# Bump whenever the payload layout, CompiledTemplate, or what goes into it (e.g.
+# template_paths) changes
+BUNDLE_FORMAT_VERSION = 2
+
+_HEADER_LEN = len(BUNDLE_MAGIC) + 1 + 32
+
+# Run-config keys that point at other YAML files hydrated by Runtime
+FILE_REFERENCE_KEYS = ("industry_map_file", "kpi_packs_file", "kpi_registry_file", "models_file")
+
+
+class ConfigBundle(NamedTuple):
+    config: Dict[str, Any]  # fully hydrated run config
+    sources: List[Dict[str, Any]]  # [{"path", "mtime_ns", "size"}] of every YAML file and template that went in
+    templates: Dict[str, CompiledTemplate]  # resolved template path -> compiled template
+    hash: str  # sha256 of the payload
+
+
+def default_bundle_path(config_path: str) -> str:
+    return os.path.splitext(config_path)[0] + ".bundle"
+
+
+def _source_entry(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def resolve_path(config_dir: str, maybe_path: str) -> str:
+    """Paths in the run config are relative to the run config's directory."""
+    if os.path.isabs(maybe_path):
+        return maybe_path
+    return os.path.join(config_dir, maybe_path)
+
+
+def _load_yaml(path: str) -> Dict[str, Any]:
+    import yaml  # only paid for when there is no fresh bundle
+
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_run_config(config_path: str) -> Dict[str, Any]:
+    """Parses the run config and hydrates the YAML files it references (FILE_REFERENCE_KEYS)."""
+    config = _load_yaml(config_path)
+    config_dir = os.path.dirname(os.path.abspath(config_path))
+
+    industry_map_file = config.get("industry_map_file")
+    if industry_map_file:
+        industry_map_cfg = _load_yaml(resolve_path(config_dir, industry_map_file))
+        config["industry_map_cfg"] = {
+            "industry_aliases": industry_map_cfg.get("industry_aliases", {}) or {},
+            "industry_map": industry_map_cfg.get("industry_map", {}) or {},
+        }
+
+    kpi_packs_file = config.get("kpi_packs_file")
+    if kpi_packs_file:
+        kpi_packs_cfg = _load_yaml(resolve_path(config_dir, kpi_packs_file))
+        packs = kpi_packs_cfg.get("kpi_packs", {})
+        if not isinstance(packs, dict):
+            raise ValueError("kpi_packs.yaml must contain a top-level 'kpi_packs:' mapping")
+        config["kpi_packs"] = packs
+
+    kpi_registry_file = config.get("kpi_registry_file")
+    if kpi_registry_file:
+        registry_cfg = _load_yaml(resolve_path(config_dir, kpi_registry_file))
+        kpis = registry_cfg.get("kpis", [])
+        if not isinstance(kpis, list):
+            raise ValueError("kpi_registry.yaml must contain a top-level 'kpis:' list")
+        config["kpi_registry"] = {k["id"]: k for k in kpis}
+
+    models_file = config.get("models_file")
+    if models_file:
+        models_cfg = _load_yaml(resolve_path(config_dir, models_file))
+        models = models_cfg.get("models", {})
+        if not isinstance(models, dict):
+            raise ValueError("models.yaml must contain a top-level 'models:' mapping")
+        config["models_cfg"] = {"default_model": models_cfg.get("default_model"), "models": models}
+
+    return config
+
+
+def template_paths(config: Dict[str, Any]) -> List[str]:
+    """Every template_path the run config can route to."""
+    paths: List[str] = []
+    for key in ("base_prompt", "kpi_pack_prompt", "inputs_prompt", "upstream_prompt", "evidence", "map_reduce", "judge"):
+        path = (config.get(key) or {}).get("template_path")
+        if path:
+            paths.append(path)
+    if (config.get("judge") or {}).get("candidates_template_path"):
+        paths.append(config["judge"]["candidates_template_path"])
+    for industry_cfg in (config.get("industries") or {}).values():
+        if (industry_cfg or {}).get("template_path"):
+            paths.append(industry_cfg["template_path"])
+    for section_cfg in (config.get("sections") or {}).values():
+        for version_cfg in ((section_cfg or {}).get("prompt_versions") or {}).values():
+            if (version_cfg or {}).get("template_path"):
+                paths.append(version_cfg["template_path"])
+    return sorted(set(paths))
+
+
+def compile_bundle(config_path: str, bundle_path: Optional[str] = None) -> ConfigBundle:
+    """
+    Parses the run config and every file it references, compiles every prompt
+    template, and writes the result as one content-hashed binary bundle.
+    """
+    config = load_run_config(config_path)
+    config_dir = os.path.dirname(os.path.abspath(config_path))
+
+    sources = [_source_entry(config_path)]
+    for key in FILE_REFERENCE_KEYS:
+        if config.get(key):
+            sources.append(_source_entry(resolve_path(config_dir, config[key])))
+
+    # Compile with a private cache so the bundle doesn't depend on process state
+    loader = PromptLoader(config, cache=TemplateCache())
+    templates = {loader.resolve(p): loader.compile(p) for p in template_paths(config)}
+    sources += [_source_entry(path) for path in templates]
+
+    payload = pickle.dumps(
+        {"config": config, "sources": sources, "templates": templates},
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    digest = hashlib.sha256(payload).digest()
+
+    out_path = bundle_path or default_bundle_path(config_path)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BUNDLE_MAGIC + bytes([BUNDLE_FORMAT_VERSION]) + digest + payload)
+    os.replace(tmp_path, out_path)
+
+    return ConfigBundle(config, sources, templates, digest.hex())
+
+
+def read_bundle(bundle_path: str) -> ConfigBundle:
+    with open(bundle_path, "rb") as f:
+        data = f.read()
+
+    if len(data) < _HEADER_LEN or not data.startswith(BUNDLE_MAGIC):
+        raise ValueError(f"Not a prompt_lifecycle config bundle: {bundle_path}")
+
+    version = data[len(BUNDLE_MAGIC)]
+    if version != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Config bundle format v{version} != supported v{BUNDLE_FORMAT_VERSION}: {bundle_path}")
+
+    digest = data[len(BUNDLE_MAGIC) + 1:_HEADER_LEN]
+    payload = data[_HEADER_LEN:]
+    if hashlib.sha256(payload).digest() != digest:
+        raise ValueError(f"Config bundle is corrupt (hash mismatch): {bundle_path}")
+
+    body = pickle.loads(payload)
+    return ConfigBundle(body["config"], body["sources"], body["templates"], digest.hex())
+
+
+def is_fresh(bundle: ConfigBundle) -> bool:
+    """A bundle is fresh while every YAML file and template still has the recorded (mtime_ns, size)."""
+    for src in bundle.sources:
+        try:
+            st = os.stat(src["path"])
+        except OSError:
+            return False
+        if st.st_mtime_ns != src["mtime_ns"] or st.st_size != src["size"]:
+            return False
+    return True
+
+
+def load_fresh_bundle(bundle_path: str, config_path: str, cache: Optional[TemplateCache] = None) -> Optional[ConfigBundle]:
+    """
+    Returns the bundle if it exists, is intact, was built from config_path and is
+    still fresh; otherwise None (callers fall back to YAML). Compiled templates are
+    seeded into the template cache, which re-validates them against disk as usual.
+    """
+    if not os.path.exists(bundle_path):
+        return None
+
+    try:
+        bundle = read_bundle(bundle_path)
+    except (ValueError, pickle.UnpicklingError, EOFError):
+        return None
+
+    if not bundle.sources or bundle.sources[0]["path"] != os.path.abspath(config_path):
+        return None
+    if not is_fresh(bundle):
+        return None
+
+    (cache if cache is not None else TEMPLATE_CACHE).seed(bundle.templates.values())
+    return bundle
@@ -0,0 +1,403 @@
+"""
+Evidence retrieval: instead of pasting an issuer's whole input materials into the
+prompt, index them once and inject only the passages most relevant to the routed
+KPI pack and section.
+
+    evidence:
+      enabled: true
+      template_path: evidence.md
+      index_dir: .cache/evidence   # persisted indexes (omit: memory only)
+      chunk_chars: 800             # target passage size
+      top_k: 8
+      max_chars: 6000              # budget for the injected passages
+      max_tokens: null             # ... and/or in (approx) tokens
+      min_input_chars: 4000        # smaller inputs are pasted as-is
+      memory_entries: 64           # indexes kept in process
+
+    sections:
+      company_overview:
+        evidence:
+          keywords: [business, products, customers, segments]
+
+Runtime runs this between Router.route and PromptLoader.load: the "inputs"
+segment is replaced by an "evidence" segment holding the top passages, in
+document order and labelled with their source.
+
+The index is BM25 over passages with array-backed (CSR) postings. It is keyed
+on the content of the inputs, kept in a small in-process LRU (so every section
+of one issuer shares it) and persisted to index_dir, so an issuer's materials
+are chunked and indexed once.
+"""
+import hashlib
+import heapq
+import json
+import math
+import os
+import pickle
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from prompt_lifecycle.engine.prompt_loader import SCOPE_REQUEST
+from prompt_lifecycle.telemetry.cost_estimator import approx_tokens
+
+# File layout: MAGIC | format version (1 byte) | sha256(payload) (32 bytes) | payload (pickle)
+INDEX_MAGIC = b"PLEI"
+# Bump whenever chunking, tokenization or the payload layout changes
+INDEX_FORMAT_VERSION = 1
+
+_HEADER_LEN = len(INDEX_MAGIC) + 1 + 32
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with "
+    "after before during per than over under into".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric terms, stopwords dropped, plural 's' folded ("margins" -> "margin")."""
+    terms = []
+    for term in _TOKEN.findall(text.lower()):
+        if term in _STOPWORDS:
+            continue
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+class Passage(NamedTuple):
+    source: str  # input key / document label
+    ordinal: int  # position within its source
+    text: str
+
+
+def input_documents(inputs: Any) -> List[Tuple[str, str]]:
+    """
+    Issuer inputs as (source, text) documents:
+      str                      -> one document, "inputs"
+      {key: value}             -> one per key (non-str values as JSON)
+      [str | {"source"/"title", "text"}] -> one per item
+    """
+    if isinstance(inputs, str):
+        return [("inputs", inputs)]
+    if isinstance(inputs, dict):
+        items: Iterable[Tuple[str, Any]] = inputs.items()
+    elif isinstance(inputs, (list, tuple)):
+        items = []
+        for i, item in enumerate(inputs, 1):
+            if isinstance(item, dict) and "text" in item:
+                items.append((str(item.get("source") or item.get("title") or f"doc{i}"), item["text"]))
+            else:
+                items.append((f"doc{i}", item))
+    else:
+        return [("inputs", json.dumps(inputs, ensure_ascii=False, default=str))]
+
+    docs = []
+    for source, value in items:
+        text = value if isinstance(value, str) else json.dumps(value, indent=2, ensure_ascii=False, default=str)
+        if text.strip():
+            docs.append((str(source), text))
+    return docs
+
+
+def chunk_documents(docs: Sequence[Tuple[str, str]], chunk_chars: int = 800) -> List[Passage]:
+    """Packs paragraphs (split further at sentence ends when too long) into ~chunk_chars passages."""
+    passages: List[Passage] = []
+    for source, text in docs:
+        pieces: List[str] = []
+        for paragraph in _PARAGRAPH_BREAK.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if len(paragraph) <= chunk_chars:
+                pieces.append(paragraph)
+            else:
+                pieces.extend(s for s in _SENTENCE_END.split(paragraph) if s)
+
+        current: List[str] = []
+        size = 0
+        ordinal = 0
+        for piece in pieces:
+            if current and size + len(piece) > chunk_chars:
+                ordinal += 1
+                passages.append(Passage(source, ordinal, "\n".join(current)))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+        if current:
+            ordinal += 1
+            passages.append(Passage(source, ordinal, "\n".join(current)))
+    return passages
+
+
+class EvidenceIndex:
+    """
+    BM25 (k1, b) over passages. Postings are CSR arrays: term t's passages are
+    doc_ids[offsets[t]:offsets[t + 1]] with matching term_freqs, so a query touches
+    only the postings of its own terms and the whole index pickles as a few flat
+    buffers.
+    """
+
+    def __init__(
+        self,
+        passages: List[Passage],
+        vocab: Dict[str, int],
+        offsets: array,
+        doc_ids: array,
+        term_freqs: array,
+        doc_lens: array,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.passages = passages
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lens = doc_lens
+        self.k1 = k1
+        self.b = b
+        avgdl = (sum(doc_lens) / len(doc_lens)) if doc_lens else 1.0
+        # Per-passage length normalization, precomputed once
+        self._norm = array("d", (k1 * (1 - b + b * dl / max(avgdl, 1e-9)) for dl in doc_lens))
+
+    @classmethod
+    def build(cls, passages: List[Passage]) -> "EvidenceIndex":
+        vocab: Dict[str, int] = {}
+        postings: List[List[Tuple[int, int]]] = []
+        doc_lens = array("I")
+        for doc_id, passage in enumerate(passages):
+            terms = tokenize(passage.text)
+            doc_lens.append(len(terms))
+            for term, tf in Counter(terms).items():
+                term_id = vocab.get(term)
+                if term_id is None:
+                    term_id = vocab[term] = len(postings)
+                    postings.append([])
+                postings[term_id].append((doc_id, tf))
+
+        offsets = array("I", [0])
+        doc_ids = array("I")
+        term_freqs = array("I")
+        for plist in postings:
+            for doc_id, tf in plist:
+                doc_ids.append(doc_id)
+                term_freqs.append(tf)
+            offsets.append(len(doc_ids))
+        return cls(passages, vocab, offsets, doc_ids, term_freqs, doc_lens)
+
+    def search(self, query_terms: Iterable[str], top_k: int) -> List[Tuple[float, int]]:
+        """[(score, passage id)], best first; only passages matching some query term."""
+        n_docs = len(self.passages)
+        scores = [0.0] * n_docs
+        k1_plus_1 = self.k1 + 1
+        offsets, doc_ids, term_freqs, norm = self.offsets, self.doc_ids, self.term_freqs, self._norm
+        for term in set(query_terms):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = offsets[term_id], offsets[term_id + 1]
+            df = end - start
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for i in range(start, end):
+                doc_id = doc_ids[i]
+                tf = term_freqs[i]
+                scores[doc_id] += idf * tf * k1_plus_1 / (tf + norm[doc_id])
+        return heapq.nlargest(top_k, ((s, d) for d, s in enumerate(scores) if s > 0.0))
+
+    # ---- persistence ----
+
+    def dump(self, path: str) -> None:
+        payload = pickle.dumps(
+            {
+                "passages": [tuple(p) for p in self.passages],
+                "vocab": self.vocab,
+                "offsets": self.offsets,
+                "doc_ids": self.doc_ids,
+                "term_freqs": self.term_freqs,
+                "doc_lens": self.doc_lens,
+                "k1": self.k1,
+                "b": self.b,
+            },
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_MAGIC + bytes([INDEX_FORMAT_VERSION]) + hashlib.sha256(payload).digest() + payload)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "EvidenceIndex":
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _HEADER_LEN or not data.startswith(INDEX_MAGIC):
+            raise ValueError(f"{path} is not an evidence index")
+        if data[len(INDEX_MAGIC)] != INDEX_FORMAT_VERSION:
+            raise ValueError(f"{path}: index format {data[len(INDEX_MAGIC)]}, expected {INDEX_FORMAT_VERSION}")
+        payload = data[_HEADER_LEN:]
+        if hashlib.sha256(payload).digest() != data[len(INDEX_MAGIC) + 1 : _HEADER_LEN]:
+            raise ValueError(f"{path}: checksum mismatch")
+        body = pickle.loads(payload)
+        return cls(
+            [Passage(*p) for p in body["passages"]],
+            body["vocab"],
+            body["offsets"],
+            body["doc_ids"],
+            body["term_freqs"],
+            body["doc_lens"],
+            k1=body["k1"],
+            b=body["b"],
+        )
+
+
+class EvidenceRetriever:
+    """
+    Built per config snapshot (see Runtime). Query terms per (section, KPI pack)
+    are the pack's KPI ids, labels and definitions from kpi_registry.yaml plus
+    sections.<section>.evidence.keywords, tokenized once.
+    """
+
+    def __init__(self, config: Dict[str, Any], packs: Dict[str, Any]):
+        cfg = config.get("evidence", {}) or {}
+        self.template_path = cfg.get("template_path", "evidence.md")
+        self.index_dir: Optional[str] = cfg.get("index_dir")
+        self.chunk_chars = int(cfg.get("chunk_chars", 800))
+        self.top_k = int(cfg.get("top_k", 8))
+        self.max_chars: Optional[int] = int(cfg["max_chars"]) if cfg.get("max_chars") is not None else None
+        self.max_tokens: Optional[int] = int(cfg["max_tokens"]) if cfg.get("max_tokens") is not None else None
+        self.min_input_chars = int(cfg.get("min_input_chars", 4000))
+        self.memory_entries = int(cfg.get("memory_entries", 64))
+
+        registry = config.get("kpi_registry", {}) or {}
+        self._pack_terms: Dict[str, Tuple[str, ...]] = {}
+        for pack_id, pack in packs.items():
+            words: List[str] = []
+            for kpi_id in pack.kpi_ids:
+                entry = registry.get(kpi_id, {}) or {}
+                words += [kpi_id.replace("_", " "), str(entry.get("label", "")), str(entry.get("definition", ""))]
+            self._pack_terms[pack_id] = tuple(dict.fromkeys(tokenize(" ".join(words))))
+
+        self._section_cfg: Dict[str, Dict[str, Any]] = {}
+        for section, section_cfg in (config.get("sections", {}) or {}).items():
+            evidence_cfg = (section_cfg or {}).get("evidence", {}) or {}
+            self._section_cfg[section] = {
+                "enabled": bool(evidence_cfg.get("enabled", True)),
+                "terms": tuple(dict.fromkeys(tokenize(" ".join(evidence_cfg.get("keywords", []) or [])))),
+            }
+
+        self._indexes: "OrderedDict[str, EvidenceIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory": 0, "disk": 0, "built": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], packs: Dict[str, Any]) -> Optional["EvidenceRetriever"]:
+        if not (config.get("evidence", {}) or {}).get("enabled", False):
+            return None
+        return cls(config, packs)
+
+    def query_terms(self, section: str, kpi_pack: Optional[str]) -> Tuple[str, ...]:
+        section_terms = self._section_cfg.get(section, {}).get("terms", ())
+        return tuple(dict.fromkeys(self._pack_terms.get(kpi_pack, ()) + section_terms))
+
+    def index_key(self, docs: Sequence[Tuple[str, str]]) -> str:
+        h = hashlib.sha256(f"evidence-v{INDEX_FORMAT_VERSION}\0{self.chunk_chars}\0".encode("utf-8"))
+        for source, text in docs:
+            h.update(source.encode("utf-8") + b"\0" + text.encode("utf-8") + b"\0")
+        return h.hexdigest()
+
+    def index_for(self, inputs: Any) -> Tuple[EvidenceIndex, str]:
+        """(index, memory | disk | built) for one issuer's inputs."""
+        docs = input_documents(inputs)
+        key = self.index_key(docs)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                self.stats["memory"] += 1
+                return index, "memory"
+
+        status = "built"
+        path = os.path.join(self.index_dir, key[:2], key + ".bm25") if self.index_dir else None
+        index = None
+        if path is not None and os.path.exists(path):
+            try:
+                index = EvidenceIndex.load(path)
+                status = "disk"
+            except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+                index = None  # stale or damaged: rebuild and overwrite
+        if index is None:
+            index = EvidenceIndex.build(chunk_documents(docs, self.chunk_chars))
+            if path is not None:
+                index.dump(path)
+
+        with self._lock:
+            self.stats[status] += 1
+            self._indexes[key] = index
+            while len(self._indexes) > self.memory_entries:
+                self._indexes.popitem(last=False)
+        return index, status
+
+    def select(self, index: EvidenceIndex, query_terms: Sequence[str]) -> List[Passage]:
+        """Top passages within the char / token budget, returned in document order."""
+        ranked = [doc_id for _, doc_id in index.search(query_terms, self.top_k)]
+        if not ranked:
+            # Nothing matches: the head of the materials beats an empty segment
+            ranked = list(range(min(self.top_k, len(index.passages))))
+
+        chosen: List[int] = []
+        chars = tokens = 0
+        for doc_id in ranked:
+            text = index.passages[doc_id].text
+            n_tokens = approx_tokens(text) if self.max_tokens is not None else 0
+            if self.max_chars is not None and chars + len(text) > self.max_chars:
+                continue
+            if self.max_tokens is not None and tokens + n_tokens > self.max_tokens:
+                continue
+            chosen.append(doc_id)
+            chars += len(text)
+            tokens += n_tokens
+        return [index.passages[doc_id] for doc_id in sorted(chosen)]
+
+    def apply(self, prompt_spec: Dict[str, Any], section: str, inputs: Any) -> None:
+        """Swaps the routed "inputs" segment for an "evidence" segment (in place); notes it in the route manifest."""
+        if not self._section_cfg.get(section, {}).get("enabled", True):
+            return
+        segments = prompt_spec["segments"]
+        position = next((i for i, seg in enumerate(segments) if seg.get("name") == "inputs"), None)
+        if position is None:
+            return
+
+        manifest = prompt_spec["manifest"]
+        input_chars = len(segments[position]["variables"].get("input_materials", ""))
+        if input_chars < self.min_input_chars:
+            manifest["evidence"] = {"status": "passthrough", "input_chars": input_chars}
+            return
+
+        index, index_status = self.index_for(inputs)
+        query = self.query_terms(section, manifest.get("kpi_pack"))
+        passages = self.select(index, query)
+        text = "\n\n".join(f"[{p.source} §{p.ordinal}]\n{p.text}" for p in passages)
+
+        segments[position] = {
+            "name": "evidence",
+            "template_path": self.template_path,
+            "variables": {"evidence_passages": text},
+            "scope": SCOPE_REQUEST,
+        }
+        manifest["evidence"] = {
+            "status": "retrieved",
+            "index": index_status,
+            "passages": len(passages),
+            "of_passages": len(index.passages),
+            "input_chars": input_chars,
+            "evidence_chars": len(text),
+            "query_terms": len(query),
+        }
@@ -1 +1,221 @@
-# JSON validation / guardrails here
+from typing import Any, Dict, List, Optional, Type
+
+from prompt_lifecycle.schemas import SECTION_SCHEMAS, SectionOutput
+from prompt_lifecycle.schemas.base import EVIDENCE_MARKER
+from prompt_lifecycle.utils.json_utils import JSONParseError, parse_model_json
+
+
+class GuardrailViolation(Exception):
+    """
+    Model output broke its contract. Raised from feed() as soon as the stream is
+    irrecoverably malformed (callers abort generation), or from finish().
+    """
+
+    def __init__(self, reason: str, detail: str, at_chars: int):
+        super().__init__(f"{reason}: {detail} (at {at_chars} chars)")
+        self.reason = reason
+        self.detail = detail
+        self.at_chars = at_chars
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"reason": self.reason, "detail": self.detail, "at_chars": self.at_chars}
+
+
+class StreamingGuardrail:
+    """feed() every chunk as it arrives, then finish() once the stream ends."""
+
+    def __init__(self, max_chars: int = 8000):
+        self.max_chars = max_chars
+        self.chars = 0
+
+    def feed(self, chunk: str) -> None:
+        self.chars += len(chunk)
+        if self.chars > self.max_chars:
+            self.violate("too_long", f"output exceeds {self.max_chars} chars")
+
+    def finish(self) -> None:
+        return None
+
+    def check(self, text: str) -> Optional[GuardrailViolation]:
+        """Runs a complete (non-streamed) output through feed() + finish(); the violation, if any."""
+        try:
+            self.feed(text)
+            self.finish()
+        except GuardrailViolation as exc:
+            return exc
+        return None
+
+    def violate(self, reason: str, detail: str) -> None:
+        raise GuardrailViolation(reason, detail, self.chars)
+
+
+class MarkdownSectionGuardrail(StreamingGuardrail):
+    """
+    Incremental checker for the strict section format:
+
+      **<Heading>**
+      - <bullet> **Evidence:** <snippet>
+      ...
+
+    Aborts as soon as:
+      - the first line can no longer become the heading
+      - a line after the heading can no longer become a bullet
+      - a finished bullet has no Evidence note
+      - there are more than max_bullets bullets, or the output is too long
+    finish() additionally requires at least min_bullets.
+    """
+
+    def __init__(self, heading_line: str, min_bullets: int, max_bullets: int, max_chars: int = 8000):
+        super().__init__(max_chars)
+        self.heading_line = heading_line
+        self.min_bullets = min_bullets
+        self.max_bullets = max_bullets
+        self.heading_seen = False
+        self.bullets = 0
+        self._partial = ""
+
+    @classmethod
+    def for_schema(cls, schema: Type[SectionOutput], max_chars: int = 8000) -> "MarkdownSectionGuardrail":
+        return cls(schema.heading_line(), schema.MIN_BULLETS, schema.MAX_BULLETS, max_chars)
+
+    def feed(self, chunk: str) -> None:
+        super().feed(chunk)
+        self._partial += chunk
+        *lines, self._partial = self._partial.split("\n")
+        for line in lines:
+            self._line(line.strip())
+        self._check_partial(self._partial.strip())
+
+    def finish(self) -> None:
+        if self._partial.strip():
+            self._line(self._partial.strip())
+            self._partial = ""
+        if not self.heading_seen:
+            self.violate("missing_heading", f"expected '{self.heading_line}'")
+        if self.bullets < self.min_bullets:
+            self.violate("too_few_bullets", f"{self.bullets} < {self.min_bullets}")
+
+    def _line(self, line: str) -> None:
+        if not line:
+            return
+        if not self.heading_seen:
+            if line != self.heading_line:
+                self.violate("missing_heading", f"expected '{self.heading_line}', got '{line[:60]}'")
+            self.heading_seen = True
+            return
+        if not line.startswith(("- ", "* ")):
+            self.violate("not_a_bullet", f"'{line[:60]}'")
+        if EVIDENCE_MARKER not in line:
+            self.violate("missing_evidence", f"bullet {self.bullets + 1} has no {EVIDENCE_MARKER} note")
+        self.bullets += 1
+        if self.bullets > self.max_bullets:
+            self.violate("too_many_bullets", f"more than {self.max_bullets}")
+
+    def _check_partial(self, partial: str) -> None:
+        # Judge an unfinished line as early as its first characters allow
+        if not partial:
+            return
+        if not self.heading_seen:
+            if not self.heading_line.startswith(partial[: len(self.heading_line)]):
+                self.violate("missing_heading", f"expected '{self.heading_line}', got '{partial[:60]}'")
+        elif partial[0] not in "-*":
+            self.violate("not_a_bullet", f"'{partial[:60]}'")
+
+
+class JSONStructureGuardrail(StreamingGuardrail):
+    """
+    Incremental structural checker for a single top-level JSON object, optionally
+    inside a ```json fence. Tracks nesting and string state char by char and aborts
+    on a non-object start, mismatched brackets, or content after the closing brace.
+    finish() parses the document and validates it against the section schema.
+    """
+
+    _CLOSERS = {"}": "{", "]": "["}
+
+    def __init__(self, schema: Optional[Type[SectionOutput]] = None, max_chars: int = 8000):
+        super().__init__(max_chars)
+        self.schema = schema
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._closed = False
+        self._fence = False  # inside the opening ``` line
+        self._text: List[str] = []
+
+    def feed(self, chunk: str) -> None:
+        super().feed(chunk)
+        self._text.append(chunk)
+        for ch in chunk:
+            self._char(ch)
+
+    def _char(self, ch: str) -> None:
+        if self._fence:
+            if ch == "\n":
+                self._fence = False
+            return
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+            return
+        if ch.isspace():
+            return
+        if self._closed:
+            if ch != "`":
+                self.violate("trailing_content", f"unexpected '{ch}' after the closing brace")
+            return
+        if not self._started:
+            if ch == "`":
+                self._fence = True
+                return
+            if ch != "{":
+                self.violate("not_an_object", f"output must start with '{{', got '{ch}'")
+            self._started = True
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._stack.append(ch)
+        elif ch in self._CLOSERS:
+            if not self._stack or self._stack[-1] != self._CLOSERS[ch]:
+                self.violate("mismatched_bracket", f"unexpected '{ch}'")
+            self._stack.pop()
+            if not self._stack:
+                self._closed = True
+
+    def finish(self) -> None:
+        if not self._closed:
+            self.violate("truncated", "JSON object was never closed")
+        try:
+            doc, _ = parse_model_json("".join(self._text))
+        except JSONParseError as exc:
+            self.violate("invalid_json", exc.msg)
+        if self.schema is not None:
+            errors = self.schema.validator().errors(doc)
+            if errors:
+                self.violate("schema", "; ".join(errors))
+
+
+def guardrail_for_section(section: str, section_cfg: Dict[str, Any]) -> Optional[StreamingGuardrail]:
+    """
+    Builds a fresh guardrail for one generation from sections.<section>.guardrails:
+
+      guardrails:
+        enabled: true
+        output_format: markdown | json
+        max_chars: 8000
+    """
+    cfg = section_cfg.get("guardrails", {}) or {}
+    if not cfg.get("enabled", False):
+        return None
+
+    schema = SECTION_SCHEMAS.get(section)
+    max_chars = int(cfg.get("max_chars", 8000))
+    if cfg.get("output_format", "markdown") == "json":
+        return JSONStructureGuardrail(schema, max_chars)
+    if schema is None:
+        return StreamingGuardrail(max_chars)
+    return MarkdownSectionGuardrail.for_schema(schema, max_chars)
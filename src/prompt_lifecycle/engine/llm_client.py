@@ -1,21 +1,560 @@
-from typing import Any, Dict
+import asyncio
+import codecs
+import json
+import threading
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from prompt_lifecycle.engine.response_cache import ResponseCache, cache_key
+
+
+class ProviderError(Exception):
+    """Non-2xx answer from the provider. retry_after is in seconds when the provider sent one."""
+
+    def __init__(self, status: int, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"Provider returned HTTP {status}: {message}".rstrip(": "))
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LLMTimeoutError(TimeoutError):
+    pass
+
+
+class Transport:
+    """
+    Moves one prompt to a provider and back. Implementations must be safe to use
+    from many coroutines at once.
+    """
+
+    async def send(self, prompt_text: str, params: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt_text: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yields output chunks. Closing the iterator early must abort the generation."""
+        yield await self.send(prompt_text, params)
+
+    async def aclose(self) -> None:
+        return None
+
+
+class EchoTransport(Transport):
+    """Returns the prompt unchanged: makes it easy to see exactly what would be sent to the model."""
+
+    def __init__(self, chunk_chars: int = 64):
+        self.chunk_chars = chunk_chars
+
+    async def send(self, prompt_text: str, params: Dict[str, Any]) -> str:
+        return prompt_text
+
+    async def stream(self, prompt_text: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        for start in range(0, len(prompt_text), self.chunk_chars):
+            yield prompt_text[start:start + self.chunk_chars]
+
+
+class _ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one host, bound to one event loop."""
+
+    def __init__(self, host: str, port: int, ssl: bool, max_connections: int):
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def acquire(self) -> Tuple[Tuple[asyncio.StreamReader, asyncio.StreamWriter], bool]:
+        """Returns (connection, reused)."""
+        await self._slots.acquire()
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return (reader, writer), True
+            writer.close()
+        try:
+            conn = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+        except BaseException:
+            self._slots.release()
+            raise
+        return conn, False
+
+    def release(self, conn: Tuple[asyncio.StreamReader, asyncio.StreamWriter], reusable: bool) -> None:
+        if reusable:
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+        self._slots.release()
+
+    async def aclose(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class HTTPTransport(Transport):
+    """
+    Minimal JSON-over-HTTP/1.1 transport with keep-alive connection pooling.
+
+    Request body:  {"prompt": "...", **params}
+    Response body: {"output": "...", "usage": {...}}  (usage is optional)
+
+    One pool is kept per event loop, so the transport can be shared by the
+    client's background loop (sync callers) and any caller-owned loop.
+    """
+
+    def __init__(self, url: str, max_connections: int = 16, headers: Optional[Dict[str, str]] = None):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"llm.url must be http(s)://..., got '{url}'")
+        self.url = url
+        self.host = parts.hostname or "127.0.0.1"
+        self.ssl = parts.scheme == "https"
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.path = parts.path or "/"
+        self.max_connections = max_connections
+        self.headers = dict(headers or {})
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _ConnectionPool]" = weakref.WeakKeyDictionary()
+
+    def _pool(self) -> _ConnectionPool:
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            pool = _ConnectionPool(self.host, self.port, self.ssl, self.max_connections)
+            self._pools[loop] = pool
+        return pool
+
+    def _encode(self, body: bytes) -> bytes:
+        lines = [
+            f"POST {self.path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive",
+        ]
+        lines += [f"{k}: {v}" for k, v in self.headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    async def _open(self, pool: _ConnectionPool, raw: bytes) -> Tuple[Tuple[asyncio.StreamReader, asyncio.StreamWriter], int, Dict[str, str]]:
+        """Sends one request and reads the status line + headers; the caller owns (and releases) the connection."""
+        # A pooled keep-alive connection may have been closed by the server; retry once on a fresh one
+        for attempt in range(2):
+            conn, reused = await pool.acquire()
+            reader, writer = conn
+            try:
+                writer.write(raw)
+                await writer.drain()
+                status, headers = await _read_head(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pool.release(conn, reusable=False)
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                pool.release(conn, reusable=False)
+                raise
+            return conn, status, headers
+
+        raise ConnectionError(f"Could not reach {self.url}")
+
+    async def request(self, payload: Dict[str, Any]) -> Tuple[int, Dict[str, str], bytes]:
+        pool = self._pool()
+        conn, status, headers = await self._open(pool, self._encode(json.dumps(payload).encode("utf-8")))
+        try:
+            body = await _read_body(conn[0], headers)
+        except BaseException:
+            pool.release(conn, reusable=False)
+            raise
+        pool.release(conn, reusable=headers.get("connection", "").lower() != "close")
+        return status, headers, body
+
+    async def send(self, prompt_text: str, params: Dict[str, Any]) -> str:
+        status, headers, body = await self.request({"prompt": prompt_text, **params})
+        if status != 200:
+            raise _provider_error(status, headers, body)
+        return json.loads(body)["output"]
+
+    async def stream(self, prompt_text: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Sends {"stream": true}; the provider answers with a chunked body whose chunks
+        are raw UTF-8 output text. Closing this iterator early drops the connection,
+        which is how an aborted generation stops on the provider side.
+
+        A non-200 answer (chunked or not) is read whole and raised as ProviderError
+        before anything is yielded, so it is retried like any other failed call.
+        """
+        raw = self._encode(json.dumps({"prompt": prompt_text, "stream": True, **params}).encode("utf-8"))
+        pool = self._pool()
+        conn, status, headers = await self._open(pool, raw)
+        reader = conn[0]
+        finished = False
+        try:
+            if status != 200 or headers.get("transfer-encoding", "").lower() != "chunked":
+                body = await _read_body(reader, headers)
+                finished = True
+                if status != 200:
+                    raise _provider_error(status, headers, body)
+                yield json.loads(body)["output"]
+                return
+
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+            while True:
+                data = await _read_chunk(reader)
+                if not data:
+                    finished = True
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+        finally:
+            pool.release(conn, reusable=finished and headers.get("connection", "").lower() != "close")
+
+    async def aclose(self) -> None:
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+
+def _provider_error(status: int, headers: Dict[str, str], body: bytes) -> ProviderError:
+    retry_after = headers.get("retry-after")
+    return ProviderError(
+        status,
+        body.decode("utf-8", "replace")[:200],
+        retry_after=float(retry_after) if retry_after else None,
+    )
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+    """Whole body: chunked (drained to the last chunk) or Content-Length."""
+    if headers.get("transfer-encoding", "").lower() != "chunked":
+        return await reader.readexactly(int(headers.get("content-length", "0")))
+    parts = []
+    while True:
+        data = await _read_chunk(reader)
+        if not data:
+            return b"".join(parts)
+        parts.append(data)
+
+
+async def _read_chunk(reader: asyncio.StreamReader) -> bytes:
+    """One chunk of a chunked body; b"" after the last one (trailer consumed)."""
+    size = int((await reader.readline()).split(b";", 1)[0].strip() or b"0", 16)
+    if size == 0:
+        await reader.readline()  # trailing CRLF
+        return b""
+    data = await reader.readexactly(size)
+    await reader.readexactly(2)
+    return data
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("Connection closed before response")
+    status = int(status_line.split(b" ", 2)[1])
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return status, headers
+
+
+def build_transport(llm_cfg: Dict[str, Any]) -> Transport:
+    kind = llm_cfg.get("transport", "echo")
+    if kind == "echo":
+        return EchoTransport()
+    if kind == "http":
+        if not llm_cfg.get("url"):
+            raise ValueError("llm.transport 'http' requires llm.url")
+        return HTTPTransport(
+            llm_cfg["url"],
+            max_connections=int(llm_cfg.get("max_connections", 16)),
+            headers=llm_cfg.get("headers"),
+        )
+    raise ValueError(f"Unknown llm.transport '{kind}' (expected: echo, http)")
+
+
+class ModelLane:
+    """
+    One models.yaml entry as the client calls it: provider params (with its
+    provider_model), output cap, and its own RetryScheduler (rate limits and the
+    AIMD window are per model).
+    """
+
+    __slots__ = ("name", "model_cfg", "params", "max_output_tokens", "scheduler")
+
+    def __init__(self, name: Optional[str], model_cfg: Dict[str, Any], params: Dict[str, Any], scheduler: Optional[Any]):
+        self.name = name
+        self.model_cfg = model_cfg
+        self.params = params
+        self.max_output_tokens = int(model_cfg.get("max_output_tokens", 0) or 0)
+        self.scheduler = scheduler
+
+    def est_tokens(self, prompt_text: str) -> int:
+        # Rough token estimate for the tokens/min bucket: ~4 chars per token + the output cap
+        return len(prompt_text) // 4 + self.max_output_tokens
 
 
 class LLMClient:
     """
-    LLM client stub.
+    LLM client with an asyncio-native core.
+
+      - acall(prompt_text) / call_many(prompts, max_concurrency=...) are the async API
+      - call(prompt_text) is the sync API Runtime has always used; for network
+        transports it runs on one shared background event loop, so threaded
+        callers (generate-batch) share a single connection pool
 
-    Today:
-      - call(prompt_text) returns the prompt_text unchanged (echo)
+    Config (run-config YAML, all optional):
+      llm:
+        transport: echo | http
+        url: http://127.0.0.1:8088/v1/generate
+        timeout_s: 60
+        max_connections: 16
+        max_concurrency: 16
+        model: fast     # key in models.yaml (default: models.yaml default_model)
+        params: {...}   # forwarded to the provider with every prompt
+        retry: {enabled, max_attempts, base_delay_s, max_delay_s, hedge_after_s}
+        concurrency: {initial, min, max}   # AIMD window
+      response_cache: {mode, memory_entries, disk_path, ttl_s, max_disk_entries}
 
-    Tomorrow:
-      - replace the body of call() with Azure/OpenAI plumbing,
-        but keep the same interface so Runtime doesn't change.
+    The *_with_meta variants also return {"model", "cache_key", "cache_status"}
+    for the manifest. astream() yields output chunks as they arrive; timeout_s
+    then bounds the wait for each chunk rather than the whole call.
+
+    Every call takes an optional model (a models.yaml key, default llm.model) so
+    one client can serve a routing cascade (see engine/model_router.py); each
+    model gets its own ModelLane on the shared transport.
     """
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], transport: Optional[Transport] = None, cache_mode: Optional[str] = None):
+        # Imported here: retry_policies depends on this module's error types
+        from prompt_lifecycle.engine.retry_policies import RetryScheduler
+
         self.config = config
+        llm_cfg = config.get("llm", {}) or {}
+
+        self.transport = transport if transport is not None else build_transport(llm_cfg)
+        self.timeout_s = llm_cfg.get("timeout_s", 60)
+        self.max_concurrency = int(llm_cfg.get("max_concurrency", 16))
+
+        # Rate limiting / retries / AIMD / hedging; pointless for the echo stub
+        retry_cfg = llm_cfg.get("retry", {}) or {}
+        use_scheduler = retry_cfg.get("enabled", not isinstance(self.transport, EchoTransport))
+
+        # One lane per models.yaml entry (hydrated by Runtime as config["models_cfg"]),
+        # built up front so lookups need no locking
+        models_cfg = config.get("models_cfg", {}) or {}
+        models = models_cfg.get("models", {}) or {}
+        self.model_name = llm_cfg.get("model") or models_cfg.get("default_model")
+        self.lanes: Dict[Optional[str], ModelLane] = {}
+        for name in dict.fromkeys([*models, self.model_name]):
+            model_cfg = models.get(name, {}) if name else {}
+            params = dict(llm_cfg.get("params", {}) or {})
+            if model_cfg.get("provider_model"):
+                params.setdefault("model", model_cfg["provider_model"])
+            scheduler = RetryScheduler.from_config(llm_cfg, model_cfg) if use_scheduler else None
+            self.lanes[name] = ModelLane(name, model_cfg, params, scheduler)
+
+        # The default model's lane, under the attribute names callers have always used
+        default = self.lanes[self.model_name]
+        self.model_cfg = default.model_cfg
+        self.params = default.params
+        self.max_output_tokens = default.max_output_tokens
+        self.scheduler: Optional[RetryScheduler] = default.scheduler
+
+        # Content-addressed response cache in front of the provider
+        cache_cfg = config.get("response_cache", {}) or {}
+        self.cache: Optional[ResponseCache] = None
+        if cache_cfg or cache_mode:
+            self.cache = ResponseCache.from_config(cache_cfg, mode=cache_mode)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    def lane(self, model: Optional[str] = None) -> ModelLane:
+        lane = self.lanes.get(model or self.model_name)
+        if lane is None:
+            raise ValueError(f"Unknown model '{model}'. Available (models.yaml): {', '.join(str(m) for m in self.lanes)}")
+        return lane
+
+    def cache_key(self, prompt_text: str, model: Optional[str] = None) -> str:
+        lane = self.lane(model)
+        return cache_key(prompt_text, {"model_name": lane.name, **lane.params})
+
+    async def acall(self, prompt_text: str, timeout_s: Optional[float] = None, model: Optional[str] = None) -> str:
+        output, _ = await self.acall_with_meta(prompt_text, timeout_s, model=model)
+        return output
+
+    async def acall_with_meta(
+        self,
+        prompt_text: str,
+        timeout_s: Optional[float] = None,
+        model: Optional[str] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        lane = self.lane(model)
+        meta: Dict[str, Any] = {"model": lane.name}
+        if self.cache is None:
+            return await self._scheduled(prompt_text, timeout_s, lane), meta
+
+        key = self.cache_key(prompt_text, lane.name)
+        output, status = await self.cache.aget_or_call(key, lambda: self._scheduled(prompt_text, timeout_s, lane))
+        meta.update(cache_key=key, cache_status=status)
+        return output, meta
+
+    async def _scheduled(self, prompt_text: str, timeout_s: Optional[float], lane: ModelLane) -> str:
+        if lane.scheduler is None:
+            return await self._send_once(prompt_text, timeout_s, lane.params)
+        return await lane.scheduler.run(
+            lambda: self._send_once(prompt_text, timeout_s, lane.params), est_tokens=lane.est_tokens(prompt_text)
+        )
+
+    async def _send_once(self, prompt_text: str, timeout_s: Optional[float], params: Dict[str, Any]) -> str:
+        timeout = self.timeout_s if timeout_s is None else timeout_s
+        try:
+            return await asyncio.wait_for(self.transport.send(prompt_text, params), timeout)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"LLM call exceeded {timeout}s") from None
+
+    async def astream(
+        self,
+        prompt_text: str,
+        guardrail: Optional[Any] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        timeout_s: Optional[float] = None,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yields output chunks. Each chunk is passed to guardrail.feed() before it is
+        yielded and guardrail.finish() runs at the end of the stream, so a violation
+        surfaces from this iterator and closes the provider stream right away.
+        Only complete, guardrail-clean outputs are written to the response cache.
+        Streams are not coalesced single-flight. meta, if given, is filled like
+        acall_with_meta's.
+        """
+        lane = self.lane(model)
+        meta = meta if meta is not None else {}
+        meta["model"] = lane.name
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(prompt_text, lane.name)
+            meta["cache_key"] = key
+            if self.cache.mode == "bypass":
+                self.cache.stats["bypass"] += 1
+                meta["cache_status"] = "bypass"
+            elif self.cache.readable:
+                cached, status = self.cache.lookup(key)
+                if cached is not None:
+                    meta["cache_status"] = status
+                    if guardrail is not None:
+                        guardrail.feed(cached)
+                        guardrail.finish()
+                    yield cached
+                    return
+            if "cache_status" not in meta:
+                self.cache.stats["misses"] += 1
+                meta["cache_status"] = "miss"
+
+        if lane.scheduler is None:
+            chunks = self._stream_once(prompt_text, timeout_s, lane.params)
+        else:
+            chunks = lane.scheduler.stream(
+                lambda: self._stream_once(prompt_text, timeout_s, lane.params), est_tokens=lane.est_tokens(prompt_text)
+            )
+
+        parts: List[str] = []
+        try:
+            async for chunk in chunks:
+                if guardrail is not None:
+                    guardrail.feed(chunk)
+                parts.append(chunk)
+                yield chunk
+        finally:
+            await chunks.aclose()
+        if guardrail is not None:
+            guardrail.finish()
+        if key is not None and self.cache.writable:
+            self.cache.store(key, "".join(parts))
+
+    async def _stream_once(self, prompt_text: str, timeout_s: Optional[float], params: Dict[str, Any]) -> AsyncIterator[str]:
+        timeout = self.timeout_s if timeout_s is None else timeout_s
+        chunks = self.transport.stream(prompt_text, params)
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise LLMTimeoutError(f"LLM stream was idle for more than {timeout}s") from None
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def call_many(
+        self,
+        prompts: Sequence[str],
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """Results come back in input order; at most max_concurrency calls are in flight."""
+        limit = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def one(prompt_text: str) -> str:
+            async with limit:
+                return await self.acall(prompt_text)
+
+        return await asyncio.gather(*(one(p) for p in prompts), return_exceptions=return_exceptions)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """model -> throughput, retry counters and limiter / AIMD state of its lane (empty without schedulers)."""
+        return {str(name): lane.scheduler.snapshot() for name, lane in self.lanes.items() if lane.scheduler is not None}
+
+    def prometheus_lines(self, namespace: str) -> List[str]:
+        """PrometheusExporter collector: metrics() as series labelled by model."""
+        from prompt_lifecycle.engine.retry_policies import prometheus_lines
+
+        return prometheus_lines(namespace, self.metrics())
 
     def call(self, prompt_text: str) -> str:
-        # Echo stub: makes it easy to see exactly what would be sent to the model.
-        return prompt_text
+        output, _ = self.call_with_meta(prompt_text)
+        return output
+
+    def call_with_meta(self, prompt_text: str, model: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        if isinstance(self.transport, EchoTransport):
+            # Echo stub: makes it easy to see exactly what would be sent to the model.
+            lane = self.lane(model)
+            meta: Dict[str, Any] = {"model": lane.name}
+            if self.cache is None:
+                return prompt_text, meta
+            key = self.cache_key(prompt_text, lane.name)
+            output, status = self.cache.get_or_call(key, lambda: prompt_text)
+            meta.update(cache_key=key, cache_status=status)
+            return output, meta
+        return self.run_sync(self.acall_with_meta(prompt_text, model=model))
+
+    def run_sync(self, coro: Awaitable[Any]) -> Any:
+        """Runs a coroutine on the client's background loop and blocks for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result()
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def close(self) -> None:
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.transport.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+        if self.cache is not None:
+            self.cache.close()
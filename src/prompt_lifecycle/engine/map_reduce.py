@@ -0,0 +1,215 @@
+"""
+Map-reduce generation for filings too long for one prompt.
+
+    map_reduce:
+      template_path: map_facts.md   # map prompt: extract facts from one chunk
+      chunk_chars: 12000
+      overlap_chars: 800            # context repeated at the start of the next chunk
+      max_parallel: 8               # map calls in flight (also bounds chunks held in memory)
+      cache_path: .cache/map_facts.sqlite
+      max_cache_entries: 200000
+
+  map:    documents are read incrementally (files are never loaded whole) into
+          overlapping chunks; each chunk gets a map prompt rendered by PromptLoader
+          (base / industry / KPI pack segments + map_facts.md + the chunk) and its
+          LLM call, at most max_parallel at a time
+  reduce: the chunk facts, in document order and de-duplicated, become the
+          section prompt's inputs (Runtime.agenerate_long; evidence retrieval off)
+
+Map results are cached keyed on LLMClient.cache_key(map prompt): the chunk, the
+map template, the KPI pack and the model. The section's prompt_version is not
+part of the map prompt, so a new prompt version (or another section on the
+same pack) re-runs only the reduce step. With the response cache on, map calls
+are cached there like any other call; cache_path is the map-only store used
+while it is off (mode bypass or no response_cache block).
+"""
+import asyncio
+import io
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, TextIO, Tuple
+
+from prompt_lifecycle.engine.prompt_loader import SCOPE_REQUEST, SCOPE_STATIC
+from prompt_lifecycle.engine.response_cache import SQLiteStore
+
+_READ_BLOCK = 64 * 1024
+
+
+class Chunk(NamedTuple):
+    source: str
+    ordinal: int  # 1-based position within its source
+    text: str
+
+
+def iter_chunks(stream: TextIO, source: str, chunk_chars: int = 12000, overlap_chars: int = 800) -> Iterator[Chunk]:
+    """
+    Overlapping ~chunk_chars chunks of a text stream, read block by block. A chunk
+    ends at the last paragraph / line / sentence break in its second half when
+    there is one; the next chunk starts overlap_chars before that (on a word
+    boundary). overlap_chars must be under half of chunk_chars: a cut can land
+    just past the middle of a chunk, and the next chunk has to start after 0.
+    """
+    if overlap_chars < 0 or overlap_chars >= chunk_chars // 2:
+        raise ValueError("map_reduce.overlap_chars must be at least 0 and smaller than half of chunk_chars")
+
+    buffer = ""
+    ordinal = 0
+    eof = False
+    while True:
+        while not eof and len(buffer) < chunk_chars:
+            block = stream.read(_READ_BLOCK)
+            if not block:
+                eof = True
+            buffer += block
+        if not buffer.strip():
+            return
+        if eof and len(buffer) <= chunk_chars:
+            ordinal += 1
+            yield Chunk(source, ordinal, buffer.strip())
+            return
+
+        cut = chunk_chars
+        for sep in ("\n\n", "\n", ". "):
+            at = buffer.rfind(sep, chunk_chars // 2, chunk_chars)
+            if at >= 0:
+                cut = at + len(sep)
+                break
+        ordinal += 1
+        yield Chunk(source, ordinal, buffer[:cut].strip())
+        if eof and not buffer[cut:].strip():
+            return  # only the overlap is left
+
+        start = cut - overlap_chars  # > 0: cut is past chunk_chars // 2 > overlap_chars
+        space = buffer.find(" ", start, cut)
+        buffer = buffer[space + 1 if 0 <= space < cut else start :]
+
+
+def iter_documents(documents: Iterable[Any], chunk_chars: int, overlap_chars: int) -> Iterator[Chunk]:
+    """
+    documents: file paths, {"path"[, "source"]}, {"text"[, "source"]} or plain text
+    (a str that is not an existing file path is treated as text).
+    """
+    for i, doc in enumerate(documents, 1):
+        if isinstance(doc, dict):
+            path, text = doc.get("path"), doc.get("text")
+            source = str(doc.get("source") or (os.path.basename(path) if path else f"doc{i}"))
+        elif isinstance(doc, str) and os.path.isfile(doc):
+            path, text, source = doc, None, os.path.basename(doc)
+        else:
+            path, text, source = None, str(doc), f"doc{i}"
+
+        if path is not None:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                yield from iter_chunks(f, source, chunk_chars, overlap_chars)
+        else:
+            yield from iter_chunks(io.StringIO(text or ""), source, chunk_chars, overlap_chars)
+
+
+class MapReducer:
+    """Runs the map step for one Runtime; built lazily by Runtime.agenerate_long."""
+
+    def __init__(self, runtime: Any):
+        self.runtime = runtime
+        cfg = runtime.config.get("map_reduce", {}) or {}
+        self.template_path = cfg.get("template_path", "map_facts.md")
+        self.chunk_chars = int(cfg.get("chunk_chars", 12000))
+        self.overlap_chars = int(cfg.get("overlap_chars", 800))
+        self.max_parallel = int(cfg.get("max_parallel", 8))
+        self.store: Optional[SQLiteStore] = None
+        response_cache = runtime.llm.cache
+        if cfg.get("cache_path") and (response_cache is None or response_cache.mode == "bypass"):
+            self.store = SQLiteStore(cfg["cache_path"], max_entries=int(cfg.get("max_cache_entries", 200_000)))
+
+    def map_prompt(self, snapshot: Any, section: str, overrides: Optional[Dict[str, Any]], chunk: Chunk) -> Tuple[str, Dict[str, Any]]:
+        """The section's shared static segments (minus the section prompt itself) + map template + chunk."""
+        spec = snapshot.router.route(section, overrides=overrides)
+        segments = [seg for seg in spec["segments"] if not seg["name"].startswith("section:")]
+        segments.append({"name": "map", "scope": SCOPE_STATIC, "template_path": self.template_path, "variables": {}})
+        segments.append(
+            {
+                "name": "inputs",
+                "scope": SCOPE_REQUEST,
+                "template_path": snapshot.router.inputs_prompt_cfg.get("template_path", "inputs.md"),
+                "variables": {"input_materials": f"[{chunk.source}, part {chunk.ordinal}]\n{chunk.text}"},
+            }
+        )
+        manifest = {k: spec["manifest"].get(k) for k in ("industry", "sub_industry", "kpi_pack")}
+        return snapshot.prompt_loader.load({"manifest": dict(manifest, stage="map"), "segments": segments})
+
+    async def amap(
+        self,
+        snapshot: Any,
+        section: str,
+        documents: Iterable[Any],
+        overrides: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[str], Dict[str, Any]]:
+        """(facts per chunk in document order, stats). Chunks are read only as map slots free up."""
+        llm = self.runtime.llm
+        loop = asyncio.get_running_loop()
+        results: Dict[int, str] = {}
+        stats = {"chunks": 0, "cached": 0, "mapped": 0, "input_tokens": 0, "cost_usd": 0.0}
+
+        async def one(position: int, chunk: Chunk) -> None:
+            prompt, manifest = self.map_prompt(snapshot, section, overrides, chunk)
+            if self.store is None:
+                output, meta = await llm.acall_with_meta(prompt)
+                if meta.get("cache_status", "miss") not in ("miss", "bypass"):
+                    results[position] = output
+                    stats["cached"] += 1
+                    return
+            else:
+                # SQLite is blocking I/O: keep it off the event loop
+                key = llm.cache_key(prompt)
+                found = await loop.run_in_executor(None, self.store.get, key)
+                if found is not None:
+                    results[position] = found[0]
+                    stats["cached"] += 1
+                    return
+                output = await llm.acall(prompt)
+                await loop.run_in_executor(None, self.store.put, key, output)
+            results[position] = output
+            stats["mapped"] += 1
+            stats["input_tokens"] += manifest["tokens"]["input"]
+            stats["cost_usd"] += self.runtime.cost_estimator.estimate_text(manifest["tokens"]["input"], output)["total_usd"]
+
+        started = time.perf_counter()
+        pending: Set[asyncio.Future] = set()
+        try:
+            for position, chunk in enumerate(iter_documents(documents, self.chunk_chars, self.overlap_chars)):
+                stats["chunks"] += 1
+                if len(pending) >= self.max_parallel:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()  # surface a failed chunk right away
+                pending.add(asyncio.ensure_future(one(position, chunk)))
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                for task in done:
+                    task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        stats["cost_usd"] = round(stats["cost_usd"], 6)
+        stats["map_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return [results[i] for i in range(stats["chunks"])], stats
+
+    @staticmethod
+    def reduce_inputs(facts: List[str]) -> str:
+        """Chunk facts joined in order; lines repeated by chunk overlap are kept once."""
+        seen: Set[str] = set()
+        lines: List[str] = []
+        for chunk_facts in facts:
+            for line in chunk_facts.splitlines():
+                key = line.strip()
+                if not key:
+                    continue
+                if key in seen:
+                    continue
+                seen.add(key)
+                lines.append(line.rstrip())
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
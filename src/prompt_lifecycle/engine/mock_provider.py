@@ -0,0 +1,198 @@
+"""
+Local stand-in for an LLM provider, for offline throughput runs and tests.
+
+Speaks the same JSON-over-HTTP/1.1 protocol as HTTPTransport, keeps connections
+alive, and simulates latency, jitter and throttling (429 + Retry-After).
+Requests with {"stream": true} get the output back as a chunked body, one
+chunk every chunk_delay_ms; a client that disconnects mid-stream stops it.
+By default the prompt is echoed back; `response` serves a canned output instead.
+
+    python -m prompt_lifecycle.engine.mock_provider --port 8088 --latency-ms 400 --jitter-ms 150 --rate-429 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+class MockProvider:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        rate_429: float = 0.0,
+        max_in_flight: Optional[int] = None,
+        retry_after_s: float = 1.0,
+        seed: Optional[int] = None,
+        response: Optional[str] = None,
+        chunk_chars: int = 32,
+        chunk_delay_ms: float = 10.0,
+    ):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.max_in_flight = max_in_flight  # above this many concurrent requests -> 429
+        self.retry_after_s = retry_after_s
+        self.response = response
+        self.chunk_chars = chunk_chars
+        self.chunk_delay_ms = chunk_delay_ms
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+        self.in_flight = 0
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "connections": 0, "streamed": 0, "aborted": 0}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1/generate"
+
+    async def start(self) -> "MockProvider":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "MockProvider":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                status, body, headers = await self._respond(request)
+                if status == 200 and request.get("stream"):
+                    if not await self._stream(reader, writer, body["output"]):
+                        break
+                    continue
+                writer.write(_encode_response(status, body, headers))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # client went away, or the server is shutting down
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _respond(self, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        self.stats["requests"] += 1
+
+        throttled = self._rng.random() < self.rate_429 or (
+            self.max_in_flight is not None and self.in_flight >= self.max_in_flight
+        )
+        if throttled:
+            self.stats["throttled"] += 1
+            return 429, {"error": "rate_limited"}, {"Retry-After": f"{self.retry_after_s:g}"}
+
+        self.in_flight += 1
+        try:
+            delay_ms = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms))
+            await asyncio.sleep(delay_ms / 1000.0)
+        finally:
+            self.in_flight -= 1
+
+        prompt = payload.get("prompt", "")
+        output = prompt if self.response is None else self.response
+        self.stats["ok"] += 1
+        return 200, {"output": output, "usage": {"input_chars": len(prompt), "latency_ms": round(delay_ms, 1)}}, {}
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, output: str) -> bool:
+        """Writes output as a chunked body; returns False if the client hung up mid-stream."""
+        self.stats["streamed"] += 1
+        writer.write(_encode_head(200, {"Transfer-Encoding": "chunked"}))
+        data = output.encode("utf-8")
+        step = max(1, self.chunk_chars)
+        for start in range(0, len(data), step):
+            if reader.at_eof():
+                self.stats["aborted"] += 1
+                return False
+            chunk = data[start:start + step]
+            writer.write(f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n")
+            await writer.drain()
+            await asyncio.sleep(self.chunk_delay_ms / 1000.0)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return True
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    body = await reader.readexactly(int(headers.get("content-length", "0")))
+    return json.loads(body) if body else {}
+
+
+def _encode_response(status: int, body: Dict[str, Any], headers: Dict[str, str]) -> bytes:
+    raw = json.dumps(body).encode("utf-8")
+    return _encode_head(status, {"Content-Type": "application/json", "Content-Length": str(len(raw)), **headers}) + raw
+
+
+def _encode_head(status: int, headers: Dict[str, str]) -> bytes:
+    reason = {200: "OK", 429: "Too Many Requests"}.get(status, "Error")
+    lines = [f"HTTP/1.1 {status} {reason}", "Connection: keep-alive"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local mock LLM provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency-ms", dest="latency_ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", dest="jitter_ms", type=float, default=50.0)
+    parser.add_argument("--rate-429", dest="rate_429", type=float, default=0.0, help="Probability of a random 429")
+    parser.add_argument("--max-in-flight", dest="max_in_flight", type=int, help="429 above this many concurrent requests")
+    parser.add_argument("--retry-after-s", dest="retry_after_s", type=float, default=1.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--response-file", dest="response_file", help="Serve this file's text instead of echoing the prompt")
+    parser.add_argument("--chunk-chars", dest="chunk_chars", type=int, default=32, help="Bytes per streamed chunk")
+    parser.add_argument("--chunk-delay-ms", dest="chunk_delay_ms", type=float, default=10.0)
+    args = parser.parse_args()
+    options = vars(args)
+    response_file = options.pop("response_file")
+    if response_file:
+        with open(response_file, "r", encoding="utf-8") as f:
+            options["response"] = f.read()
+
+    async def serve() -> None:
+        provider = await MockProvider(**options).start()
+        print(f"mock provider listening on {provider.url}", flush=True)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Per-request model selection and fallback cascade over the models in models.yaml.
+
+    llm:
+      model: fast                       # default model (no routing)
+      routing:
+        enabled: true
+        cascade: [fast, large]          # cheapest / fastest first
+        escalate_on: [guardrail, error] # when to move to the next model
+        latency_slo_ms: 30000           # skip a model whose rolling p95 is above this
+        max_error_rate: 0.25            # ... or whose rolling error rate is above this
+        window: 200                     # calls per model in the rolling window
+        min_samples: 20                 # no health-based skipping before this many calls
+        max_input_tokens: {fast: 30000} # route bigger prompts past a model
+        sections:                       # per-section cascades
+          key_credit_considerations: {cascade: [large]}
+
+plan() picks the cascade for one request: the section's cascade, minus models the
+prompt does not fit (context window - max_output_tokens, or max_input_tokens),
+minus models that currently break the latency SLO or error budget (unless that
+would leave nothing). Runtime then calls the models in order and escalates when
+the output fails the section's guardrail / schema checks or the call errors.
+
+Latency and errors are observed in-process (Runtime reports every provider call;
+cache hits are not counted), so the stats reflect this process's traffic.
+"""
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+ESCALATE_REASONS = ("guardrail", "error")
+
+
+class RoutePlan(NamedTuple):
+    models: Tuple[str, ...]  # call order
+    skipped: Dict[str, str]  # model -> why it is not in the cascade
+
+
+class ModelStats:
+    """Rolling window of one model's recent provider calls."""
+
+    __slots__ = ("latencies", "outcomes", "escalations", "calls")
+
+    def __init__(self, window: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=window)  # seconds, successful calls
+        self.outcomes: Deque[bool] = deque(maxlen=window)  # True = call succeeded
+        self.escalations: Deque[bool] = deque(maxlen=window)  # True = output failed its checks
+        self.calls = 0
+
+    def p95_ms(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))] * 1000.0
+
+    def error_rate(self) -> Optional[float]:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else None
+
+    def escalation_rate(self) -> Optional[float]:
+        return self.escalations.count(True) / len(self.escalations) if self.escalations else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95, errors, escalations = self.p95_ms(), self.error_rate(), self.escalation_rate()
+        return {
+            "calls": self.calls,
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+            "error_rate": round(errors, 4) if errors is not None else None,
+            "escalation_rate": round(escalations, 4) if escalations is not None else None,
+        }
+
+
+class ModelRouter:
+    def __init__(self, config: Dict[str, Any]):
+        llm_cfg = config.get("llm", {}) or {}
+        routing_cfg = llm_cfg.get("routing", {}) or {}
+        models_cfg = config.get("models_cfg", {}) or {}
+        self.models: Dict[str, Any] = models_cfg.get("models", {}) or {}
+
+        self.default_model: Optional[str] = llm_cfg.get("model") or models_cfg.get("default_model")
+        self.enabled = bool(routing_cfg.get("enabled", False))
+        self.cascade: Tuple[str, ...] = self._cascade(routing_cfg.get("cascade"), "llm.routing.cascade")
+        self.section_cascades: Dict[str, Tuple[str, ...]] = {
+            section: self._cascade((cfg or {}).get("cascade"), f"llm.routing.sections.{section}.cascade")
+            for section, cfg in (routing_cfg.get("sections", {}) or {}).items()
+        }
+
+        self.escalate_on = frozenset(routing_cfg.get("escalate_on", ESCALATE_REASONS) or ())
+        unknown = sorted(self.escalate_on.difference(ESCALATE_REASONS))
+        if unknown:
+            raise ValueError(f"llm.routing.escalate_on: unknown reason(s) {', '.join(unknown)}. Allowed: {', '.join(ESCALATE_REASONS)}")
+
+        slo = routing_cfg.get("latency_slo_ms")
+        self.latency_slo_ms: Optional[float] = float(slo) if slo is not None else None
+        self.max_error_rate = float(routing_cfg.get("max_error_rate", 0.25))
+        self.min_samples = int(routing_cfg.get("min_samples", 20))
+        self.max_input_tokens: Dict[str, int] = {
+            name: self._input_limit(name, (routing_cfg.get("max_input_tokens", {}) or {}).get(name))
+            for name in set(self.cascade).union(*self.section_cascades.values())
+        }
+
+        window = int(routing_cfg.get("window", 200))
+        self.stats: Dict[str, ModelStats] = {name: ModelStats(window) for name in self.max_input_tokens}
+        self._lock = threading.Lock()  # observe() runs on the event loop and in batch worker threads
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ModelRouter":
+        return cls(config)
+
+    def _cascade(self, names: Optional[List[str]], where: str) -> Tuple[str, ...]:
+        if not names:
+            return (self.default_model,) if self.default_model else ()
+        unknown = [n for n in names if n not in self.models]
+        if unknown:
+            raise ValueError(f"{where} references models not in models.yaml: {', '.join(unknown)}")
+        return tuple(names)
+
+    def _input_limit(self, name: str, configured: Optional[int]) -> Optional[int]:
+        if configured is not None:
+            return int(configured)
+        entry = self.models.get(name, {}) or {}
+        window = entry.get("context_window_tokens")
+        if window is None:
+            return None
+        return int(window) - int(entry.get("max_output_tokens", 0) or 0)
+
+    def cascade_for(self, section: str) -> Tuple[str, ...]:
+        """The configured cascade of section (before size / health filtering)."""
+        return self.section_cascades.get(section, self.cascade)
+
+    def plan(self, section: str, input_tokens: int) -> RoutePlan:
+        candidates = self.cascade_for(section)
+        skipped: Dict[str, str] = {}
+
+        fitting = []
+        for name in candidates:
+            limit = self.max_input_tokens.get(name)
+            if limit is not None and input_tokens > limit:
+                skipped[name] = f"prompt_too_large ({input_tokens} > {limit} tokens)"
+            else:
+                fitting.append(name)
+        if not fitting:
+            raise ValueError(f"A prompt of ~{input_tokens} tokens fits none of the models in the cascade ({', '.join(candidates)})")
+
+        healthy = []
+        with self._lock:
+            for name in fitting:
+                reason = self._unhealthy(name)
+                if reason:
+                    skipped[name] = reason
+                else:
+                    healthy.append(name)
+        if not healthy:
+            # Everything is degraded: better a slow answer than none
+            for name in fitting:
+                skipped.pop(name, None)
+            healthy = fitting
+        return RoutePlan(tuple(healthy), skipped)
+
+    def _unhealthy(self, name: str) -> Optional[str]:
+        stats = self.stats.get(name)
+        if stats is None or len(stats.outcomes) < self.min_samples:
+            return None
+        errors = stats.error_rate()
+        if errors is not None and errors > self.max_error_rate:
+            return f"error_rate ({errors:.2f} > {self.max_error_rate:.2f})"
+        p95 = stats.p95_ms()
+        if self.latency_slo_ms is not None and p95 is not None and p95 > self.latency_slo_ms:
+            return f"latency_slo (p95 {p95:.0f}ms > {self.latency_slo_ms:.0f}ms)"
+        return None
+
+    def observe(self, model: str, latency_s: float, ok: bool, escalated: bool = False) -> None:
+        """One provider call: its latency, whether it succeeded, and whether its output was escalated."""
+        stats = self.stats.get(model)
+        if stats is None:
+            return
+        with self._lock:
+            stats.calls += 1
+            stats.outcomes.append(ok)
+            if ok:
+                stats.latencies.append(latency_s)
+                stats.escalations.append(escalated)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in self.stats.items()}
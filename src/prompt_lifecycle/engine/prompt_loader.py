@@ -1,5 +1,161 @@
+import hashlib
 import os
-from typing import Any, Dict, List, Tuple
+import re
+import string
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from prompt_lifecycle.telemetry.cost_estimator import TokenBudget
+
+
+_FORMATTER = string.Formatter()
+
+# "{issuer.name}" / "{kpis[0]}" both depend on the root variable before the first "." or "["
+_ROOT_FIELD = re.compile(r"[^.\[]*")
+
+
+class CompiledTemplate:
+    """
+    A template parsed once with string.Formatter.parse.
+
+    parts is a list of (literal_text, field_name, format_spec, conversion) tuples,
+    exactly as Formatter.parse yields them. Rendering walks the parts instead of
+    re-parsing the format string on every call.
+    """
+
+    __slots__ = ("path", "mtime_ns", "size", "sha256", "parts", "required_variables")
+
+    def __init__(self, path: str, text: str, mtime_ns: int, size: int):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.sha256 = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self.parts, self.required_variables = self._compile(path, text)
+
+    @staticmethod
+    def _compile(path: str, text: str) -> Tuple[Tuple[Tuple[str, Optional[str], str, Optional[str]], ...], FrozenSet[str]]:
+        parts = []
+        required = set()
+        try:
+            parsed = list(_FORMATTER.parse(text))
+        except ValueError as exc:
+            raise ValueError(f"Template is not a valid format string ({exc}): {path}") from None
+
+        for literal, field_name, format_spec, conversion in parsed:
+            if field_name is not None:
+                root = _ROOT_FIELD.match(field_name).group(0)
+                if not root or root.isdigit():
+                    raise ValueError(f"Template uses a positional field '{{{field_name}}}'; only named fields are supported: {path}")
+                required.add(root)
+                # Nested fields inside a format spec ("{x:{width}}") are also required
+                for _, nested, _, _ in _FORMATTER.parse(format_spec or ""):
+                    if nested:
+                        required.add(_ROOT_FIELD.match(nested).group(0))
+            parts.append((literal, field_name, format_spec or "", conversion))
+
+        return tuple(parts), frozenset(required)
+
+    def missing_variables(self, variables: Dict[str, Any]) -> List[str]:
+        return sorted(v for v in self.required_variables if v not in variables)
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        out: List[str] = []
+        for literal, field_name, format_spec, conversion in self.parts:
+            if literal:
+                out.append(literal)
+            if field_name is None:
+                continue
+            obj, _ = _FORMATTER.get_field(field_name, (), variables)
+            if conversion:
+                obj = _FORMATTER.convert_field(obj, conversion)
+            if "{" in format_spec:
+                format_spec = _FORMATTER.vformat(format_spec, (), variables)
+            out.append(format(obj, format_spec))
+        return "".join(out)
+
+
+class TemplateCache:
+    """
+    Process-wide cache of CompiledTemplate objects keyed by resolved path.
+
+    validation:
+      - "stat": an entry is fresh while the file's (mtime_ns, size) are unchanged (default)
+      - "hash": re-read the file and compare sha256; skips only the parse on a hit
+      - "pinned": an entry, once compiled, is used as is (no stat); for caches that
+        belong to one config snapshot (see Runtime pin_templates)
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, CompiledTemplate] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, validation: str = "stat") -> Tuple[CompiledTemplate, bool]:
+        """Returns (compiled_template, was_hit)."""
+        entry = self._entries.get(path)
+        if entry is not None and validation == "pinned":
+            self._count(hit=True)
+            return entry, True
+
+        st = os.stat(path)
+
+        if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            if validation != "hash":
+                self._count(hit=True)
+                return entry, True
+
+            text = self._read(path)
+            if hashlib.sha256(text.encode("utf-8")).hexdigest() == entry.sha256:
+                self._count(hit=True)
+                return entry, True
+        else:
+            text = self._read(path)
+
+        compiled = CompiledTemplate(path, text, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            self._entries[path] = compiled
+        self._count(hit=False)
+        return compiled, False
+
+    def seed(self, compiled: Iterable[CompiledTemplate]) -> None:
+        """Adds precompiled templates (e.g. from a config bundle) without overwriting live entries."""
+        with self._lock:
+            for entry in compiled:
+                self._entries.setdefault(entry.path, entry)
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @staticmethod
+    def _read(path: str) -> str:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# One cache per process: every PromptLoader (and every Runtime) shares compiled templates.
+TEMPLATE_CACHE = TemplateCache()
+
+# Segment scopes. "static" content is identical for every issuer routed the same way
+# (base, industry, KPI pack, section version); "request" content varies per call.
+SCOPE_STATIC = "static"
+SCOPE_REQUEST = "request"
+
+SEGMENT_SEPARATOR = "\n\n"
 
 
 class PromptLoader:
@@ -11,36 +167,73 @@ class PromptLoader:
 
     We return:
       (assembled_prompt_text, manifest)
+
+    Segments carry a "scope" (static | request, default static). Static segments
+    are always emitted first, in router order, so every prompt that shares them
+    starts with a byte-identical prefix that provider-side prompt caching can
+    reuse. The manifest reports that prefix's sha256 and length.
+
+    Templates come from the process-wide TEMPLATE_CACHE, so each file is read and
+    parsed once and only re-compiled when it changes on disk.
+
+    Every segment is token-counted, and the prompt is held to the configured
+    TokenBudget (see telemetry/cost_estimator.py): over-budget prompts have their
+    lowest-priority segments trimmed, and the manifest records what was cut.
     """
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        cache: Optional[TemplateCache] = None,
+        budget: Optional[TokenBudget] = None,
+    ):
         prompts_cfg = config.get("prompts", {}) or {}
         self.base_dir = prompts_cfg.get("base_dir", "config/prompts")
+        self.cache_validation = prompts_cfg.get("cache_validation", "stat")
+        if self.cache_validation not in ("stat", "hash"):
+            raise ValueError(f"prompts.cache_validation must be 'stat' or 'hash', got '{self.cache_validation}'")
+        self.cache = cache if cache is not None else TEMPLATE_CACHE
+        self.budget = budget if budget is not None else TokenBudget.from_config(config)
 
-    def _resolve(self, template_path: str) -> str:
+    def resolve(self, template_path: str) -> str:
         return template_path if os.path.isabs(template_path) else os.path.join(self.base_dir, template_path)
 
-    def _read(self, path: str) -> str:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+    def compile(self, template_path: str) -> CompiledTemplate:
+        compiled, _ = self.cache.get(self.resolve(template_path), self.cache_validation)
+        return compiled
 
-    def _render(self, template_text: str, variables: Dict[str, Any], resolved_path: str) -> str:
-        try:
-            return template_text.format(**variables)
-        except KeyError as exc:
-            missing = str(exc).strip("'")
-            raise KeyError(f"Template is missing variable '{missing}': {resolved_path}") from None
+    def required_variables(self, template_path: str) -> List[str]:
+        """Variables a template needs, known as soon as it is loaded (before any render)."""
+        return sorted(self.compile(template_path).required_variables)
 
-    def load(self, prompt_spec: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    def load(
+        self,
+        prompt_spec: Dict[str, Any],
+        timings: Optional[Dict[str, int]] = None,
+        rendered: Optional[Dict[Tuple[str, str, str], str]] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        timings, if given, receives {"read_ns", "render_ns"} (pass 1 vs passes 2-3).
+
+        rendered, if given, memoizes static segments across load() calls that share
+        it (e.g. every section of one issuer): a static segment with the same name
+        and template content is rendered once and reused. Keep it short-lived, one
+        dict per issuer / report; request segments are never memoized.
+        """
+        started_ns = time.perf_counter_ns()
         segments: List[Dict[str, Any]] = prompt_spec.get("segments", []) or []
         if not segments:
             raise ValueError("prompt_spec.segments is required and cannot be empty")
 
         router_manifest = prompt_spec.get("manifest", {}) or {}
 
-        rendered_parts: List[str] = []
-        seg_manifest: List[Dict[str, Any]] = []
+        # Static content first (stable sort keeps router order within each scope)
+        segments = sorted(segments, key=lambda seg: seg.get("scope", SCOPE_STATIC) != SCOPE_STATIC)
 
+        # Pass 1: compile every template and check variables before rendering anything,
+        # so a missing variable fails the whole prompt up front.
+        compiled_segments: List[Tuple[Dict[str, Any], str, CompiledTemplate, Dict[str, Any]]] = []
+        hits = misses = 0
         for seg in segments:
             name = seg.get("name") or "unnamed"
             template_path = seg.get("template_path")
@@ -49,27 +242,99 @@ class PromptLoader:
 
             variables = seg.get("variables", {}) or {}
 
-            resolved_path = self._resolve(template_path)
-            template_text = self._read(resolved_path)
-            text = self._render(template_text, variables, resolved_path)
+            resolved_path = self.resolve(template_path)
+            compiled, hit = self.cache.get(resolved_path, self.cache_validation)
+            if hit:
+                hits += 1
+            else:
+                misses += 1
+
+            missing = compiled.missing_variables(variables)
+            if missing:
+                raise KeyError(f"Template is missing variable '{missing[0]}': {resolved_path}")
+
+            compiled_segments.append((seg, resolved_path, compiled, variables))
+
+        read_done_ns = time.perf_counter_ns()
+
+        # Pass 2: render from the compiled form
+        names = [seg.get("name") or "unnamed" for seg, _, _, _ in compiled_segments]
+        scopes = [seg.get("scope", SCOPE_STATIC) for seg, _, _, _ in compiled_segments]
+        reused = 0
+        if rendered is None:
+            texts = [compiled.render(variables) for _, _, compiled, variables in compiled_segments]
+        else:
+            texts = []
+            for name, scope, (_, resolved_path, compiled, variables) in zip(names, scopes, compiled_segments):
+                if scope != SCOPE_STATIC:
+                    texts.append(compiled.render(variables))
+                    continue
+                # Static names encode what they were routed from (base / industry /
+                # kpi_pack:<id> / section@version), the sha pins the template content
+                key = (name, resolved_path, compiled.sha256)
+                text = rendered.get(key)
+                if text is None:
+                    text = rendered[key] = compiled.render(variables)
+                else:
+                    reused += 1
+                texts.append(text)
 
+        # Pass 3: token accounting + budget (may truncate inputs / drop low-priority segments)
+        kept, tokens, trimmed = self.budget.apply(names, scopes, texts)
+        trim_actions = {t["name"]: t["action"] for t in trimmed}
+
+        rendered_parts: List[str] = []
+        seg_manifest: List[Dict[str, Any]] = []
+        static_count = 0
+
+        for (seg, resolved_path, compiled, variables), name, scope, text, n_tokens in zip(
+            compiled_segments, names, scopes, kept, tokens
+        ):
+            entry = {
+                "name": name,
+                "template_path": seg["template_path"],
+                "resolved_path": resolved_path,
+                "template_sha256": compiled.sha256,
+                "variables_keys": sorted(variables.keys()),
+                "scope": scope,
+                "chars": len(text) if text is not None else 0,
+                "tokens": n_tokens,
+            }
+            if name in trim_actions:
+                entry["trimmed"] = trim_actions[name]
+            seg_manifest.append(entry)
+
+            if text is None:
+                continue
+            if scope == SCOPE_STATIC:
+                static_count += 1
             rendered_parts.append(text)
-            seg_manifest.append(
-                {
-                    "name": name,
-                    "template_path": template_path,
-                    "resolved_path": resolved_path,
-                    "variables_keys": sorted(variables.keys()),
-                    "chars": len(text),
-                }
-            )
-
-        assembled = "\n\n".join(rendered_parts)
+
+        assembled = SEGMENT_SEPARATOR.join(rendered_parts)
+
+        # The cacheable prefix includes the separator that follows it, so it is a
+        # literal prefix of every prompt that shares the same static segments.
+        prefix = SEGMENT_SEPARATOR.join(rendered_parts[:static_count])
+        if 0 < static_count < len(rendered_parts):
+            prefix += SEGMENT_SEPARATOR
 
         manifest = {
             "router_manifest": router_manifest,
             "segments": seg_manifest,
             "assembled_chars": len(assembled),
+            "prefix": {
+                "hash": hashlib.sha256(prefix.encode("utf-8")).hexdigest(),
+                "segments": static_count,
+                "chars": len(prefix),
+                "tokens_est": sum(n for n, scope, text in zip(tokens, scopes, kept) if scope == SCOPE_STATIC and text is not None),
+            },
+            "tokens": {"input": sum(tokens), "budget": self.budget.max_input_tokens, "trimmed": trimmed},
+            "template_cache": {"hits": hits, "misses": misses},
         }
+        if rendered is not None:
+            manifest["shared_segments"] = {"reused": reused}
 
+        if timings is not None:
+            timings["read_ns"] = read_done_ns - started_ns
+            timings["render_ns"] = time.perf_counter_ns() - read_done_ns
         return assembled, manifest
@@ -0,0 +1,322 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+CACHE_MODES = ("readwrite", "read", "write", "bypass")
+
+# Settles an in-flight future whose leader was interrupted: followers retry the lookup
+_RELEASED: Any = object()
+
+
+def cache_key(prompt_text: str, model_params: Dict[str, Any]) -> str:
+    """sha256 over the canonical model params + the exact assembled prompt text."""
+    h = hashlib.sha256()
+    h.update(json.dumps(model_params, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt_text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class MemoryLRU:
+    """In-process LRU tier with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024, ttl_s: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl_s is not None and time.time() - stored_at > self.ttl_s:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str, stored_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, stored_at if stored_at is not None else time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteStore:
+    """
+    Persistent tier: one SQLite table, WAL mode, TTL on read, and size-bounded
+    eviction (least recently used first) every `evict_every` writes.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, ttl_s: Optional[float] = None, evict_every: int = 256):
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.evict_every = evict_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_s is not None and now - row[1] > self.ttl_s:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            return row[0], row[1]
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Caller holds the lock
+        if self.ttl_s is not None:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_s,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU -> SQLite) cache of LLM outputs keyed by cache_key().
+
+    mode:
+      readwrite: serve hits and store misses
+      read:      serve hits, never store
+      write:     always call the model, store the result (refreshes entries)
+      bypass:    no cache at all
+
+    Identical concurrent requests are coalesced single-flight: only the first
+    caller hits the model, the others wait for its result ("coalesced").
+    The in-flight table holds concurrent.futures.Future objects, so coalescing
+    works across threads and event loops alike.
+    A leader that is cancelled hands over to a follower instead of failing them.
+    """
+
+    def __init__(
+        self,
+        mode: str = "readwrite",
+        memory_entries: int = 1024,
+        disk_path: Optional[str] = None,
+        ttl_s: Optional[float] = None,
+        max_disk_entries: int = 100_000,
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"response cache mode must be one of {', '.join(CACHE_MODES)}, got '{mode}'")
+        self.mode = mode
+        self.memory = MemoryLRU(memory_entries, ttl_s)
+        self.disk = SQLiteStore(disk_path, max_disk_entries, ttl_s) if disk_path and mode != "bypass" else None
+
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "coalesced": 0, "bypass": 0}
+
+    @classmethod
+    def from_config(cls, cache_cfg: Dict[str, Any], mode: Optional[str] = None) -> "ResponseCache":
+        return cls(
+            mode=mode or cache_cfg.get("mode", "readwrite"),
+            memory_entries=int(cache_cfg.get("memory_entries", 1024)),
+            disk_path=cache_cfg.get("disk_path"),
+            ttl_s=cache_cfg.get("ttl_s"),
+            max_disk_entries=int(cache_cfg.get("max_disk_entries", 100_000)),
+        )
+
+    @property
+    def readable(self) -> bool:
+        return self.mode in ("readwrite", "read")
+
+    @property
+    def writable(self) -> bool:
+        return self.mode in ("readwrite", "write")
+
+    def lookup(self, key: str) -> Tuple[Optional[str], str]:
+        """Returns (value, status) where status is hit:memory | hit:disk | miss."""
+        value = self._memory_lookup(key)
+        if value is not None:
+            return value, "hit:memory"
+        return self._disk_lookup(key)
+
+    async def _alookup(self, key: str) -> Tuple[Optional[str], str]:
+        """lookup() for the async path: SQLite is blocking I/O, so it runs in the default executor."""
+        value = self._memory_lookup(key)
+        if value is not None:
+            return value, "hit:memory"
+        if self.disk is None:
+            return None, "miss"
+        return await asyncio.get_running_loop().run_in_executor(None, self._disk_lookup, key)
+
+    def _memory_lookup(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.stats["hits_memory"] += 1
+        return value
+
+    def _disk_lookup(self, key: str) -> Tuple[Optional[str], str]:
+        if self.disk is not None:
+            found = self.disk.get(key)
+            if found is not None:
+                value, created = found
+                self.memory.put(key, value, stored_at=created)
+                self.stats["hits_disk"] += 1
+                return value, "hit:disk"
+        return None, "miss"
+
+    def store(self, key: str, value: str) -> None:
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """Returns (future, is_leader)."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut, False
+            fut = Future()
+            self._inflight[key] = fut
+            return fut, True
+
+    def _settle(self, key: str, fut: Future, value: Optional[str] = None, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(value)
+
+    async def aget_or_call(self, key: str, call: Callable[[], Awaitable[str]]) -> Tuple[str, str]:
+        """
+        A leader whose call fails settles every follower with its error. A leader
+        that is interrupted instead (cancelled: lost hedge race, experiment stop,
+        client gone) only releases its claim; its followers retry and one of them
+        takes over as leader.
+        """
+        if self.mode == "bypass":
+            self.stats["bypass"] += 1
+            return await call(), "bypass"
+
+        while True:
+            if self.readable:
+                value, status = await self._alookup(key)
+                if value is not None:
+                    return value, status
+
+            fut, leader = self._claim(key)
+            if not leader:
+                # shield: a cancelled follower must not cancel the shared future
+                value = await asyncio.shield(asyncio.wrap_future(fut))
+                if value is _RELEASED:
+                    continue  # the leader was interrupted: try to take over
+                self.stats["coalesced"] += 1
+                return value, "coalesced"
+            try:
+                if self.readable:
+                    # The previous leader may have stored it between our lookup and the claim
+                    value, status = await self._alookup(key)
+                    if value is not None:
+                        self._settle(key, fut, value=value)
+                        return value, status
+
+                self.stats["misses"] += 1
+                value = await call()
+            except Exception as exc:
+                self._settle(key, fut, exc=exc)
+                raise
+            except BaseException:
+                self._settle(key, fut, value=_RELEASED)
+                raise
+            # Memory first and followers settled before the (executor) disk write, so
+            # nothing waits on SQLite and a cancellation there strands nobody
+            if self.writable:
+                self.memory.put(key, value)
+            self._settle(key, fut, value=value)
+            if self.writable and self.disk is not None:
+                await asyncio.get_running_loop().run_in_executor(None, self.disk.put, key, value)
+            return value, "miss"
+
+    def get_or_call(self, key: str, call: Callable[[], str]) -> Tuple[str, str]:
+        """Sync twin of aget_or_call for callers without an event loop."""
+        if self.mode == "bypass":
+            self.stats["bypass"] += 1
+            return call(), "bypass"
+
+        while True:
+            if self.readable:
+                value, status = self.lookup(key)
+                if value is not None:
+                    return value, status
+
+            fut, leader = self._claim(key)
+            if not leader:
+                value = fut.result()
+                if value is _RELEASED:
+                    continue  # the leader was interrupted: try to take over
+                self.stats["coalesced"] += 1
+                return value, "coalesced"
+            if self.readable:
+                # The previous leader may have stored it between our lookup and the claim
+                value, status = self.lookup(key)
+                if value is not None:
+                    self._settle(key, fut, value=value)
+                    return value, status
+
+            self.stats["misses"] += 1
+            try:
+                value = call()
+            except Exception as exc:
+                self._settle(key, fut, exc=exc)
+                raise
+            except BaseException:
+                self._settle(key, fut, value=_RELEASED)
+                raise
+            if self.writable:
+                self.store(key, value)
+            self._settle(key, fut, value=value)
+            return value, "miss"
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
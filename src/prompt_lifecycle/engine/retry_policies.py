@@ -1 +1,455 @@
-# retry logic here
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from prompt_lifecycle.engine.llm_client import LLMTimeoutError, ProviderError
+
+# HTTP statuses worth retrying; 429 and timeouts also shrink the concurrency window
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at rate_per_min / 60 per second.
+
+    acquire() reserves tokens immediately (the balance may go negative) and sleeps
+    for the time it takes to pay that debt back, so concurrent waiters queue up
+    fairly without a lock held across the sleep. Safe across threads and loops.
+    """
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None):
+        if rate_per_min <= 0:
+            raise ValueError("rate_per_min must be > 0")
+        self.rate_per_s = rate_per_min / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_min)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_s)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Takes amount tokens and returns how long (seconds) the caller must wait."""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate_per_s
+
+    def try_take(self, amount: float) -> bool:
+        """Takes amount tokens only if they are available right now (never goes into debt)."""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+    def give_back(self, amount: float) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(float(amount), self.capacity))
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        wait_s = self.reserve(amount)
+        if wait_s > 0:
+            await asyncio.sleep(wait_s)
+        return wait_s
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class RateLimiter:
+    """Requests/min and tokens/min buckets, sized from models.yaml `limits:`."""
+
+    def __init__(self, requests_per_min: Optional[float] = None, tokens_per_min: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_min) if requests_per_min else None
+        self.tokens = TokenBucket(tokens_per_min) if tokens_per_min else None
+        self.waited_s = 0.0
+
+    async def acquire(self, est_tokens: int) -> None:
+        waited = 0.0
+        if self.requests is not None:
+            waited += await self.requests.acquire(1)
+        if self.tokens is not None:
+            waited += await self.tokens.acquire(est_tokens)
+        self.waited_s += waited
+
+    def try_acquire(self, est_tokens: int) -> bool:
+        """Non-blocking acquire (for hedges): both buckets or neither."""
+        if self.requests is not None and not self.requests.try_take(1):
+            return False
+        if self.tokens is not None and not self.tokens.try_take(est_tokens):
+            if self.requests is not None:
+                self.requests.give_back(1)
+            return False
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests_available": round(self.requests.available(), 2) if self.requests else None,
+            "tokens_available": round(self.tokens.available(), 2) if self.tokens else None,
+            "limiter_wait_s": round(self.waited_s, 3),
+        }
+
+
+class BackoffPolicy:
+    """Exponential backoff with full jitter; a provider Retry-After is treated as a floor."""
+
+    def __init__(self, base_delay_s: float = 0.5, max_delay_s: float = 30.0, max_attempts: int = 5, seed: Optional[int] = None):
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.max_attempts = max_attempts
+        self._rng = random.Random(seed)
+
+    def delay(self, attempt: int, retry_after_s: Optional[float] = None) -> float:
+        """attempt is 1-based: the delay before attempt+1."""
+        ceiling = min(self.max_delay_s, self.base_delay_s * (2 ** (attempt - 1)))
+        delay = self._rng.uniform(0, ceiling)
+        if retry_after_s is not None:
+            delay = max(delay, min(retry_after_s, self.max_delay_s))
+        return delay
+
+
+class AIMDConcurrency:
+    """
+    Additive-increase / multiplicative-decrease window on concurrent calls.
+
+    - success: limit grows by 1 per `limit` successes (about +1 per round trip)
+    - 429/timeout: limit *= decrease_factor (at most once per cooldown_s, so one
+      burst of throttles counts as one congestion signal)
+
+    Waiters are (loop, future) pairs woken with call_soon_threadsafe, so one
+    window can be shared by the client's background loop and caller loops.
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 64,
+        decrease_factor: float = 0.5,
+        cooldown_s: float = 0.25,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.cooldown_s = cooldown_s
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return
+            fut = loop.create_future()
+            self._waiters.append((loop, fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                if (loop, fut) in self._waiters:
+                    self._waiters.remove((loop, fut))
+                else:
+                    # We were handed a slot just as we got cancelled: give it back
+                    self.in_flight -= 1
+                    self._wake()
+            raise
+
+    def try_acquire(self) -> bool:
+        """Takes a slot only if one is free right now and nobody is queued for it."""
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def _wake(self) -> None:
+        # Caller holds the lock
+        while self._waiters and self.in_flight < int(self.limit):
+            loop, fut = self._waiters.popleft()
+            self.in_flight += 1
+            loop.call_soon_threadsafe(_resolve, fut)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def on_congestion(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_decrease >= self.cooldown_s:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                self._last_decrease = now
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class RetryScheduler:
+    """
+    Wraps one provider call with: rate limiting -> AIMD window -> (optional hedge) -> retry.
+
+    hedge_after_s: if set, a duplicate request is started when the first has not
+    answered after that many seconds ("auto" = rolling p95 of observed latency);
+    whichever finishes first wins and the other is cancelled. The duplicate is
+    charged like any request (one request + est_tokens from the limiter, one AIMD
+    slot) and is skipped when either is not available right away: a hedge is never
+    worth going over quota for.
+    """
+
+    def __init__(
+        self,
+        limiter: Optional[RateLimiter] = None,
+        backoff: Optional[BackoffPolicy] = None,
+        concurrency: Optional[AIMDConcurrency] = None,
+        hedge_after_s: Any = None,
+    ):
+        self.limiter = limiter or RateLimiter()
+        self.backoff = backoff or BackoffPolicy()
+        self.concurrency = concurrency or AIMDConcurrency()
+        self.hedge_after_s = hedge_after_s
+
+        self._latencies: Deque[float] = deque(maxlen=512)
+        self._completions: Deque[float] = deque(maxlen=4096)
+        self.counters = {
+            "calls": 0,
+            "attempts": 0,
+            "successes": 0,
+            "failures": 0,
+            "throttled": 0,
+            "timeouts": 0,
+            "retries": 0,
+            "hedges": 0,
+            "hedges_skipped": 0,
+            "hedge_wins": 0,
+        }
+
+    @classmethod
+    def from_config(cls, llm_cfg: Dict[str, Any], model_cfg: Optional[Dict[str, Any]] = None) -> "RetryScheduler":
+        retry_cfg = llm_cfg.get("retry", {}) or {}
+        conc_cfg = llm_cfg.get("concurrency", {}) or {}
+        limits = (model_cfg or {}).get("limits", {}) or {}
+        return cls(
+            limiter=RateLimiter(limits.get("requests_per_min"), limits.get("tokens_per_min")),
+            backoff=BackoffPolicy(
+                base_delay_s=float(retry_cfg.get("base_delay_s", 0.5)),
+                max_delay_s=float(retry_cfg.get("max_delay_s", 30.0)),
+                max_attempts=int(retry_cfg.get("max_attempts", 5)),
+            ),
+            concurrency=AIMDConcurrency(
+                initial=int(conc_cfg.get("initial", 8)),
+                minimum=int(conc_cfg.get("min", 1)),
+                maximum=int(conc_cfg.get("max", 64)),
+                cooldown_s=float(conc_cfg.get("cooldown_s", 0.25)),
+            ),
+            hedge_after_s=retry_cfg.get("hedge_after_s"),
+        )
+
+    async def run(self, send: Callable[[], Awaitable[str]], est_tokens: int = 0) -> str:
+        self.counters["calls"] += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            self.counters["attempts"] += 1
+            await self.limiter.acquire(est_tokens)
+            await self.concurrency.acquire()
+            started = time.monotonic()
+            try:
+                result = await self._send(send, est_tokens)
+            except (ProviderError, LLMTimeoutError) as exc:
+                delay = self._retry_delay(exc, attempt)
+            else:
+                self._record_success(started)
+                return result
+            finally:
+                self.concurrency.release()
+
+            await asyncio.sleep(delay)
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[str]], est_tokens: int = 0) -> AsyncIterator[str]:
+        """
+        Streaming twin of run(): same limiter, AIMD window and retry policy, but an
+        attempt is only retried if it failed before its first chunk (after that the
+        caller has already consumed output). Streams are never hedged.
+        Closing this iterator closes the underlying stream, aborting the generation.
+        """
+        self.counters["calls"] += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            self.counters["attempts"] += 1
+            await self.limiter.acquire(est_tokens)
+            await self.concurrency.acquire()
+            started = time.monotonic()
+            chunks = open_stream()
+            first_chunk = False
+            try:
+                async for chunk in chunks:
+                    first_chunk = True
+                    yield chunk
+            except (ProviderError, LLMTimeoutError) as exc:
+                if first_chunk:
+                    self.counters["failures"] += 1
+                    raise
+                delay = self._retry_delay(exc, attempt)
+            else:
+                self._record_success(started)
+                return
+            finally:
+                await chunks.aclose()
+                self.concurrency.release()
+
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, exc: Exception, attempt: int) -> float:
+        """Classifies a failed attempt: returns the backoff delay, or re-raises if it should not be retried."""
+        retry_after = None
+        if isinstance(exc, LLMTimeoutError):
+            self.counters["timeouts"] += 1
+            self.concurrency.on_congestion()
+        elif isinstance(exc, ProviderError) and exc.status == 429:
+            self.counters["throttled"] += 1
+            self.concurrency.on_congestion()
+            retry_after = exc.retry_after
+        elif not isinstance(exc, ProviderError) or exc.status not in RETRYABLE_STATUSES:
+            self.counters["failures"] += 1
+            raise exc
+
+        if attempt >= self.backoff.max_attempts:
+            self.counters["failures"] += 1
+            raise exc
+        self.counters["retries"] += 1
+        return self.backoff.delay(attempt, retry_after)
+
+    def _record_success(self, started: float) -> None:
+        now = time.monotonic()
+        self._latencies.append(now - started)
+        self._completions.append(now)
+        self.counters["successes"] += 1
+        self.concurrency.on_success()
+
+    async def _send(self, send: Callable[[], Awaitable[str]], est_tokens: int = 0) -> str:
+        """The caller holds the limiter token and window slot of the first copy."""
+        hedge_after = self._hedge_delay()
+        if hedge_after is None:
+            return await send()
+
+        # Every copy still pending when this returns or raises (including when the
+        # caller is cancelled mid-wait) is cancelled: none outlives run()'s slot
+        first = asyncio.ensure_future(send())
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return first.result()
+
+            if not self.concurrency.try_acquire():
+                self.counters["hedges_skipped"] += 1
+                return await first
+            if not self.limiter.try_acquire(est_tokens):
+                self.concurrency.release()
+                self.counters["hedges_skipped"] += 1
+                return await first
+
+            async def hedge() -> str:
+                try:
+                    return await send()
+                finally:
+                    self.concurrency.release()  # also when cancelled after losing the race
+
+            self.counters["hedges"] += 1
+            second = asyncio.ensure_future(hedge())
+            pending.add(second)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    if winners[0] is second:
+                        self.counters["hedge_wins"] += 1
+                    return winners[0].result()
+                if not pending:
+                    # Both copies failed: surface the original request's error
+                    raise first.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_after_s in (None, False):
+            return None
+        if self.hedge_after_s == "auto":
+            # Need some history before p95 means anything
+            if len(self._latencies) < 20:
+                return None
+            ordered = sorted(self._latencies)
+            return ordered[int(0.95 * (len(ordered) - 1))]
+        return float(self.hedge_after_s)
+
+    def throughput_rps(self, window_s: float = 60.0) -> float:
+        now = time.monotonic()
+        recent = [t for t in self._completions if now - t <= window_s]
+        if len(recent) < 2:
+            return 0.0
+        return len(recent) / max(now - recent[0], 1e-9)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters + limiter state (see LLMClient.metrics: batch stats, --profile, Prometheus)."""
+        snap: Dict[str, Any] = dict(self.counters)
+        snap.update(self.limiter.snapshot())
+        snap["concurrency_limit"] = round(self.concurrency.limit, 2)
+        snap["in_flight"] = self.concurrency.in_flight
+        snap["throughput_rps"] = round(self.throughput_rps(), 3)
+        return snap
+
+
+# snapshot() fields exported as gauges; the rest only ever grow (counters)
+SNAPSHOT_GAUGES = {
+    "requests_available": "Requests/min limiter tokens available now.",
+    "tokens_available": "Tokens/min limiter tokens available now.",
+    "concurrency_limit": "AIMD concurrency window.",
+    "in_flight": "Provider calls in flight.",
+    "throughput_rps": "Completed calls per second over the last minute.",
+}
+
+
+def prometheus_lines(namespace: str, snapshots: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Text exposition of RetryScheduler snapshots, one series per model (label model)."""
+    lines: List[str] = []
+    fields = list(dict.fromkeys(key for snap in snapshots.values() for key in snap))
+    for field in fields:
+        if field in SNAPSHOT_GAUGES:
+            name, kind, help_text = f"{namespace}_llm_{field}", "gauge", SNAPSHOT_GAUGES[field]
+        elif field == "limiter_wait_s":
+            name, kind, help_text = f"{namespace}_llm_limiter_wait_seconds_total", "counter", "Time spent waiting on the rate limiter."
+        else:
+            name, kind, help_text = f"{namespace}_llm_{field}_total", "counter", f"Scheduler {field.replace('_', ' ')}."
+        series = [(model, snap.get(field)) for model, snap in snapshots.items()]
+        series = [(model, value) for model, value in series if value is not None]
+        if not series:
+            continue
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{model="{model}"}} {value}' for model, value in series]
+    return lines
+
@@ -1,8 +1,65 @@
-from typing import Any, Dict, List, Optional, Tuple
+import json
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from prompt_lifecycle.engine.prompt_loader import SCOPE_REQUEST, SCOPE_STATIC
+
+# Section keys a caller may override per route() call
+OVERRIDE_KEYS = ("industry", "sub_industry", "prompt_version", "kpi_pack")
+
+
+def with_overrides(section_cfg: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A copy of section_cfg with the non-None OVERRIDE_KEYS of overrides applied; used
+    for per-call overrides (Router.route) and CLI ones (Runtime) alike. Overriding
+    only the industry drops the section's default sub_industry, which belongs to
+    its default industry: the new industry routes to its default KPI pack.
+    """
+    unknown = sorted(k for k in overrides if k not in OVERRIDE_KEYS and k != "section")
+    if unknown:
+        raise ValueError(f"Unsupported route overrides: {', '.join(unknown)}. Allowed: {', '.join(OVERRIDE_KEYS)}")
+
+    effective = dict(section_cfg)
+    if overrides.get("industry") is not None and overrides.get("sub_industry") is None:
+        effective.pop("sub_industry", None)
+    for key in OVERRIDE_KEYS:
+        if overrides.get(key) is not None:
+            effective[key] = overrides[key]
+    return effective
+
+
+class PackResolution(NamedTuple):
+    """One KPI pack with its prompt variables pre-rendered."""
+
+    kpi_pack: str
+    kpi_ids: Tuple[str, ...]
+    kpi_ids_csv: str
+    kpi_bullets: str
+
+
+class IndustryResolution(NamedTuple):
+    """Value of the flat resolution table: what an (industry, sub_industry) pair routes to."""
+
+    industry: str  # canonical industry name
+    pack: PackResolution
+    source: str  # industry+sub | industry_default
 
 
 class Router:
-    def __init__(self, config: Dict[str, Any]):
+    """
+    Turns a section (+ optional per-call overrides) into prompt segments.
+
+    All YAML walking happens once, in __init__:
+      - every KPI pack is validated (and checked against kpi_registry if loaded)
+        and its kpi_bullets / kpi_ids_csv are rendered up front
+      - industry_map is flattened into one immutable table keyed on every
+        (industry alias, sub-industry alias) pair, with (industry, None) for defaults
+
+    route() is then a dict lookup plus an LRU-memoized segment list.
+    """
+
+    def __init__(self, config: Dict[str, Any], route_cache_size: int = 4096):
         self.config = config
 
         # Section configs (your run-config YAML must include sections: ...)
@@ -17,6 +74,9 @@ class Router:
         # KPI pack definitions (loaded by Runtime from kpi_packs.yaml)
         self.kpi_packs_cfg = config.get("kpi_packs", {}) or {}
 
+        # KPI registry (loaded by Runtime from kpi_registry.yaml), id -> definition
+        self.kpi_registry_cfg = config.get("kpi_registry", {}) or {}
+
         # Industry map (loaded by Runtime from industry_map.yaml)
         # Expected keys: industry_aliases, industry_map
         self.industry_map_cfg = config.get("industry_map_cfg") or config.get("industry_map") or {}
@@ -24,24 +84,222 @@ class Router:
         # Prompt snippet for KPI pack (you chose KISS: prompts/kpi_pack.md)
         self.kpi_pack_prompt_cfg = config.get("kpi_pack_prompt", {}) or {"template_path": "kpi_pack.md"}
 
-    def route(self, section: str) -> Dict[str, Any]:
+        # Prompt snippet for per-issuer input materials (only used when route() gets inputs)
+        self.inputs_prompt_cfg = config.get("inputs_prompt", {}) or {"template_path": "inputs.md"}
+
+        # Prompt snippet carrying upstream sections' outputs (only used when route() gets upstream)
+        self.upstream_prompt_cfg = config.get("upstream_prompt", {}) or {"template_path": "upstream.md"}
+
+        self.packs: Mapping[str, PackResolution] = MappingProxyType(self._compile_packs())
+        self.industry_aliases: Mapping[str, str] = MappingProxyType(self._compile_industry_aliases())
+        self.resolution_table: Mapping[Tuple[str, Optional[str]], IndustryResolution] = MappingProxyType(
+            self._compile_resolution_table()
+        )
+
+        self._route_segments = lru_cache(maxsize=route_cache_size)(self._build_route)
+
+    # ------------------------------------------------------------------
+    # Compile step (construction time)
+    # ------------------------------------------------------------------
+
+    def _compile_packs(self) -> Dict[str, PackResolution]:
+        if not isinstance(self.kpi_packs_cfg, dict):
+            raise ValueError("config['kpi_packs'] must be a mapping of pack id -> pack")
+
+        packs: Dict[str, PackResolution] = {}
+        for pack_id, pack in self.kpi_packs_cfg.items():
+            kpi_ids = (pack or {}).get("kpi_ids", []) or []
+            if not isinstance(kpi_ids, list) or not kpi_ids:
+                raise ValueError(f"KPI pack '{pack_id}' has empty/invalid 'kpi_ids'")
+
+            if self.kpi_registry_cfg:
+                unknown = [k for k in kpi_ids if k not in self.kpi_registry_cfg]
+                if unknown:
+                    raise ValueError(f"KPI pack '{pack_id}' references KPI ids not in kpi_registry.yaml: {', '.join(unknown)}")
+
+            packs[pack_id] = PackResolution(
+                kpi_pack=pack_id,
+                kpi_ids=tuple(kpi_ids),
+                kpi_ids_csv=", ".join(kpi_ids),
+                kpi_bullets="\n".join([f"- {k}" for k in kpi_ids]),
+            )
+        return packs
+
+    def _compile_industry_aliases(self) -> Dict[str, str]:
+        imap = self.industry_map_cfg.get("industry_map", {}) or {}
+        aliases = dict(self.industry_map_cfg.get("industry_aliases", {}) or {})
+        for industry in imap:
+            aliases.setdefault(industry, industry)
+        return aliases
+
+    def _compile_resolution_table(self) -> Dict[Tuple[str, Optional[str]], IndustryResolution]:
+        imap = self.industry_map_cfg.get("industry_map", {}) or {}
+        industry_keys: Dict[str, List[str]] = {}
+        for alias, industry in self.industry_aliases.items():
+            industry_keys.setdefault(industry, []).append(alias)
+
+        table: Dict[Tuple[str, Optional[str]], IndustryResolution] = {}
+        for industry, entry in imap.items():
+            entry = entry or {}
+            rows: Dict[Optional[str], IndustryResolution] = {}
+
+            default_pack = entry.get("default_kpi_pack")
+            if default_pack:
+                rows[None] = IndustryResolution(industry, self._pack_for(default_pack, industry), "industry_default")
+
+            sub_map = entry.get("sub_industries", {}) or {}
+            for sub_industry, pack_id in sub_map.items():
+                rows[sub_industry] = IndustryResolution(industry, self._pack_for(pack_id, industry), "industry+sub")
+
+            for alias, sub_industry in (entry.get("sub_industry_aliases", {}) or {}).items():
+                if sub_industry in sub_map:
+                    rows[alias] = rows[sub_industry]
+
+            for key in industry_keys.get(industry, [industry]):
+                for sub_key, resolution in rows.items():
+                    table[(key, sub_key)] = resolution
+
+        return table
+
+    def _pack_for(self, pack_id: str, industry: str) -> PackResolution:
+        pack = self.packs.get(pack_id)
+        if pack is None:
+            raise ValueError(f"industry_map.yaml: industry '{industry}' references KPI pack '{pack_id}' not found in config['kpi_packs']")
+        return pack
+
+    # ------------------------------------------------------------------
+    # Routing (per call)
+    # ------------------------------------------------------------------
+
+    def route(
+        self,
+        section: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Any] = None,
+        upstream: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        overrides: per-call values for OVERRIDE_KEYS. They are layered over a copy of
+        the section config, so the shared config is never mutated (safe across threads).
+        inputs: optional issuer input materials (str or JSON-serializable), appended as
+        a final "inputs" segment.
+        upstream: optional {section: output} of sections this one depends on (see
+        section_dependencies), appended as an "upstream" segment.
+        """
         if section not in self.sections_cfg:
             available = ", ".join(sorted(self.sections_cfg.keys()))
             raise ValueError(f"Unknown section '{section}'. Available sections: {available or 'none'}")
 
         section_cfg = self.sections_cfg[section]
+        if overrides:
+            section_cfg = with_overrides(section_cfg, overrides)
+
+        manifest, segments = self._route_segments(
+            section,
+            section_cfg.get("industry"),
+            section_cfg.get("sub_industry"),
+            section_cfg.get("prompt_version"),
+            section_cfg.get("kpi_pack"),
+        )
+
+        # Callers get their own copies; the memoized entries stay untouched
+        segments_out: List[Dict[str, Any]] = [dict(seg, variables=dict(seg["variables"])) for seg in segments]
+
+        # 5) Issuer input materials (optional, per request)
+        if inputs is not None:
+            inputs_path = self.inputs_prompt_cfg.get("template_path")
+            if not inputs_path:
+                raise ValueError("Missing config.inputs_prompt.template_path (e.g., 'inputs.md')")
+            segments_out.append(
+                {
+                    "name": "inputs",
+                    "template_path": inputs_path,
+                    "variables": {"input_materials": self._format_inputs(inputs)},
+                    "scope": SCOPE_REQUEST,
+                }
+            )
+
+        # 6) Outputs of upstream sections (optional, per request)
+        if upstream:
+            upstream_path = self.upstream_prompt_cfg.get("template_path")
+            if not upstream_path:
+                raise ValueError("Missing config.upstream_prompt.template_path (e.g., 'upstream.md')")
+            segments_out.append(
+                {
+                    "name": "upstream",
+                    "template_path": upstream_path,
+                    "variables": {"upstream_sections": self._format_upstream(upstream)},
+                    "scope": SCOPE_REQUEST,
+                }
+            )
+
+        return {"manifest": dict(manifest), "segments": segments_out}
+
+    def section_dependencies(self) -> Dict[str, Tuple[str, ...]]:
+        """
+        section -> sections it consumes (sections.<section>.depends_on), checked for
+        unknown names and cycles. Keys are in a topological order.
+        """
+        deps: Dict[str, Tuple[str, ...]] = {}
+        for section, cfg in self.sections_cfg.items():
+            depends_on = (cfg or {}).get("depends_on", []) or []
+            if isinstance(depends_on, str):
+                depends_on = [depends_on]
+            unknown = [d for d in depends_on if d not in self.sections_cfg]
+            if unknown:
+                raise ValueError(f"Section '{section}' depends on unknown section(s): {', '.join(unknown)}")
+            deps[section] = tuple(depends_on)
+
+        ordered: Dict[str, Tuple[str, ...]] = {}
+        visiting: List[str] = []
+
+        def visit(section: str) -> None:
+            if section in ordered:
+                return
+            if section in visiting:
+                cycle = visiting[visiting.index(section) :] + [section]
+                raise ValueError(f"Section dependency cycle: {' -> '.join(cycle)}")
+            visiting.append(section)
+            for dep in deps[section]:
+                visit(dep)
+            visiting.pop()
+            ordered[section] = deps[section]
+
+        for section in deps:
+            visit(section)
+        return ordered
+
+    @staticmethod
+    def prefix_signature(prompt_spec: Dict[str, Any]) -> Tuple[str, ...]:
+        """
+        Identifies the static prefix of a routed prompt without rendering it: static
+        segment names encode base / industry / KPI pack / section@version, which fully
+        determine their (config-derived) content.
+        """
+        return tuple(
+            seg["name"] for seg in prompt_spec["segments"] if seg.get("scope", SCOPE_STATIC) == SCOPE_STATIC
+        )
 
-        version_key, version_cfg = self._resolve_prompt_version(section, section_cfg)
+    def route_cache_info(self) -> Dict[str, int]:
+        info = self._route_segments.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
 
-        raw_industry = section_cfg.get("industry")
-        raw_sub_industry = section_cfg.get("sub_industry")
+    def _build_route(
+        self,
+        section: str,
+        raw_industry: Optional[str],
+        raw_sub_industry: Optional[str],
+        version_key: Optional[str],
+        explicit_pack: Optional[str],
+    ) -> Tuple[Dict[str, Any], Tuple[Dict[str, Any], ...]]:
+        version_cfg = self._resolve_prompt_version(section, version_key)
 
         industry = self._normalize_industry(raw_industry) if raw_industry else None
         sub_industry = raw_sub_industry  # keep original in manifest
 
-        explicit_pack = section_cfg.get("kpi_pack")
-        kpi_pack, kpi_pack_source = self._resolve_kpi_pack_kiss(
+        pack, kpi_pack_source = self._resolve_kpi_pack_kiss(
             explicit_kpi_pack=explicit_pack,
+            raw_industry=raw_industry,
             industry=industry,
             sub_industry=raw_sub_industry,
         )
@@ -51,7 +309,7 @@ class Router:
             "prompt_version": version_key,
             "industry": industry,
             "sub_industry": sub_industry,
-            "kpi_pack": kpi_pack,
+            "kpi_pack": pack.kpi_pack,
             "kpi_pack_source": kpi_pack_source,  # explicit | industry+sub | industry_default
         }
 
@@ -63,6 +321,7 @@ class Router:
             segments.append(
                 {
                     "name": "base",
+                    "scope": SCOPE_STATIC,
                     "template_path": base_path,
                     "variables": self.base_prompt_cfg.get("variables", {}) or {},
                 }
@@ -75,25 +334,26 @@ class Router:
                 segments.append(
                     {
                         "name": f"industry:{industry}",
+                        "scope": SCOPE_STATIC,
                         "template_path": industry_cfg["template_path"],
                         "variables": industry_cfg.get("variables", {}) or {},
                     }
                 )
 
         # 3) KPI pack prompt block (required by your design)
-        kpi_ids = self._get_kpi_ids_for_pack(kpi_pack)
         kpi_segment_path = self.kpi_pack_prompt_cfg.get("template_path")
         if not kpi_segment_path:
             raise ValueError("Missing config.kpi_pack_prompt.template_path (e.g., 'kpi_pack.md')")
 
         segments.append(
             {
-                "name": f"kpi_pack:{kpi_pack}",
+                "name": f"kpi_pack:{pack.kpi_pack}",
+                "scope": SCOPE_STATIC,
                 "template_path": kpi_segment_path,
                 "variables": {
-                    "kpi_pack_id": kpi_pack,
-                    "kpi_ids_csv": ", ".join(kpi_ids),
-                    "kpi_bullets": "\n".join([f"- {k}" for k in kpi_ids]),
+                    "kpi_pack_id": pack.kpi_pack,
+                    "kpi_ids_csv": pack.kpi_ids_csv,
+                    "kpi_bullets": pack.kpi_bullets,
                 },
             }
         )
@@ -102,16 +362,26 @@ class Router:
         segments.append(
             {
                 "name": f"section:{section}@{version_key}",
+                "scope": SCOPE_STATIC,
                 "template_path": version_cfg["template_path"],
                 "variables": version_cfg.get("variables", {}) or {},
             }
         )
 
-        return {"manifest": manifest, "segments": segments}
+        return manifest, tuple(segments)
 
-    def _resolve_prompt_version(self, section: str, section_cfg: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
-        version_key = section_cfg.get("prompt_version")
-        versions = section_cfg.get("prompt_versions", {}) or {}
+    @staticmethod
+    def _format_inputs(inputs: Any) -> str:
+        if isinstance(inputs, str):
+            return inputs
+        return json.dumps(inputs, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def _format_upstream(upstream: Dict[str, str]) -> str:
+        return "\n\n".join(f"## {section}\n\n{output.strip()}" for section, output in upstream.items())
+
+    def _resolve_prompt_version(self, section: str, version_key: Optional[str]) -> Dict[str, Any]:
+        versions = self.sections_cfg[section].get("prompt_versions", {}) or {}
 
         if not version_key:
             raise ValueError(f"Section '{section}' must define 'prompt_version'")
@@ -123,61 +393,45 @@ class Router:
         if not version_cfg.get("template_path"):
             raise ValueError(f"Section '{section}' / version '{version_key}' missing 'template_path'")
 
-        return version_key, version_cfg
+        return version_cfg
 
     def _normalize_industry(self, industry: str) -> str:
-        aliases = self.industry_map_cfg.get("industry_aliases", {}) or {}
-        return aliases.get(industry, industry)
-
-    def _normalize_sub_industry_within_industry(self, industry: str, sub_industry: str) -> str:
-        imap = self.industry_map_cfg.get("industry_map", {}) or {}
-        entry = imap.get(industry, {}) or {}
-        aliases = entry.get("sub_industry_aliases", {}) or {}
-        return aliases.get(sub_industry, sub_industry)
+        return self.industry_aliases.get(industry, industry)
 
     def _resolve_kpi_pack_kiss(
         self,
         explicit_kpi_pack: Optional[str],
+        raw_industry: Optional[str],
         industry: Optional[str],
         sub_industry: Optional[str],
-    ) -> Tuple[str, str]:
+    ) -> Tuple[PackResolution, str]:
         # #1 explicit override
         if explicit_kpi_pack:
-            return explicit_kpi_pack, "explicit"
+            return self._get_pack(explicit_kpi_pack), "explicit"
 
         # #3 no industry AND no explicit pack -> error
         if not industry:
             raise ValueError("No KPI pack resolution possible: provide either sections.<section>.kpi_pack or industry")
 
+        # #2 industry + sub_industry mapping, else industry default
+        table = self.resolution_table
+        resolution = (sub_industry and table.get((raw_industry, sub_industry))) or table.get((raw_industry, None))
+        if resolution:
+            return resolution.pack, resolution.source
+
         imap = self.industry_map_cfg.get("industry_map", {}) or {}
-        entry = imap.get(industry)
-        if not entry:
+        if industry not in imap:
             raise ValueError(f"Industry '{industry}' not found in industry_map.yaml")
-
-        # #2 industry + sub_industry mapping
-        if sub_industry:
-            normalized_sub = self._normalize_sub_industry_within_industry(industry, sub_industry)
-            sub_map = entry.get("sub_industries", {}) or {}
-            if normalized_sub in sub_map:
-                return sub_map[normalized_sub], "industry+sub"
-
-        # #2 industry default
-        default_pack = entry.get("default_kpi_pack")
-        if default_pack:
-            return default_pack, "industry_default"
-
         raise ValueError(f"Industry '{industry}' has no default_kpi_pack and no sub_industry match")
 
-    def _get_kpi_ids_for_pack(self, kpi_pack_id: str) -> List[str]:
-        if not isinstance(self.kpi_packs_cfg, dict) or not self.kpi_packs_cfg:
+    def _get_pack(self, kpi_pack_id: str) -> PackResolution:
+        if not self.packs:
             raise ValueError("config['kpi_packs'] is missing/empty. Did Runtime load kpi_packs_file?")
 
-        pack = self.kpi_packs_cfg.get(kpi_pack_id)
+        pack = self.packs.get(kpi_pack_id)
         if not pack:
             raise ValueError(f"KPI pack '{kpi_pack_id}' not found in config['kpi_packs']")
+        return pack
 
-        kpi_ids = pack.get("kpi_ids", []) or []
-        if not isinstance(kpi_ids, list) or not kpi_ids:
-            raise ValueError(f"KPI pack '{kpi_pack_id}' has empty/invalid 'kpi_ids'")
-
-        return kpi_ids
+    def _get_kpi_ids_for_pack(self, kpi_pack_id: str) -> List[str]:
+        return list(self._get_pack(kpi_pack_id).kpi_ids)
@@ -1,59 +1,160 @@
+import asyncio
+import functools
+import hashlib
 import os
 import json
-import yaml
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from prompt_lifecycle.engine.config_bundle import (
+    FILE_REFERENCE_KEYS,
+    default_bundle_path,
+    load_fresh_bundle,
+    load_run_config,
+    resolve_path,
+    template_paths,
+)
+from prompt_lifecycle.engine.evidence import EvidenceRetriever
+from prompt_lifecycle.engine.routing import Router, with_overrides
+from prompt_lifecycle.engine.prompt_loader import TEMPLATE_CACHE, PromptLoader, TemplateCache
+from prompt_lifecycle.engine.llm_client import LLMClient, LLMTimeoutError, ProviderError
+from prompt_lifecycle.engine.map_reduce import MapReducer
+from prompt_lifecycle.engine.guardrails import GuardrailViolation, StreamingGuardrail, guardrail_for_section
+from prompt_lifecycle.engine.model_router import ModelRouter
+from prompt_lifecycle.telemetry.cost_estimator import CostEstimator
+from prompt_lifecycle.telemetry.event_logger import EventLogger
+from prompt_lifecycle.telemetry.stage_timers import StageTimers
+
+class ConfigSnapshot(NamedTuple):
+    """One consistent view of the run config. Runtime.reload() swaps it as a whole."""
+
+    config: Dict[str, Any]
+    source: Dict[str, Any]  # {"source": bundle | yaml, "hash", "version"}
+    router: Router
+    prompt_loader: PromptLoader
+    evidence: Optional[EvidenceRetriever] = None  # config evidence.enabled
 
-from prompt_lifecycle.engine.routing import Router
-from prompt_lifecycle.engine.prompt_loader import PromptLoader
-from prompt_lifecycle.engine.llm_client import LLMClient
 
 class Runtime:
-    def __init__(self, config_path: str, overrides: Optional[Dict[str, Any]] = None):
+    """
+    Warm routing + rendering + LLM client for one run config.
+
+    Config, Router and PromptLoader live in a ConfigSnapshot; every request reads
+    self.snapshot once, so reload() can swap in a freshly built snapshot while
+    requests are in flight. LLM client, model routing and telemetry settings are
+    read once at startup (changing them needs a restart).
+
+    pin_templates gives each snapshot its own template cache, compiled up front
+    and never re-validated against disk: template edits only take effect on
+    reload(), and an in-flight request never sees a half-edited template. The
+    default shares TEMPLATE_CACHE, which re-checks files on every load.
+    """
+
+    def __init__(
+        self,
+        config_path: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        bundle_path: Optional[str] = None,
+        use_bundle: bool = True,
+        cache_mode: Optional[str] = None,
+        pin_templates: bool = False,
+    ):
         self.config_path = config_path
         self.config_dir = os.path.dirname(os.path.abspath(config_path))
+        self._overrides = overrides
+        self._bundle_path = bundle_path or default_bundle_path(config_path)
+        self._use_bundle = use_bundle
+        self.pin_templates = pin_templates
+        self._versions = 0
 
-        self.config = self._load_config(config_path)
-        self._hydrate_external_configs()
+        self.snapshot = self._build_snapshot()
 
-        if overrides:
-            self._apply_overrides(overrides)
+        self.llm = LLMClient(self.config, cache_mode=cache_mode)
+        self.model_router = ModelRouter.from_config(self.config)
+        self.cost_estimator = CostEstimator.from_config(self.config, self.llm.model_name)
+        self._cost_estimators: Dict[Optional[str], CostEstimator] = {self.llm.model_name: self.cost_estimator}
+        self.events = EventLogger.from_config(self.config)
+        self.stage_timers = StageTimers()
+        self._map_reducer: Optional[MapReducer] = None
+        for exporter in self.events.exporters:
+            if hasattr(exporter, "add_collector"):
+                exporter.add_collector(self.stage_timers)
+                exporter.add_collector(self.llm)
 
-        self.router = Router(self.config)
-        self.prompt_loader = PromptLoader(self.config)
-        self.llm = LLMClient(self.config)
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.snapshot.config
 
-    def _load_config(self, path: str) -> Dict[str, Any]:
-        with open(path, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f) or {}
+    @property
+    def config_source(self) -> Dict[str, Any]:
+        return self.snapshot.source
 
-    def _resolve_path(self, maybe_path: str) -> str:
-        if os.path.isabs(maybe_path):
-            return maybe_path
-        return os.path.join(self.config_dir, maybe_path)
-
-    def _load_yaml_file(self, path: str) -> Dict[str, Any]:
-        resolved = self._resolve_path(path)
-        with open(resolved, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f) or {}
-
-    def _hydrate_external_configs(self) -> None:
-        industry_map_file = self.config.get("industry_map_file")
-        if industry_map_file:
-            industry_map_cfg = self._load_yaml_file(industry_map_file)
-            self.config["industry_map_cfg"] = {
-                "industry_aliases": industry_map_cfg.get("industry_aliases", {}) or {},
-                "industry_map": industry_map_cfg.get("industry_map", {}) or {},
-            }
+    @property
+    def router(self) -> Router:
+        return self.snapshot.router
+
+    @property
+    def prompt_loader(self) -> PromptLoader:
+        return self.snapshot.prompt_loader
+
+    def _build_snapshot(self) -> ConfigSnapshot:
+        cache = TemplateCache() if self.pin_templates else TEMPLATE_CACHE
+
+        # Fast path: a fresh compiled bundle (see `compile-config`), else parse the YAML
+        bundle = None
+        if self._use_bundle:
+            bundle = load_fresh_bundle(self._bundle_path, self.config_path, cache=cache)
+
+        if bundle is not None:
+            config = bundle.config
+            source = {"source": "bundle", "hash": bundle.hash}
+        else:
+            config = load_run_config(self.config_path)
+            source = {"source": "yaml", "hash": None}
 
-        kpi_packs_file = self.config.get("kpi_packs_file")
-        if kpi_packs_file:
-            kpi_packs_cfg = self._load_yaml_file(kpi_packs_file)
-            packs = kpi_packs_cfg.get("kpi_packs", {})
-            if not isinstance(packs, dict):
-                raise ValueError("kpi_packs.yaml must contain a top-level 'kpi_packs:' mapping")
-            self.config["kpi_packs"] = packs
+        if self._overrides:
+            self._apply_overrides(config, self._overrides)
 
-    def _apply_overrides(self, overrides: Dict[str, Any]) -> None:
+        router = Router(config)
+        if not self.pin_templates:
+            prompt_loader = PromptLoader(config)
+        else:
+            prompt_loader = PromptLoader(config, cache=cache)
+            # Compile (and check bundle-seeded entries against disk) before pinning
+            for path in template_paths(config):
+                prompt_loader.compile(path)
+            prompt_loader.cache_validation = "pinned"
+
+        evidence = EvidenceRetriever.from_config(config, router.packs)
+
+        self._versions += 1
+        source["version"] = self._versions
+        return ConfigSnapshot(config, source, router, prompt_loader, evidence)
+
+    def reload(self) -> ConfigSnapshot:
+        """
+        Re-reads the config (bundle or YAML), rebuilds Router and PromptLoader and
+        swaps the snapshot in one assignment. Raises (keeping the current snapshot)
+        if the new config does not compile.
+        """
+        snapshot = self._build_snapshot()
+        self.snapshot = snapshot
+        return snapshot
+
+    def watched_paths(self) -> List[str]:
+        """Every file the current snapshot was built from: run config, referenced YAML files, templates."""
+        snapshot = self.snapshot
+        paths = [os.path.abspath(self.config_path)]
+        for key in FILE_REFERENCE_KEYS:
+            if snapshot.config.get(key):
+                paths.append(self._resolve_path(snapshot.config[key]))
+        paths += [snapshot.prompt_loader.resolve(p) for p in template_paths(snapshot.config)]
+        return paths
+
+    def _resolve_path(self, maybe_path: str) -> str:
+        return resolve_path(self.config_dir, maybe_path)
+
+    def _apply_overrides(self, config: Dict[str, Any], overrides: Dict[str, Any]) -> None:
         """
         Applies CLI overrides to one section config before Router is built.
         Expected keys: section (required), industry, sub_industry, prompt_version, kpi_pack
@@ -62,38 +163,499 @@ class Runtime:
         if not section:
             raise ValueError("Runtime overrides must include 'section'")
 
-        sections = self.config.get("sections", {}) or {}
+        sections = config.get("sections", {}) or {}
         if section not in sections:
             raise ValueError(f"Unknown section '{section}' in config. Available: {', '.join(sorted(sections.keys()))}")
 
-        scfg = sections[section]
-
-        if overrides.get("industry") is not None:
-            scfg["industry"] = overrides["industry"]
-
-        if overrides.get("sub_industry") is not None:
-            scfg["sub_industry"] = overrides["sub_industry"]
-
-        if overrides.get("kpi_pack") is not None:
-            scfg["kpi_pack"] = overrides["kpi_pack"]
+        # Same rules as per-call overrides (e.g. --industry alone drops the default sub_industry)
+        scfg = with_overrides(sections[section], overrides)
 
-        if overrides.get("prompt_version") is not None:
-            pv = overrides["prompt_version"]
+        pv = overrides.get("prompt_version")
+        if pv is not None:
             pvers = scfg.get("prompt_versions", {}) or {}
             if pv not in pvers:
                 raise ValueError(
                     f"prompt_version '{pv}' not defined for section '{section}'. "
                     f"Available: {', '.join(sorted(pvers.keys()))}"
                 )
-            scfg["prompt_version"] = pv
 
-        self.config["sections"] = sections
+        sections[section] = scfg
+        config["sections"] = sections
 
-    def run(self, section: str) -> str:
-        prompt_spec = self.router.route(section)
-        assembled_prompt, assembly_manifest = self.prompt_loader.load(prompt_spec)
+    def render(
+        self,
+        section: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Any] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Route + load one prompt. overrides are applied per call (see Router.route),
+        so one warm Runtime can serve many issuers concurrently.
+        """
+        return self._render(self.snapshot, section, overrides, inputs)
+
+    async def _arender(self, snapshot: ConfigSnapshot, section: str, *args: Any, **kwargs: Any) -> Tuple[str, Dict[str, Any]]:
+        """
+        _render in the default executor, for the async paths: routing, evidence
+        retrieval (which can build, pickle and write an index) and template loads
+        must not stall a shared event loop (the server's, the batch runner's).
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self._render, snapshot, section, *args, **kwargs))
+
+    def _render(
+        self,
+        snapshot: ConfigSnapshot,
+        section: str,
+        overrides: Optional[Dict[str, Any]],
+        inputs: Optional[Any],
+        upstream: Optional[Dict[str, str]] = None,
+        rendered: Optional[Dict[Tuple[str, str, str], str]] = None,
+        use_evidence: bool = True,
+    ) -> Tuple[str, Dict[str, Any]]:
+        t0 = time.perf_counter_ns()
+        prompt_spec = snapshot.router.route(section, overrides=overrides, inputs=inputs, upstream=upstream)
+        t1 = time.perf_counter_ns()
+        evidence_ns = None
+        if use_evidence and snapshot.evidence is not None and inputs is not None:
+            # Top passages of the inputs instead of all of them (engine/evidence.py)
+            snapshot.evidence.apply(prompt_spec, section, inputs)
+            evidence_ns = time.perf_counter_ns() - t1
+            t1 += evidence_ns
+        timings: Dict[str, int] = {}
+        assembled, manifest = snapshot.prompt_loader.load(prompt_spec, timings=timings, rendered=rendered)
+        t2 = time.perf_counter_ns()
+        manifest["config_bundle"] = snapshot.source
+
+        route = manifest["router_manifest"]
+        version = route.get("prompt_version")
+        if evidence_ns is None:
+            self.stage_timers.observe("route", t1 - t0, section, version)
+        else:
+            self.stage_timers.observe("route", t1 - t0 - evidence_ns, section, version)
+            self.stage_timers.observe("evidence", evidence_ns, section, version)
+        self.stage_timers.observe("load.read", timings["read_ns"], section, version)
+        self.stage_timers.observe("load.render", timings["render_ns"], section, version)
+
+        if self.events.enabled:
+            self.events.emit(
+                "route",
+                section=section,
+                prompt_version=route.get("prompt_version"),
+                kpi_pack=route.get("kpi_pack"),
+                duration_us=(t1 - t0) // 1000,
+            )
+            self.events.emit(
+                "render",
+                section=section,
+                prompt_version=route.get("prompt_version"),
+                input_tokens=manifest["tokens"]["input"],
+                trimmed=len(manifest["tokens"]["trimmed"]),
+                template_cache_misses=manifest["template_cache"]["misses"],
+                duration_us=(t2 - t1) // 1000,
+            )
+        return assembled, manifest
+
+    def _finish_llm(self, manifest: Dict[str, Any], llm_output: str, started_ns: int, total_started_ns: int) -> None:
+        finished_ns = time.perf_counter_ns()
+        section = manifest["router_manifest"].get("section")
+        version = manifest["router_manifest"].get("prompt_version")
+        self.stage_timers.observe("llm", finished_ns - started_ns, section, version)
+        self.stage_timers.observe("total", finished_ns - total_started_ns, section, version)
+
+        manifest["cost"] = self._cost_for(manifest["llm"].get("model")).estimate_text(manifest["tokens"]["input"], llm_output)
+        if self.events.enabled:
+            cost = manifest["cost"]
+            self.events.emit(
+                "llm",
+                section=section,
+                prompt_version=version,
+                model=cost["model"],
+                status=manifest["llm"].get("cache_status", "call"),
+                input_tokens=cost["input_tokens"],
+                output_tokens=cost["output_tokens"],
+                cost_usd=cost["total_usd"],
+                duration_us=(finished_ns - started_ns) // 1000,
+            )
+
+    def _cost_for(self, model: Optional[str]) -> CostEstimator:
+        estimator = self._cost_estimators.get(model)
+        if estimator is None:
+            estimator = self._cost_estimators[model] = CostEstimator.from_config(self.config, model)
+        return estimator
+
+    def prompt_cache_key(self, section: str, prompt: str) -> str:
+        """
+        LLMClient.cache_key of a rendered prompt for whatever answers it in _acall_llm:
+        llm.model, or with llm.routing on, every model of the section's cascade plus
+        the escalation rules (the output may come from any of them).
+        """
+        router = self.model_router
+        if not router.enabled:
+            return self.llm.cache_key(prompt)
+        parts = [self.llm.cache_key(prompt, model) for model in router.cascade_for(section)]
+        parts.append("escalate_on=" + ",".join(sorted(router.escalate_on)))
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    async def _acall_llm(self, snapshot: ConfigSnapshot, section: str, prompt: str, manifest: Dict[str, Any]) -> str:
+        """The LLM call for one rendered prompt: llm.model, or the llm.routing cascade. Fills manifest["llm"]."""
+        if not self.model_router.enabled:
+            output, manifest["llm"] = await self.llm.acall_with_meta(prompt)
+            return output
+        return await self._acascade(snapshot, section, prompt, manifest)
+
+    async def _acascade(self, snapshot: ConfigSnapshot, section: str, prompt: str, manifest: Dict[str, Any]) -> str:
+        """
+        Calls the planned models in order until one's output passes the section's
+        checks. Escalates (per llm.routing.escalate_on) on a guardrail / schema
+        failure or a provider error. If the last model's output fails its checks it
+        is still returned, with path status "violated"; a provider error from the
+        last model (or any model, when "error" is not in escalate_on) is raised.
+
+        manifest["model_routing"] = {"cascade", "skipped", "chosen", "escalations", "path", "cost_usd"}
+        """
+        router = self.model_router
+        input_tokens = manifest["tokens"]["input"]
+        plan = router.plan(section, input_tokens)
+        section_cfg = (snapshot.config.get("sections", {}) or {}).get(section, {}) or {}
+
+        path: List[Dict[str, Any]] = []
+        output, meta = "", {}
+        for i, model in enumerate(plan.models):
+            last = i == len(plan.models) - 1
+            started = time.perf_counter()
+            try:
+                output, meta = await self.llm.acall_with_meta(prompt, model=model)
+            except (ProviderError, LLMTimeoutError) as exc:
+                router.observe(model, time.perf_counter() - started, ok=False)
+                path.append({"model": model, "status": "error", "detail": f"{type(exc).__name__}: {exc}"})
+                if last or "error" not in router.escalate_on:
+                    raise
+                continue
+            latency_s = time.perf_counter() - started
+
+            violation = None
+            if "guardrail" in router.escalate_on:
+                violation = self._output_guardrail(section, section_cfg).check(output)
+            if meta.get("cache_status", "miss") in ("miss", "bypass"):  # cached answers say nothing about latency
+                router.observe(model, latency_s, ok=True, escalated=violation is not None)
+
+            step: Dict[str, Any] = {
+                "model": model,
+                "status": "accepted" if violation is None else ("violated" if last else "escalated"),
+                "latency_ms": round(latency_s * 1000.0, 1),
+                "cost_usd": self._cost_for(model).estimate_text(input_tokens, output)["total_usd"],
+            }
+            if violation is not None:
+                step["violation"] = violation.to_dict()
+            path.append(step)
+            if violation is None or last:
+                break
 
-        llm_output = self.llm.call(assembled_prompt)
+        manifest["llm"] = meta
+        manifest["model_routing"] = {
+            "cascade": list(plan.models),
+            "skipped": plan.skipped,
+            "chosen": meta.get("model"),
+            "escalations": len(path) - 1,
+            "path": path,
+            "cost_usd": round(sum(step.get("cost_usd", 0.0) for step in path), 6),
+        }
+        return output
+
+    @staticmethod
+    def _output_guardrail(section: str, section_cfg: Dict[str, Any]) -> StreamingGuardrail:
+        # The cascade always checks the section's output contract, even with streaming guardrails off
+        cfg = dict(section_cfg.get("guardrails", {}) or {}, enabled=True)
+        return guardrail_for_section(section, dict(section_cfg, guardrails=cfg))
+
+    def generate(
+        self,
+        section: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        if self.model_router.enabled:
+            return self.llm.run_sync(self.agenerate(section, overrides=overrides, inputs=inputs))
+        total_started_ns = time.perf_counter_ns()
+        assembled_prompt, assembly_manifest = self.render(section, overrides=overrides, inputs=inputs)
+        started_ns = time.perf_counter_ns()
+        llm_output, assembly_manifest["llm"] = self.llm.call_with_meta(assembled_prompt)
+        self._finish_llm(assembly_manifest, llm_output, started_ns, total_started_ns)
+        return {"prompt": assembled_prompt, "manifest": assembly_manifest, "output": llm_output}
+
+    async def agenerate(
+        self,
+        section: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        total_started_ns = time.perf_counter_ns()
+        snapshot = self.snapshot
+        assembled_prompt, assembly_manifest = await self._arender(snapshot, section, overrides, inputs)
+        started_ns = time.perf_counter_ns()
+        llm_output = await self._acall_llm(snapshot, section, assembled_prompt, assembly_manifest)
+        self._finish_llm(assembly_manifest, llm_output, started_ns, total_started_ns)
+        return {"prompt": assembled_prompt, "manifest": assembly_manifest, "output": llm_output}
+
+    async def agenerate_stream(
+        self,
+        section: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Any] = None,
+        on_chunk: Optional[Callable[[int, str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Streaming generate(): output is checked chunk by chunk against the section's
+        guardrail (sections.<section>.guardrails). On a violation the provider stream
+        is closed immediately and the generation is retried, up to
+        guardrails.max_retries times.
+
+        on_chunk(attempt, chunk) sees every chunk as it arrives.
+        manifest["guardrails"] = {"status": passed | violated | disabled, "attempts", "violations"};
+        if every attempt is aborted, output is the partial text of the last one.
+
+        With llm.routing enabled, retries walk up the planned cascade (attempt n uses
+        the n-th model, the last model for any further retries) and
+        manifest["model_routing"] records it. Provider errors are not cascaded here.
+        """
+        total_started_ns = time.perf_counter_ns()
+        snapshot = self.snapshot  # prompt and guardrail settings from the same config
+        assembled_prompt, assembly_manifest = await self._arender(snapshot, section, overrides, inputs)
+        section_cfg = (snapshot.config.get("sections", {}) or {}).get(section, {}) or {}
+        max_retries = int((section_cfg.get("guardrails", {}) or {}).get("max_retries", 0))
+
+        models: Tuple[Optional[str], ...] = (None,)
+        if self.model_router.enabled:
+            plan = self.model_router.plan(section, assembly_manifest["tokens"]["input"])
+            models = plan.models
+            max_retries = max(max_retries, len(models) - 1)
+
+        violations: List[Dict[str, Any]] = []
+        started_ns = time.perf_counter_ns()
+        for attempt in range(1, max_retries + 2):
+            model = models[min(attempt, len(models)) - 1]
+            guardrail = guardrail_for_section(section, section_cfg)
+            meta: Dict[str, Any] = {}
+            parts: List[str] = []
+            try:
+                async for chunk in self.llm.astream(assembled_prompt, guardrail=guardrail, meta=meta, model=model):
+                    parts.append(chunk)
+                    if on_chunk is not None:
+                        on_chunk(attempt, chunk)
+            except GuardrailViolation as exc:
+                violations.append({"attempt": attempt, "model": meta.get("model"), **exc.to_dict()})
+                self.events.emit("guardrail", section=section, status="aborted", attempt=attempt, **exc.to_dict())
+                continue
+            status = "passed" if guardrail is not None else "disabled"
+            break
+        else:
+            status = "violated"
+
+        llm_output = "".join(parts)
+        assembly_manifest["llm"] = meta
+        assembly_manifest["guardrails"] = {"status": status, "attempts": attempt, "violations": violations}
+        if self.model_router.enabled:
+            assembly_manifest["model_routing"] = {
+                "cascade": list(plan.models),
+                "skipped": plan.skipped,
+                "chosen": meta.get("model"),
+                "escalations": attempt - 1,
+            }
+        # Aborted attempts were still (partly) billed; this counts the last attempt only
+        self._finish_llm(assembly_manifest, llm_output, started_ns, total_started_ns)
+        self.events.emit("guardrail", section=section, status=status, attempts=attempt)
+        return {"prompt": assembled_prompt, "manifest": assembly_manifest, "output": llm_output}
+
+    def generate_stream(
+        self,
+        section: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Any] = None,
+        on_chunk: Optional[Callable[[int, str], None]] = None,
+    ) -> Dict[str, Any]:
+        """Sync wrapper around agenerate_stream (runs on the LLM client's background loop)."""
+        return self.llm.run_sync(self.agenerate_stream(section, overrides=overrides, inputs=inputs, on_chunk=on_chunk))
+
+    async def agenerate_many(
+        self,
+        section: str,
+        requests: Iterable[Dict[str, Any]],
+        max_concurrency: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        requests: [{"overrides": {...}, "inputs": ...}, ...]
+
+        Each request routes + renders inside its own task right before its LLM call,
+        so rendering of later requests overlaps with earlier calls still in flight.
+        Results are in input order; a failed request yields its exception object.
+        """
+        limit = asyncio.Semaphore(max_concurrency or self.llm.max_concurrency)
+
+        async def one(req: Dict[str, Any]) -> Dict[str, Any]:
+            async with limit:
+                return await self.agenerate(section, overrides=req.get("overrides"), inputs=req.get("inputs"))
+
+        return await asyncio.gather(*(one(r) for r in requests), return_exceptions=True)
+
+    def section_graph(self, sections: Optional[Iterable[str]] = None) -> Dict[str, Tuple[str, ...]]:
+        """
+        section -> upstream sections (sections.<section>.depends_on) in topological
+        order. With `sections`, only those plus everything they depend on.
+        """
+        return self._section_graph(self.snapshot, sections)
+
+    @staticmethod
+    def _section_graph(snapshot: ConfigSnapshot, sections: Optional[Iterable[str]]) -> Dict[str, Tuple[str, ...]]:
+        graph = snapshot.router.section_dependencies()
+        if sections is None:
+            return graph
+
+        wanted = set()
+        pending = list(sections)
+        while pending:
+            section = pending.pop()
+            if section not in graph:
+                available = ", ".join(sorted(graph))
+                raise ValueError(f"Unknown section '{section}'. Available sections: {available or 'none'}")
+            if section not in wanted:
+                wanted.add(section)
+                pending.extend(graph[section])
+        return {section: deps for section, deps in graph.items() if section in wanted}
+
+    async def agenerate_all(
+        self,
+        sections: Optional[Iterable[str]] = None,
+        overrides: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generates every section of one issuer (or `sections` plus their upstream
+        sections) as a graph over sections.<section>.depends_on:
+
+          - each section's task starts right away and only waits for its own
+            upstream sections, so independent sections' LLM calls run concurrently
+          - upstream outputs reach the section's prompt as an "upstream" segment
+          - static segments shared between sections (base, industry, KPI pack) are
+            rendered once per call and reused (manifest["shared_segments"])
+
+        overrides / inputs apply to every section. All sections use one snapshot.
+        Returns {section: result} in topological order; a failed section (or one
+        whose upstream failed) yields the exception object, as in agenerate_many.
+        """
+        snapshot = self.snapshot
+        graph = self._section_graph(snapshot, sections)
+        rendered: Dict[Tuple[str, str, str], str] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def one(section: str, depends_on: Tuple[str, ...]) -> Dict[str, Any]:
+            upstream = {dep: (await tasks[dep])["output"] for dep in depends_on}
+            total_started_ns = time.perf_counter_ns()
+            assembled_prompt, assembly_manifest = await self._arender(
+                snapshot, section, overrides, inputs, upstream=upstream, rendered=rendered
+            )
+            assembly_manifest["graph"] = {"depends_on": list(depends_on)}
+            started_ns = time.perf_counter_ns()
+            llm_output = await self._acall_llm(snapshot, section, assembled_prompt, assembly_manifest)
+            self._finish_llm(assembly_manifest, llm_output, started_ns, total_started_ns)
+            return {"prompt": assembled_prompt, "manifest": assembly_manifest, "output": llm_output}
+
+        # Topological order: every task's upstream tasks already exist when it runs
+        for section, depends_on in graph.items():
+            tasks[section] = asyncio.ensure_future(one(section, depends_on))
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return dict(zip(tasks, results))
+
+    def generate_all(
+        self,
+        sections: Optional[Iterable[str]] = None,
+        overrides: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """Sync wrapper around agenerate_all (runs on the LLM client's background loop)."""
+        return self.llm.run_sync(self.agenerate_all(sections, overrides=overrides, inputs=inputs))
+
+    async def agenerate_versions(
+        self,
+        section: str,
+        versions: Sequence[str],
+        overrides: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """
+        One section for one issuer under several prompt_versions (A/B runs,
+        eval/experiment.py). Only the section segment differs between the prompts:
+        the shared static segments (base, industry, KPI pack) are rendered once and
+        reused, and the versions' LLM calls run concurrently.
+
+        Returns {version: result}; a failed version yields the exception object.
+        """
+        snapshot = self.snapshot
+        rendered: Dict[Tuple[str, str, str], str] = {}
+
+        async def one(version: str) -> Dict[str, Any]:
+            total_started_ns = time.perf_counter_ns()
+            version_overrides = dict(overrides or {}, prompt_version=version)
+            assembled_prompt, assembly_manifest = await self._arender(
+                snapshot, section, version_overrides, inputs, rendered=rendered
+            )
+            started_ns = time.perf_counter_ns()
+            llm_output = await self._acall_llm(snapshot, section, assembled_prompt, assembly_manifest)
+            self._finish_llm(assembly_manifest, llm_output, started_ns, total_started_ns)
+            return {"prompt": assembled_prompt, "manifest": assembly_manifest, "output": llm_output}
+
+        results = await asyncio.gather(*(one(v) for v in versions), return_exceptions=True)
+        return dict(zip(versions, results))
+
+    async def agenerate_long(
+        self,
+        section: str,
+        documents: Iterable[Any],
+        overrides: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Map-reduce generate() for inputs too long for one prompt (engine/map_reduce.py):
+        documents (paths or text) are streamed into overlapping chunks, facts are
+        extracted per chunk concurrently (cached per chunk), and the merged facts are
+        the section prompt's inputs. manifest["map_reduce"] has the chunk / cache stats.
+        """
+        snapshot = self.snapshot
+        if self._map_reducer is None:
+            self._map_reducer = MapReducer(self)
+        facts, stats = await self._map_reducer.amap(snapshot, section, documents, overrides)
+        reduced = MapReducer.reduce_inputs(facts)
+
+        total_started_ns = time.perf_counter_ns()
+        assembled_prompt, assembly_manifest = await self._arender(snapshot, section, overrides, reduced, use_evidence=False)
+        version = assembly_manifest["router_manifest"].get("prompt_version")
+        self.stage_timers.observe("map", int(stats["map_ms"] * 1e6), section, version)
+        assembly_manifest["map_reduce"] = dict(stats, facts_chars=len(reduced))
+        started_ns = time.perf_counter_ns()
+        llm_output = await self._acall_llm(snapshot, section, assembled_prompt, assembly_manifest)
+        self._finish_llm(assembly_manifest, llm_output, started_ns, total_started_ns)
+        return {"prompt": assembled_prompt, "manifest": assembly_manifest, "output": llm_output}
+
+    def generate_long(
+        self,
+        section: str,
+        documents: Iterable[Any],
+        overrides: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Sync wrapper around agenerate_long (runs on the LLM client's background loop)."""
+        return self.llm.run_sync(self.agenerate_long(section, documents, overrides=overrides))
+
+    def close(self) -> None:
+        """Flushes telemetry and releases the LLM client's connections / cache."""
+        self.events.close()
+        self.llm.close()
+        if self._map_reducer is not None:
+            self._map_reducer.close()
+
+    def run(self, section: str) -> str:
+        result = self.generate(section)
+        assembled_prompt = result["prompt"]
+        assembly_manifest = result["manifest"]
+        llm_output = result["output"]
 
         return (
             "===== PROMPT MANIFEST =====\n"
@@ -103,3 +665,22 @@ class Runtime:
             "===== LLM OUTPUT (stub today) =====\n"
             f"{llm_output}\n"
         )
+
+    def run_all(
+        self,
+        sections: Optional[Iterable[str]] = None,
+        overrides: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        results = self.generate_all(sections, overrides=overrides)
+        blocks = []
+        for section, result in results.items():
+            if isinstance(result, Exception):
+                blocks.append(f"===== {section}: FAILED =====\n{type(result).__name__}: {result}\n")
+                continue
+            blocks.append(
+                f"===== {section}: PROMPT MANIFEST =====\n"
+                f"{json.dumps(result['manifest'], indent=2)}\n\n"
+                f"===== {section}: LLM OUTPUT (stub today) =====\n"
+                f"{result['output']}\n"
+            )
+        return "\n".join(blocks)
@@ -0,0 +1,302 @@
+"""
+Long-lived generation server: one warm Runtime behind a small asyncio HTTP/1.1
+server (TCP or Unix socket), so requests skip interpreter startup, YAML parsing
+and config hydration.
+
+    python -m prompt_lifecycle.cli.main serve --config src/prompt_lifecycle/config/company_overview.yaml --port 8090
+
+Endpoints (JSON in, JSON out; connections are kept alive; bodies are capped at
+max_body_bytes, 413 past it):
+
+  POST /generate  {"section", "overrides"?, "inputs"?}  -> {"output", "manifest"}
+  POST /prompt    {"section", "overrides"?, "inputs"?}  -> {"prompt", "manifest"}
+  POST /manifest  {"section", "overrides"?, "inputs"?}  -> {"manifest"}
+  POST /reload                                          -> {"reloaded", "snapshot"}
+  GET  /health                                          -> snapshot / reload status
+
+overrides are per request (industry, sub_industry, prompt_version, kpi_pack; see
+Router.route); the shared config is never mutated.
+
+Hot reload: every watch_interval_s the server stats the run config, the YAML
+files it references and every prompt template (Runtime.watched_paths). On a
+change it builds a new ConfigSnapshot off the event loop and swaps it in with a
+single assignment. Requests already in flight finish on the snapshot they
+started with (templates are pinned per snapshot); a config that fails to compile
+is reported on /health and the old snapshot keeps serving.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from prompt_lifecycle.engine.llm_client import LLMTimeoutError, ProviderError
+from prompt_lifecycle.engine.runtime import Runtime
+
+Signature = Tuple[Tuple[str, int, int], ...]
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+}
+
+
+class _BadRequest(Exception):
+    """A request that cannot be framed (bad / oversized Content-Length): answered, then the connection is closed."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class GenerationServer:
+    def __init__(
+        self,
+        runtime: Runtime,
+        host: str = "127.0.0.1",
+        port: int = 8090,
+        unix_path: Optional[str] = None,
+        watch_interval_s: float = 1.0,
+        max_body_bytes: int = 8 * 1024 * 1024,
+    ):
+        self.runtime = runtime
+        self.max_body_bytes = max_body_bytes
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.watch_interval_s = watch_interval_s
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._reload_lock = asyncio.Lock()
+        self._signature: Signature = ()
+
+        self.started_at = time.time()
+        self.reload_status: Dict[str, Any] = {"reloads": 0, "failures": 0, "last_error": None, "last_reload_at": None}
+        self.stats = {"requests": 0, "errors": 0, "connections": 0}
+
+    @property
+    def address(self) -> str:
+        return f"unix:{self.unix_path}" if self.unix_path else f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "GenerationServer":
+        if self.unix_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+        self._signature = _signature(self.runtime.watched_paths())
+        if self.watch_interval_s > 0:
+            self._watcher = asyncio.create_task(self._watch())
+        return self
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+
+    async def __aenter__(self) -> "GenerationServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    # ---- hot reload ----
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.watch_interval_s)
+            try:
+                signature = _signature(self.runtime.watched_paths())
+            except OSError:
+                continue  # a file is mid-replace; look again next tick
+            if signature != self._signature:
+                await self.reload()
+
+    async def reload(self) -> bool:
+        """Rebuilds the snapshot in a worker thread and swaps it in. False if the new config failed."""
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self.runtime.reload)
+            except Exception as exc:  # any broken config (YAML, routing, templates) keeps the old snapshot
+                self.reload_status["failures"] += 1
+                self.reload_status["last_error"] = f"{type(exc).__name__}: {exc}"
+                ok = False
+            else:
+                self.reload_status["reloads"] += 1
+                self.reload_status["last_error"] = None
+                ok = True
+            self.reload_status["last_reload_at"] = time.time()
+            # Re-read after the reload: a new config can reference new files. After a
+            # failure this also stops retrying the same broken files every tick.
+            try:
+                self._signature = _signature(self.runtime.watched_paths())
+            except OSError:
+                self._signature = ()
+            return ok
+
+    # ---- HTTP ----
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader, self.max_body_bytes)
+                except _BadRequest as exc:
+                    # The body was not read, so the connection cannot be reused
+                    status, payload = self._error(exc.status, str(exc))
+                    writer.write(_encode_response(status, payload, close=True))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, body = request
+                status, payload = await self._dispatch(method, path, body)
+                writer.write(_encode_response(status, payload))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # client went away, or the server is shutting down
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        self.stats["requests"] += 1
+        route = _ROUTES.get(path)
+        if route is None:
+            return self._error(404, f"unknown path '{path}'")
+        allowed, handler_name = route
+        if method != allowed:
+            return self._error(405, f"{path} expects {allowed}")
+
+        try:
+            request = json.loads(body) if body else {}
+            if not isinstance(request, dict):
+                raise ValueError("request body must be a JSON object")
+            return 200, await getattr(self, handler_name)(request)
+        except (KeyError, ValueError) as exc:
+            return self._error(400, str(exc))
+        except (ProviderError, LLMTimeoutError) as exc:
+            return self._error(502, str(exc))
+        except Exception as exc:  # keep serving; the client gets the error
+            return self._error(500, f"{type(exc).__name__}: {exc}")
+
+    def _error(self, status: int, message: str) -> Tuple[int, Dict[str, Any]]:
+        self.stats["errors"] += 1
+        return status, {"error": message}
+
+    @staticmethod
+    def _request_args(request: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]], Any]:
+        section = request.get("section")
+        if not section:
+            raise ValueError("'section' is required")
+        overrides = request.get("overrides")
+        if overrides is not None and not isinstance(overrides, dict):
+            raise ValueError("'overrides' must be an object")
+        return section, overrides, request.get("inputs")
+
+    async def _generate(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        section, overrides, inputs = self._request_args(request)
+        result = await self.runtime.agenerate(section, overrides=overrides, inputs=inputs)
+        return {"output": result["output"], "manifest": result["manifest"]}
+
+    async def _render(self, request: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        # Off the event loop: rendering can build, pickle and write an evidence index
+        section, overrides, inputs = self._request_args(request)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.runtime.render(section, overrides=overrides, inputs=inputs))
+
+    async def _prompt(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        prompt, manifest = await self._render(request)
+        return {"prompt": prompt, "manifest": manifest}
+
+    async def _manifest(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        _, manifest = await self._render(request)
+        return {"manifest": manifest}
+
+    async def _reload(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        ok = await self.reload()
+        return {"reloaded": ok, "snapshot": self.runtime.config_source, **self.reload_status}
+
+    async def _health(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "snapshot": self.runtime.config_source,
+            "reload": self.reload_status,
+            "watched_files": len(self._signature),
+            **self.stats,
+        }
+
+
+# path -> (method, handler)
+_ROUTES = {
+    "/generate": ("POST", "_generate"),
+    "/prompt": ("POST", "_prompt"),
+    "/manifest": ("POST", "_manifest"),
+    "/reload": ("POST", "_reload"),
+    "/health": ("GET", "_health"),
+}
+
+
+def _signature(paths: List[str]) -> Signature:
+    signature = []
+    for path in sorted(set(paths)):
+        st = os.stat(path)
+        signature.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+async def _read_request(reader: asyncio.StreamReader, max_body_bytes: int) -> Optional[Tuple[str, str, bytes]]:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, _, rest = request_line.decode("latin-1").strip().partition(" ")
+    path = rest.partition(" ")[0].partition("?")[0]
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    raw_length = headers.get("content-length", "0")
+    if not raw_length.isdigit():
+        raise _BadRequest(400, f"invalid Content-Length '{raw_length}'")
+    length = int(raw_length)
+    if length > max_body_bytes:
+        raise _BadRequest(413, f"request body of {length} bytes exceeds the {max_body_bytes} byte limit")
+    body = await reader.readexactly(length)
+    return method.upper(), path, body
+
+
+def _encode_response(status: int, body: Dict[str, Any], close: bool = False) -> bytes:
+    raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    head = "\r\n".join(
+        [
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}",
+            "Connection: close" if close else "Connection: keep-alive",
+            "Content-Type: application/json",
+            f"Content-Length: {len(raw)}",
+        ]
+    )
+    return (head + "\r\n\r\n").encode("latin-1") + raw
@@ -0,0 +1,408 @@
+"""
+A/B experiment over a section's prompt_versions: every dataset case is generated
+under each version, scored online, and compared case by case against a baseline
+version until a sequential test decides.
+
+    python -m prompt_lifecycle.cli.main experiment \\
+        --config src/prompt_lifecycle/config/company_overview.yaml \\
+        --dataset src/prompt_lifecycle/eval/datasets/company_overview.jsonl \\
+        --section company_overview --versions v2025_01_10 v2025_02_15 \\
+        --output .cache/experiment_company_overview.jsonl
+
+    experiment:
+      metric: passed          # passed | an eval score (kpi_coverage, evidence_coverage, ...) | judge
+      higher_is_better: true
+      alpha: 0.05             # chance of calling a difference that is not there
+      beta: 0.2               # chance of missing a difference of min_effect
+      min_effect: 0.2         # smallest shift in P(challenger wins a case) worth detecting
+      min_pairs: 10           # no decision before this many paired cases
+      max_parallel: 8         # version/case generations in flight
+
+Per case, Runtime.agenerate_versions renders the shared static segments (base,
+industry, KPI pack) once and only the section segment per version; the versions'
+calls and up to max_parallel // versions cases run concurrently. Each output is
+scored with the eval runner's text / KPI checks (or the LLM judge, all versions of
+a case in one judge call, in an order shuffled per case) and aggregated per
+version as results arrive. A case whose generation, scoring or judging fails is
+an errored pair: counted, skipped by the test, never the end of the run.
+
+Test: for each challenger, every case both it and the baseline completed is a
+pair; a higher metric is a win, a lower one a loss, ties are dropped. A Wald SPRT
+on the win probability (0.5 vs 0.5 +- min_effect, alpha split over the two
+directions) decides "better", "worse" or "no_difference". A decided challenger is
+not generated for later cases, and the run stops once every challenger is decided:
+cases still queued are never sent to the model.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from prompt_lifecycle.cli.main import add_cache_argument
+from prompt_lifecycle.engine.batch import read_records
+from prompt_lifecycle.engine.routing import OVERRIDE_KEYS
+from prompt_lifecycle.engine.runtime import Runtime
+from prompt_lifecycle.eval.kpi_eval import KPIMatcher
+from prompt_lifecycle.eval.metrics import EvalAggregator, RunningStats
+from prompt_lifecycle.eval.run_tests import score_output
+
+METRIC_PASSED = "passed"
+METRIC_JUDGE = "judge"
+
+DECISIONS = ("better", "worse", "no_difference")
+
+
+class SequentialSignTest:
+    """
+    Wald SPRT on paired outcomes, run as two one-sided tests of H0: P(win) = 0.5
+    against P(win) = 0.5 + min_effect ("better") and 0.5 - min_effect ("worse"),
+    each at alpha / 2. Both rejecting their alternative means "no_difference".
+    The decision is final once made.
+    """
+
+    def __init__(self, alpha: float = 0.05, beta: float = 0.2, min_effect: float = 0.2, min_pairs: int = 10):
+        if not 0.0 < min_effect < 0.5:
+            raise ValueError("experiment.min_effect must be between 0 and 0.5")
+        if not (0.0 < alpha < 1.0 and 0.0 < beta < 1.0):
+            raise ValueError("experiment.alpha and experiment.beta must be between 0 and 1")
+        self.min_pairs = min_pairs
+        self.upper = math.log((1.0 - beta) / (alpha / 2.0))
+        self.lower = math.log(beta / (1.0 - alpha / 2.0))
+        p1 = 0.5 + min_effect
+        self._win = math.log(p1 / 0.5)  # log-likelihood step of a win under "better"
+        self._loss = math.log((1.0 - p1) / 0.5)
+        self.wins = self.losses = self.ties = 0
+        self.decision: Optional[str] = None
+        self.decided_at: Optional[int] = None  # pairs seen when decided
+
+    @property
+    def pairs(self) -> int:
+        return self.wins + self.losses + self.ties
+
+    def llr(self) -> Tuple[float, float]:
+        """(log-likelihood ratio for "better", for "worse") over wins / losses so far."""
+        better = self.wins * self._win + self.losses * self._loss
+        worse = self.wins * self._loss + self.losses * self._win
+        return better, worse
+
+    def add(self, diff: float) -> Optional[str]:
+        """One pair (challenger metric - baseline metric, oriented so > 0 is better)."""
+        if self.decision is not None:
+            return self.decision
+        if diff > 0:
+            self.wins += 1
+        elif diff < 0:
+            self.losses += 1
+        else:
+            self.ties += 1
+        if self.pairs < self.min_pairs:
+            return None
+
+        better, worse = self.llr()
+        if better >= self.upper:
+            self.decision = "better"
+        elif worse >= self.upper:
+            self.decision = "worse"
+        elif better <= self.lower and worse <= self.lower:
+            self.decision = "no_difference"
+        if self.decision is not None:
+            self.decided_at = self.pairs
+        return self.decision
+
+    def snapshot(self) -> Dict[str, Any]:
+        better, worse = self.llr()
+        return {
+            "pairs": self.pairs,
+            "wins": self.wins,
+            "losses": self.losses,
+            "ties": self.ties,
+            "llr_better": round(better, 4),
+            "llr_worse": round(worse, 4),
+            "bounds": [round(self.lower, 4), round(self.upper, 4)],
+            "decision": self.decision,
+            "decided_at_pairs": self.decided_at,
+        }
+
+
+class Experiment:
+    def __init__(
+        self,
+        runtime: Runtime,
+        section: str,
+        versions: Sequence[str],
+        baseline: Optional[str] = None,
+        metric: Optional[str] = None,
+        include_output: bool = False,
+    ):
+        cfg = runtime.config.get("experiment", {}) or {}
+        known = (((runtime.config.get("sections", {}) or {}).get(section, {}) or {}).get("prompt_versions", {}) or {})
+        versions = list(dict.fromkeys(versions or known))
+        unknown = [v for v in versions if v not in known]
+        if unknown:
+            raise ValueError(f"Unknown prompt_version(s) for section '{section}': {', '.join(unknown)}. Available: {', '.join(known)}")
+        if len(versions) < 2:
+            raise ValueError("An experiment needs at least two prompt versions")
+        baseline = baseline or versions[0]
+        if baseline not in versions:
+            raise ValueError(f"Baseline '{baseline}' is not one of the experiment's versions")
+
+        self.runtime = runtime
+        self.section = section
+        self.baseline = baseline
+        self.versions = [baseline] + [v for v in versions if v != baseline]
+        self.metric = metric or cfg.get("metric", METRIC_PASSED)
+        self.sign = 1.0 if cfg.get("higher_is_better", True) else -1.0
+        self.max_parallel = max(1, int(cfg.get("max_parallel", 8)))
+        self.include_output = include_output
+
+        self.tests = {
+            v: SequentialSignTest(
+                alpha=float(cfg.get("alpha", 0.05)),
+                beta=float(cfg.get("beta", 0.2)),
+                min_effect=float(cfg.get("min_effect", 0.2)),
+                min_pairs=int(cfg.get("min_pairs", 10)),
+            )
+            for v in self.versions[1:]
+        }
+        self.aggregates = {v: EvalAggregator() for v in self.versions}
+        self.metric_stats = {v: RunningStats() for v in self.versions}
+        self.cost_usd = {v: 0.0 for v in self.versions}
+        self.generations = {v: 0 for v in self.versions}
+        self.errored_pairs = {v: 0 for v in self.tests}
+        self.cases = 0
+
+        self.matcher = KPIMatcher(runtime.config.get("kpi_registry", {}) or {})
+        self.judge = None
+        if self.metric == METRIC_JUDGE:
+            from prompt_lifecycle.eval.llm_judge import LLMJudge
+
+            self.judge = LLMJudge(runtime)
+
+    def active_versions(self) -> List[str]:
+        """Baseline plus every challenger still undecided (baseline alone once all are decided)."""
+        return [self.baseline] + [v for v, test in self.tests.items() if test.decision is None]
+
+    def decided(self) -> bool:
+        return all(test.decision is not None for test in self.tests.values())
+
+    def _metric_value(self, result: Dict[str, Any]) -> Optional[float]:
+        if "error" in result:
+            return None
+        if self.metric == METRIC_PASSED:
+            return 1.0 if result.get("passed") else 0.0
+        if self.metric == METRIC_JUDGE:
+            return (result.get("judge") or {}).get("overall")
+        value = (result.get("scores") or {}).get(self.metric)
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+    async def _run_case(self, index: int, case: Dict[str, Any], versions: List[str]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        overrides = {k: case.get(k) for k in OVERRIDE_KEYS if k != "prompt_version"}
+        inputs = case.get("inputs")
+        expected = case.get("expected", {}) or {}
+        generated = await self.runtime.agenerate_versions(self.section, versions, overrides=overrides, inputs=inputs)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for version, outcome in generated.items():
+            result: Dict[str, Any] = {"index": index, "id": case.get("id"), "version": version}
+            if isinstance(outcome, BaseException):
+                result["error"] = f"{type(outcome).__name__}: {outcome}"
+            else:
+                manifest, output = outcome["manifest"], outcome["output"]
+                try:
+                    result.update(score_output(self.runtime, self.matcher, self.section, manifest, output, inputs, expected))
+                except Exception as exc:
+                    result["error"] = f"scoring: {type(exc).__name__}: {exc}"
+                else:
+                    result["scores"]["input_tokens"] = manifest["tokens"]["input"]
+                result["cost_usd"] = manifest["cost"]["total_usd"]
+                result["output"] = output
+            results[version] = result
+
+        if self.judge is not None:
+            from prompt_lifecycle.eval.llm_judge import JudgeCandidate
+
+            ok = [v for v in judge_order(case.get("id"), versions) if "error" not in results[v]]
+            inputs_text = "" if inputs is None else inputs if isinstance(inputs, str) else json.dumps(inputs, ensure_ascii=False)
+            candidates = [JudgeCandidate(str(case.get("id")), v, self.section, inputs_text, results[v]["output"]) for v in ok]
+            if candidates:
+                try:
+                    verdicts, _ = await self.judge.ajudge(candidates)
+                except Exception as exc:  # the generations stand; this case just has no metric
+                    verdicts = [{"error": f"{type(exc).__name__}: {exc}"}] * len(ok)
+                for version, verdict in zip(ok, verdicts):
+                    results[version]["judge"] = verdict
+        return case, results
+
+    def _record(self, case: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> None:
+        self.cases += 1
+        values: Dict[str, Optional[float]] = {}
+        for version, result in results.items():
+            self.generations[version] += 1
+            self.aggregates[version].add(result)
+            self.cost_usd[version] += result.get("cost_usd", 0.0)
+            values[version] = self._metric_value(result)
+            if values[version] is not None:
+                self.metric_stats[version].add(values[version])
+
+        base = values.get(self.baseline)
+        for version, test in self.tests.items():
+            if version not in results or test.decision is not None:
+                continue
+            value = values.get(version)
+            if base is None or value is None:
+                self.errored_pairs[version] += 1
+            else:
+                test.add(self.sign * (value - base))
+
+    async def arun(self, cases: Iterable[Tuple[int, Dict[str, Any]]], out: Optional[Any] = None) -> Dict[str, Any]:
+        """Runs cases until every challenger is decided or the cases run out; returns the report."""
+        started = time.perf_counter()
+        in_flight: Set[asyncio.Future] = set()
+        launched: Dict[asyncio.Future, Tuple[int, Dict[str, Any], List[str]]] = {}
+        queued = iter(cases)
+        exhausted = False
+
+        def collect(done: Iterable[asyncio.Future]) -> None:
+            for task in done:
+                index, case, versions = launched.pop(task)
+                try:
+                    case, results = task.result()
+                except Exception as exc:  # recorded as errored pairs, never the end of the run
+                    error = f"{type(exc).__name__}: {exc}"
+                    results = {v: {"index": index, "id": case.get("id"), "version": v, "error": error} for v in versions}
+                self._record(case, results)
+                if out is not None:
+                    for result in results.values():
+                        if not self.include_output:
+                            result.pop("output", None)
+                        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+        try:
+            while not self.decided():
+                active = self.active_versions()
+                if len(in_flight) >= max(1, self.max_parallel // len(active)):
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    collect(done)
+                    continue
+                item = next(queued, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, case = item
+                task = asyncio.ensure_future(self._run_case(index, case, active))
+                launched[task] = (index, case, active)
+                in_flight.add(task)
+            if exhausted and in_flight:
+                done, in_flight = await asyncio.wait(in_flight)
+                collect(done)
+        finally:
+            # Decided: cases still in flight are cancelled, not paid for
+            for task in in_flight:
+                task.cancel()
+
+        return self.report(stopped_early=not exhausted, cancelled=len(in_flight), elapsed_s=time.perf_counter() - started)
+
+    def run(self, cases: Iterable[Tuple[int, Dict[str, Any]]], out: Optional[Any] = None) -> Dict[str, Any]:
+        return self.runtime.llm.run_sync(self.arun(cases, out))
+
+    def report(self, stopped_early: bool = False, cancelled: int = 0, elapsed_s: float = 0.0) -> Dict[str, Any]:
+        versions = {}
+        for version in self.versions:
+            versions[version] = {
+                "generations": self.generations[version],
+                "metric": self.metric_stats[version].summary(),
+                "cost_usd": round(self.cost_usd[version], 6),
+                "eval": self.aggregates[version].summary(),
+            }
+        return {
+            "section": self.section,
+            "baseline": self.baseline,
+            "metric": self.metric,
+            "cases": self.cases,
+            "stopped_early": stopped_early,
+            "cancelled_cases": cancelled,
+            "elapsed_s": round(elapsed_s, 3),
+            "tests": {
+                version: dict(test.snapshot(), errored_pairs=self.errored_pairs[version]) for version, test in self.tests.items()
+            },
+            "versions": versions,
+        }
+
+    def close(self) -> None:
+        if self.judge is not None:
+            self.judge.close()
+
+
+def judge_order(case_id: Any, versions: Sequence[str]) -> List[str]:
+    """
+    Versions in a per-case shuffled order for the judge prompt (c1, c2, ...), so a
+    judge's position bias does not always favour the same version. Seeded by the
+    case id: a re-run builds the same prompts (and hits the caches).
+    """
+    seed = int(hashlib.sha256(str(case_id).encode("utf-8")).hexdigest()[:16], 16)
+    order = list(versions)
+    random.Random(seed).shuffle(order)
+    return order
+
+
+def _limit(records: Iterator[Tuple[int, Dict[str, Any]]], max_cases: Optional[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    for n, record in enumerate(records):
+        if max_cases is not None and n >= max_cases:
+            return
+        yield record
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="prompt_lifecycle experiment", description="A/B test a section's prompt versions")
+    parser.add_argument("--config", required=True, help="Path to the run-config YAML")
+    parser.add_argument("--dataset", required=True, help="JSONL dataset of eval cases (a case's prompt_version is ignored)")
+    parser.add_argument("--section", default="company_overview", help="Section under test")
+    parser.add_argument("--versions", nargs="+", help="prompt_versions to compare (default: all of the section's)")
+    parser.add_argument("--baseline", help="Version the others are tested against (default: the first)")
+    parser.add_argument("--metric", help="passed | an eval score name | judge (default: config experiment.metric)")
+    parser.add_argument("--max-cases", dest="max_cases", type=int, help="Stop after this many cases even if undecided")
+    parser.add_argument("--output", help="Per version/case results JSONL (overwritten)")
+    parser.add_argument("--include-output", dest="include_output", action="store_true", help="Store each output in the results")
+    add_cache_argument(parser)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    runtime = Runtime(args.config, cache_mode=args.cache)
+    experiment = None
+    out = None
+    try:
+        experiment = Experiment(
+            runtime,
+            args.section,
+            args.versions or [],
+            baseline=args.baseline,
+            metric=args.metric,
+            include_output=args.include_output,
+        )
+        if args.output:
+            out_dir = os.path.dirname(args.output)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+            out = open(args.output, "w", encoding="utf-8")
+        report = experiment.run(_limit(read_records(args.dataset), args.max_cases), out)
+    finally:
+        if out is not None:
+            out.close()
+        if experiment is not None:
+            experiment.close()
+        runtime.close()
+
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
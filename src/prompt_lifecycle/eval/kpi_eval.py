@@ -1 +1,275 @@
-# KPI consistency checks
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from prompt_lifecycle.schemas.base import EVIDENCE_MARKER
+
+# Figures as written in outputs / filings: 1,200 | 18 | 1.2 (units and signs are ignored)
+_NUMBER = re.compile(r"\d+(?:,\d{3})*(?:\.\d+)?")
+
+
+def kpi_terms(kpi_id: str, registry: Dict[str, Any]) -> List[str]:
+    """Lower-cased surface forms a KPI can appear as in text: its label and its id."""
+    entry = registry.get(kpi_id, {}) or {}
+    terms = [kpi_id.lower(), kpi_id.replace("_", " ").lower()]
+    label = entry.get("label")
+    if label:
+        terms.append(str(label).lower())
+        # "Free cash flow (FCF)" -> also "free cash flow" and "fcf"
+        if "(" in label and label.endswith(")"):
+            head, _, abbrev = label[:-1].partition("(")
+            terms += [head.strip().lower(), abbrev.strip().lower()]
+    return [t for t in dict.fromkeys(terms) if t]
+
+
+def numbers_in(text: str) -> Set[str]:
+    return {n.replace(",", "") for n in _NUMBER.findall(text)}
+
+
+class KPIMatcher:
+    """
+    Every label / id / abbreviation in the KPI registry compiled into one regex,
+    built once per registry and reused for every output (one C-level scan per text
+    instead of a substring test per term per KPI).
+
+    The terms are folded into a character trie before compiling, so the regex
+    engine follows one branch per character rather than backtracking through ~150
+    alternatives at every position (~9x faster than the substring loop; a flat
+    alternation was slower than the loop). Greedy optional suffixes keep
+    longest-match semantics ("revenue growth (yoy)" wins over "revenue"), and
+    matches must sit on word boundaries ("capex" does not hit "capex_intensity").
+
+    Columns: kpi_ids gives the fixed KPI order used by hit matrices.
+    """
+
+    def __init__(self, registry: Dict[str, Any]):
+        self.kpi_ids: Tuple[str, ...] = tuple(registry)
+        self.column: Dict[str, int] = {kpi_id: i for i, kpi_id in enumerate(self.kpi_ids)}
+
+        self._term_column: Dict[str, int] = {}
+        for i, kpi_id in enumerate(self.kpi_ids):
+            for term in kpi_terms(kpi_id, registry):
+                self._term_column.setdefault(term, i)
+
+        self._pattern: Optional[re.Pattern] = None
+        if self._term_column:
+            self._pattern = re.compile(rf"(?<![a-z0-9_])(?:{_trie_pattern(self._term_column)})(?![a-z0-9_])")
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yields (column, start, end) for every KPI mention; offsets index text.lower()."""
+        if self._pattern is None:
+            return
+        term_column = self._term_column
+        for match in self._pattern.finditer(text.lower()):
+            yield term_column[match.group(0)], match.start(), match.end()
+
+    def columns(self, text: str) -> Set[int]:
+        return {column for column, _, _ in self.finditer(text)}
+
+    def mentioned(self, text: str) -> List[str]:
+        """Mentioned KPI ids in column order."""
+        return [self.kpi_ids[c] for c in sorted(self.columns(text))]
+
+    def claim_numbers(self, text: str) -> Dict[int, Set[str]]:
+        """
+        column -> figures stated alongside that KPI. Works per line on the claim part
+        (before any **Evidence:** note): every figure in a claim is attributed to every
+        KPI the claim mentions.
+        """
+        found: Dict[int, Set[str]] = {}
+        for line in text.splitlines():
+            claim = line.partition(EVIDENCE_MARKER)[0]
+            columns = self.columns(claim)
+            if not columns:
+                continue
+            figures = numbers_in(claim)
+            if figures:
+                for c in columns:
+                    found.setdefault(c, set()).update(figures)
+        return found
+
+    def hit_matrix(self, texts: Sequence[str]):
+        """(len(texts), len(kpi_ids)) bool NumPy array; [i, j] is True when text i mentions KPI j."""
+        np = _numpy()
+        hits = np.zeros((len(texts), len(self.kpi_ids)), dtype=bool)
+        for row, text in enumerate(texts):
+            columns = self.columns(text)
+            if columns:
+                hits[row, list(columns)] = True
+        return hits
+
+    def pack_mask(self, packs: Sequence[Sequence[str]]):
+        """(len(packs), len(kpi_ids)) bool NumPy array of pack membership, one row per output."""
+        np = _numpy()
+        mask = np.zeros((len(packs), len(self.kpi_ids)), dtype=bool)
+        cache: Dict[Tuple[str, ...], List[int]] = {}
+        for row, kpi_ids in enumerate(packs):
+            key = tuple(kpi_ids)
+            columns = cache.get(key)
+            if columns is None:
+                columns = cache[key] = [self.column[k] for k in key if k in self.column]
+            mask[row, columns] = True
+        return mask
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """Regex source matching exactly `terms`, factored on shared prefixes."""
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        ends_here = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            body = f"(?:{body})?" if len(branches) == 1 else body + "?"
+        return body
+
+    return build(trie)
+
+
+def _numpy():
+    # Optional dependency: only the corpus-level (matrix) checks need it
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImportError("Corpus-level KPI checks need numpy (pip install numpy)") from exc
+    return numpy
+
+
+def evaluate_kpis(
+    output: str,
+    pack_kpi_ids: Sequence[str],
+    matcher: KPIMatcher,
+    expected_kpis: Optional[Sequence[str]] = None,
+    inputs_text: str = "",
+) -> Dict[str, Any]:
+    """
+    KPI consistency checks for one output against its routed KPI pack.
+
+      kpis_in_pack:      every registry KPI mentioned belongs to the routed pack
+      kpis_supported:    every KPI mentioned appears in the input materials
+                         (prompts say: only reference KPIs present in the materials)
+      numbers_supported: every figure stated next to a KPI appears in the inputs
+      kpis_expected:     if expected_kpis is given, all of them are mentioned
+
+    Returns {"checks": {...}, "scores": {...}, "mentioned": [...], "failures": [...]}.
+    """
+    mentioned = matcher.mentioned(output)
+    pack = set(pack_kpi_ids)
+    checks: Dict[str, bool] = {}
+    scores: Dict[str, Any] = {"kpis_mentioned": len(mentioned)}
+    failures: List[str] = []
+
+    off_pack = [k for k in mentioned if k not in pack]
+    checks["kpis_in_pack"] = not off_pack
+    failures.extend(f"KPI '{k}' is not in the routed pack" for k in off_pack)
+
+    if inputs_text:
+        in_inputs = {matcher.kpi_ids[c] for c in matcher.columns(inputs_text)}
+        unsupported = [k for k in mentioned if k not in in_inputs]
+        checks["kpis_supported"] = not unsupported
+        failures.extend(f"KPI '{k}' not in the provided materials" for k in unsupported)
+
+        available = pack & in_inputs
+        if available:
+            scores["kpi_coverage"] = round(len(available.intersection(mentioned)) / len(available), 4)
+
+        input_figures = numbers_in(inputs_text)
+        invented = {
+            matcher.kpi_ids[c]: sorted(figures - input_figures)
+            for c, figures in matcher.claim_numbers(output).items()
+            if figures - input_figures
+        }
+        checks["numbers_supported"] = not invented
+        failures.extend(f"KPI '{k}' states figures not in the materials: {', '.join(v)}" for k, v in sorted(invented.items()))
+
+    if expected_kpis is not None:
+        expected_set = set(expected_kpis)
+        hits = expected_set.intersection(mentioned)
+        recall = len(hits) / len(expected_set) if expected_set else 1.0
+        precision = len(hits) / len(mentioned) if mentioned else (1.0 if not expected_set else 0.0)
+        scores["kpi_recall"] = round(recall, 4)
+        scores["kpi_precision"] = round(precision, 4)
+        checks["kpis_expected"] = recall == 1.0
+        failures.extend(f"expected KPI '{k}' not mentioned" for k in sorted(expected_set - hits))
+
+    return {"checks": checks, "scores": scores, "mentioned": mentioned, "failures": failures}
+
+
+def corpus_kpi_report(
+    matcher: KPIMatcher,
+    outputs: Sequence[str],
+    packs: Sequence[Sequence[str]],
+    inputs: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Vectorized KPI consistency over a whole corpus (needs numpy). packs[i] is the
+    routed pack's KPI ids for outputs[i]; inputs[i] its input materials.
+
+    Rates are shares of outputs:
+      pack_compliance   mentions only KPIs from its pack
+      hallucinated_kpi  mentions a KPI absent from its inputs        (needs inputs)
+      invented_number   states a figure for a KPI absent from inputs (needs inputs)
+      coverage          mean share of in-pack KPIs present in the inputs that the
+                        output mentions, over outputs with at least one (needs inputs)
+
+    Per-KPI counts (off_pack / hallucinated / invented_number) list the worst offenders.
+    """
+    np = _numpy()
+    if len(packs) != len(outputs) or (inputs is not None and len(inputs) != len(outputs)):
+        raise ValueError("outputs, packs and inputs must be the same length")
+
+    hits = matcher.hit_matrix(outputs)
+    in_pack = matcher.pack_mask(packs)
+    off_pack = hits & ~in_pack
+    report: Dict[str, Any] = {
+        "outputs": len(outputs),
+        "kpis": len(matcher.kpi_ids),
+        "rates": {"pack_compliance": _mean(np, ~off_pack.any(axis=1))},
+        "per_kpi": {"off_pack": _top_counts(matcher, off_pack.sum(axis=0))},
+    }
+
+    if inputs is not None:
+        in_inputs = matcher.hit_matrix(inputs)
+        hallucinated = hits & ~in_inputs
+
+        invented = np.zeros_like(hits)
+        for row, (output, text) in enumerate(zip(outputs, inputs)):
+            input_figures = None
+            for column, figures in matcher.claim_numbers(output).items():
+                if input_figures is None:
+                    input_figures = numbers_in(text)
+                if figures - input_figures:
+                    invented[row, column] = True
+
+        available = in_pack & in_inputs
+        available_n = available.sum(axis=1)
+        covered_n = (available & hits).sum(axis=1)
+        has_available = available_n > 0
+        coverage = covered_n[has_available] / available_n[has_available]
+
+        report["rates"].update(
+            hallucinated_kpi=_mean(np, hallucinated.any(axis=1)),
+            invented_number=_mean(np, invented.any(axis=1)),
+            coverage=_mean(np, coverage),
+        )
+        report["per_kpi"].update(
+            hallucinated=_top_counts(matcher, hallucinated.sum(axis=0)),
+            invented_number=_top_counts(matcher, invented.sum(axis=0)),
+        )
+    return report
+
+
+def _mean(np, values) -> Optional[float]:
+    return round(float(np.mean(values)), 4) if values.size else None
+
+
+def _top_counts(matcher: KPIMatcher, counts, limit: int = 10) -> Dict[str, int]:
+    order = counts.argsort()[::-1][:limit]
+    return {matcher.kpi_ids[i]: int(counts[i]) for i in order if counts[i]}
@@ -1 +1,350 @@
-# optional LLM-as-judge
+"""
+LLM-as-judge scoring: rubric scores for generated sections, several candidates per
+judge call.
+
+    python -m prompt_lifecycle.cli.main judge \\
+        --config src/prompt_lifecycle/config/company_overview.yaml \\
+        --dataset src/prompt_lifecycle/eval/datasets/company_overview.jsonl \\
+        --results .cache/eval_v2025_01_10.jsonl .cache/eval_v2025_02_15.jsonl \\
+        --output .cache/judge_company_overview.jsonl
+
+--results are eval runner outputs written with --include-output (one file per
+prompt_version, say); candidates are joined to their dataset case by id for the
+inputs. Config:
+
+    judge:
+      model: large                      # models.yaml entry (default: llm.model)
+      rubric_version: v1                # bump when the rubric's meaning changes
+      template_path: judge/rubric.md    # static: role, criteria, response format
+      candidates_template_path: judge/candidates.md
+      criteria: {faithfulness: "...", ...}
+      batch_size: 4                     # candidates per judge call
+      max_concurrency: 8                # judge calls in flight
+      cache_path: .cache/judge_verdicts.sqlite
+
+Batching: candidates for the same case (section + inputs) share one judge call, up
+to batch_size at a time, so the materials are sent once and scored by the same
+reading. Candidates are anonymous (c1, c2, ...): the judge never sees which
+prompt_version wrote what. The response is one JSON document with a verdict per
+candidate; only when it does not parse, or misses a candidate or a score, is each
+candidate of that batch re-judged on its own. A judge call that still fails after
+the client's retries (provider error, timeout) leaves {"error": ...} verdicts for
+its candidates; the other calls go on.
+
+Verdicts are stored keyed on (rubric fingerprint, candidate hash). The rubric
+fingerprint covers rubric_version, the rendered rubric (template + criteria) and
+the judge model's params; the candidate hash covers section, inputs and output,
+not the label, so the same output from two prompt versions is judged once.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from prompt_lifecycle.cli.main import add_cache_argument
+from prompt_lifecycle.engine.batch import read_records
+from prompt_lifecycle.engine.llm_client import LLMTimeoutError, ProviderError
+from prompt_lifecycle.engine.prompt_loader import SCOPE_REQUEST, SCOPE_STATIC
+from prompt_lifecycle.engine.response_cache import SQLiteStore
+from prompt_lifecycle.engine.runtime import Runtime
+from prompt_lifecycle.utils.json_utils import parse_model_json
+
+SCORE_MIN, SCORE_MAX = 1, 5
+
+DEFAULT_CRITERIA = {
+    "faithfulness": "Every figure and claim is supported by the provided materials; nothing is invented or computed.",
+    "coverage": "Covers what the section is for, using the material facts available in the inputs.",
+    "kpi_usage": "Uses the industry's KPIs where the materials support them, with their figures and periods.",
+    "format": "Follows the section's required output format, headings and length.",
+}
+
+
+class JudgeCandidate(NamedTuple):
+    case_id: str
+    label: str  # what is being compared, e.g. the prompt_version; never shown to the judge
+    section: str
+    inputs_text: str
+    output: str
+
+
+def candidate_hash(candidate: JudgeCandidate) -> str:
+    h = hashlib.sha256()
+    for part in (candidate.section, candidate.inputs_text, candidate.output):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class LLMJudge:
+    def __init__(self, runtime: Runtime, store_path: Optional[str] = None, use_store: bool = True):
+        self.runtime = runtime
+        cfg = runtime.config.get("judge", {}) or {}
+        self.model: Optional[str] = cfg.get("model") or runtime.llm.model_name
+        runtime.llm.lane(self.model)  # unknown model fails here, not on the first call
+        self.rubric_version = str(cfg.get("rubric_version", "v1"))
+        self.template_path = cfg.get("template_path", "judge/rubric.md")
+        self.candidates_template_path = cfg.get("candidates_template_path", "judge/candidates.md")
+        self.criteria: Dict[str, str] = dict(cfg.get("criteria") or DEFAULT_CRITERIA)
+        self.batch_size = max(1, int(cfg.get("batch_size", 4)))
+        self.max_concurrency = max(1, int(cfg.get("max_concurrency", 8)))
+
+        self.store: Optional[SQLiteStore] = None
+        store_path = store_path or cfg.get("cache_path")
+        if use_store and store_path:
+            self.store = SQLiteStore(store_path, max_entries=int(cfg.get("max_cache_entries", 1_000_000)))
+
+        criteria_text = "\n".join(f"- **{name}**: {text}" for name, text in self.criteria.items())
+        self._rubric_variables = {"criteria": criteria_text}
+        rubric_text, _ = runtime.snapshot.prompt_loader.load({"segments": [self._rubric_segment()]})
+        self.rubric_fingerprint = hashlib.sha256(
+            f"{self.rubric_version}\0{runtime.llm.cache_key(rubric_text, self.model)}".encode("utf-8")
+        ).hexdigest()
+
+    def _rubric_segment(self) -> Dict[str, Any]:
+        return {"name": "judge_rubric", "scope": SCOPE_STATIC, "template_path": self.template_path, "variables": self._rubric_variables}
+
+    def verdict_key(self, candidate: JudgeCandidate) -> str:
+        return hashlib.sha256(f"{self.rubric_fingerprint}\0{candidate_hash(candidate)}".encode("utf-8")).hexdigest()
+
+    def prompt(self, candidates: Sequence[JudgeCandidate]) -> Tuple[str, Dict[str, Any]]:
+        """One judge prompt for candidates of the same case, ids c1..cN in the given order."""
+        first = candidates[0]
+        blocks = "\n\n".join(f"### Candidate c{i}\n\n{c.output.strip()}" for i, c in enumerate(candidates, 1))
+        segments = [
+            self._rubric_segment(),
+            {
+                "name": "judge_candidates",
+                "scope": SCOPE_REQUEST,
+                "template_path": self.candidates_template_path,
+                "variables": {
+                    "section": first.section,
+                    "input_materials": first.inputs_text or "(none)",
+                    "count": len(candidates),
+                    "candidates": blocks,
+                },
+            },
+        ]
+        return self.runtime.snapshot.prompt_loader.load({"manifest": {"stage": "judge"}, "segments": segments})
+
+    def parse_verdicts(self, text: str, count: int) -> List[Dict[str, Any]]:
+        """Verdicts for c1..c<count> in order. ValueError unless every candidate has every score."""
+        document, _ = parse_model_json(text)  # JSONParseError is a ValueError
+        verdicts = document.get("verdicts") if isinstance(document, dict) else document
+        if not isinstance(verdicts, list):
+            raise ValueError("judge response has no 'verdicts' list")
+
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for item in verdicts:
+            if isinstance(item, dict):
+                by_id[str(item.get("candidate", "")).strip()] = item
+
+        parsed = []
+        for i in range(1, count + 1):
+            item = by_id.get(f"c{i}")
+            if item is None:
+                raise ValueError(f"judge response has no verdict for candidate c{i}")
+            raw_scores = item.get("scores")
+            if not isinstance(raw_scores, dict):
+                raise ValueError(f"candidate c{i}: 'scores' is not an object")
+            scores = {}
+            for name in self.criteria:
+                value = raw_scores.get(name)
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or not SCORE_MIN <= value <= SCORE_MAX:
+                    raise ValueError(f"candidate c{i}: score '{name}' is missing or outside {SCORE_MIN}-{SCORE_MAX}")
+                scores[name] = value
+            parsed.append(
+                {
+                    "scores": scores,
+                    "overall": round(sum(scores.values()) / len(scores), 3),
+                    "rationale": str(item.get("rationale") or ""),
+                }
+            )
+        return parsed
+
+    async def ajudge(self, candidates: Sequence[JudgeCandidate]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """(one verdict per candidate in input order, stats)."""
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        llm = self.runtime.llm
+        cost = self.runtime._cost_for(self.model)
+        limit = asyncio.Semaphore(self.max_concurrency)
+        verdicts: List[Optional[Dict[str, Any]]] = [None] * len(candidates)
+        stats = {"candidates": len(candidates), "cached": 0, "judge_calls": 0, "batched": 0, "fallback_batches": 0,
+                 "single": 0, "errors": 0, "input_tokens": 0, "cost_usd": 0.0}
+
+        # Cached verdicts first (SQLite is blocking I/O: off the event loop); the rest
+        # are grouped by case
+        groups: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        keys = [self.verdict_key(c) for c in candidates]
+        stored: List[Optional[Tuple[str, float]]] = [None] * len(candidates)
+        if self.store is not None:
+            stored = await loop.run_in_executor(None, lambda: [self.store.get(key) for key in keys])
+        for i, c in enumerate(candidates):
+            found = stored[i]
+            if found is not None:
+                verdicts[i] = dict(json.loads(found[0]), source="cache")
+                stats["cached"] += 1
+            else:
+                groups[(c.section, c.inputs_text)].append(i)
+
+        async def call(indexes: List[int]) -> List[Dict[str, Any]]:
+            prompt, manifest = self.prompt([candidates[i] for i in indexes])
+            async with limit:
+                output = await llm.acall(prompt, model=self.model)
+            stats["judge_calls"] += 1
+            stats["input_tokens"] += manifest["tokens"]["input"]
+            stats["cost_usd"] += cost.estimate_text(manifest["tokens"]["input"], output)["total_usd"]
+            return self.parse_verdicts(output, len(indexes))
+
+        async def record(index: int, verdict: Dict[str, Any], source: str) -> None:
+            if self.store is not None:
+                await loop.run_in_executor(None, self.store.put, keys[index], json.dumps(verdict, ensure_ascii=False))
+            verdicts[index] = dict(verdict, source=source)
+
+        def failed(indexes: List[int], error: str, source: str) -> None:
+            stats["errors"] += len(indexes)
+            for i in indexes:
+                verdicts[i] = {"error": error, "source": source}
+
+        async def single(index: int) -> None:
+            try:
+                verdict = (await call([index]))[0]
+            except ValueError as exc:
+                failed([index], f"judge response did not parse: {exc}", "single")
+                return
+            except (ProviderError, LLMTimeoutError) as exc:
+                failed([index], f"judge call failed: {type(exc).__name__}: {exc}", "single")
+                return
+            stats["single"] += 1
+            await record(index, verdict, "single")
+
+        async def batch(indexes: List[int]) -> None:
+            if len(indexes) == 1:
+                await single(indexes[0])
+                return
+            try:
+                parsed = await call(indexes)
+            except ValueError:
+                stats["fallback_batches"] += 1
+                await asyncio.gather(*(single(i) for i in indexes))
+                return
+            except (ProviderError, LLMTimeoutError) as exc:
+                # Already retried by the client: re-sending each candidate would not help
+                failed(indexes, f"judge call failed: {type(exc).__name__}: {exc}", "batch")
+                return
+            stats["batched"] += len(indexes)
+            for i, verdict in zip(indexes, parsed):
+                await record(i, verdict, "batch")
+
+        batches = [
+            indexes[start : start + self.batch_size]
+            for indexes in groups.values()
+            for start in range(0, len(indexes), self.batch_size)
+        ]
+        await asyncio.gather(*(batch(b) for b in batches))
+
+        stats["cost_usd"] = round(stats["cost_usd"], 6)
+        stats["judge_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return [v or {} for v in verdicts], stats
+
+    def judge(self, candidates: Sequence[JudgeCandidate]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        return self.runtime.llm.run_sync(self.ajudge(candidates))
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+
+
+def load_candidates(dataset_path: str, results_paths: Sequence[str], default_section: str) -> List[JudgeCandidate]:
+    """Eval results (with outputs) joined to their dataset cases by id."""
+    cases: Dict[str, Dict[str, Any]] = {}
+    for _, case in read_records(dataset_path):
+        if case.get("id") is not None:
+            cases[str(case["id"])] = case
+
+    candidates: List[JudgeCandidate] = []
+    for path in results_paths:
+        fallback_label = os.path.splitext(os.path.basename(path))[0]
+        for _, result in read_records(path):
+            case = cases.get(str(result.get("id")))
+            if case is None or result.get("output") is None:
+                continue  # unknown case, an errored case, or a run without --include-output
+            inputs = case.get("inputs")
+            inputs_text = "" if inputs is None else inputs if isinstance(inputs, str) else json.dumps(inputs, ensure_ascii=False)
+            label = (result.get("route") or {}).get("prompt_version") or fallback_label
+            section = result.get("section") or case.get("section") or default_section
+            candidates.append(JudgeCandidate(str(result["id"]), str(label), section, inputs_text, result["output"]))
+    return candidates
+
+
+def summarize(candidates: Sequence[JudgeCandidate], verdicts: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Mean scores per label."""
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    counts: Dict[str, int] = defaultdict(int)
+    errors: Dict[str, int] = defaultdict(int)
+    for candidate, verdict in zip(candidates, verdicts):
+        if "scores" not in verdict:
+            errors[candidate.label] += 1
+            continue
+        counts[candidate.label] += 1
+        for name, value in verdict["scores"].items():
+            totals[candidate.label][name] += value
+        totals[candidate.label]["overall"] += verdict["overall"]
+
+    summary = {}
+    for label in sorted(set(counts) | set(errors)):
+        n = counts[label]
+        summary[label] = {
+            "judged": n,
+            "errors": errors[label],
+            "mean": {name: round(total / n, 3) for name, total in totals[label].items()} if n else {},
+        }
+    return summary
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="prompt_lifecycle judge", description="Score eval outputs with an LLM judge")
+    parser.add_argument("--config", required=True, help="Path to the run-config YAML")
+    parser.add_argument("--dataset", required=True, help="JSONL dataset the results were produced from (for inputs)")
+    parser.add_argument("--results", nargs="+", required=True, help="Eval results JSONL written with --include-output")
+    parser.add_argument("--output", required=True, help="Per-candidate verdicts JSONL (overwritten)")
+    parser.add_argument("--section", default="company_overview", help="Default section (a case's 'section' wins)")
+    parser.add_argument("--store", help="Verdict store (default: config judge.cache_path)")
+    parser.add_argument("--no-store", dest="use_store", action="store_false", help="Re-judge everything, ignoring stored verdicts")
+    add_cache_argument(parser)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    runtime = Runtime(args.config, cache_mode=args.cache)
+    judge = LLMJudge(runtime, store_path=args.store, use_store=args.use_store)
+    try:
+        candidates = load_candidates(args.dataset, args.results, args.section)
+        if not candidates:
+            raise SystemExit("No candidates: were the results written with --include-output?")
+        verdicts, stats = judge.judge(candidates)
+    finally:
+        judge.close()
+        runtime.close()
+
+    out_dir = os.path.dirname(args.output)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        for candidate, verdict in zip(candidates, verdicts):
+            row = {"id": candidate.case_id, "label": candidate.label, "section": candidate.section, **verdict}
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    report = {"rubric_version": judge.rubric_version, "model": judge.model, "stats": stats, "labels": summarize(candidates, verdicts)}
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,162 @@
-# eval metrics helpers
+import math
+import random
+from typing import Any, Dict, List, Optional
+
+
+class RunningStats:
+    """Streaming count / mean / stddev / min / max (Welford), plus a bounded reservoir for quantiles."""
+
+    def __init__(self, reservoir_size: int = 2048, seed: int = 0):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.reservoir_size = reservoir_size
+        self.reservoir: List[float] = []
+        self._rng = random.Random(seed)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        # Algorithm R: every value seen so far has the same chance to be in the sample
+        if len(self.reservoir) < self.reservoir_size:
+            self.reservoir.append(value)
+        else:
+            slot = self._rng.randrange(self.count)
+            if slot < self.reservoir_size:
+                self.reservoir[slot] = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.reservoir:
+            return None
+        ordered = sorted(self.reservoir)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> Dict[str, Any]:
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 4),
+            "std": round(std, 4),
+            "min": self.min,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "max": self.max,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min,
+            "max": self.max,
+            "reservoir_size": self.reservoir_size,
+            "reservoir": self.reservoir,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "RunningStats":
+        stats = cls(reservoir_size=state["reservoir_size"])
+        stats.count = state["count"]
+        stats.mean = state["mean"]
+        stats.m2 = state["m2"]
+        stats.min = state["min"]
+        stats.max = state["max"]
+        stats.reservoir = list(state["reservoir"])
+        # Re-seed from progress so a resumed run keeps sampling deterministically
+        stats._rng = random.Random(stats.count)
+        return stats
+
+
+class EvalAggregator:
+    """
+    Streaming aggregate over eval results: memory stays constant however many cases
+    run, and the whole state round-trips through to_dict()/from_dict() so a resumed
+    run picks up its aggregates from the checkpoint.
+
+      cases / passed / errors
+      check pass rates         per check name
+      pass rate by group       per prompt_version and per kpi_pack
+      score distributions      RunningStats per numeric score
+    """
+
+    GROUP_KEYS = ("prompt_version", "kpi_pack")
+
+    def __init__(self):
+        self.cases = 0
+        self.passed = 0
+        self.errors = 0
+        self.checks: Dict[str, List[int]] = {}  # name -> [passed, total]
+        self.groups: Dict[str, Dict[str, List[int]]] = {key: {} for key in self.GROUP_KEYS}
+        self.scores: Dict[str, RunningStats] = {}
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.cases += 1
+        if "error" in result:
+            self.errors += 1
+            return
+        ok = bool(result.get("passed"))
+        self.passed += ok
+
+        for name, value in (result.get("checks") or {}).items():
+            tally = self.checks.setdefault(name, [0, 0])
+            tally[0] += bool(value)
+            tally[1] += 1
+
+        route = result.get("route") or {}
+        for key in self.GROUP_KEYS:
+            tally = self.groups[key].setdefault(str(route.get(key)), [0, 0])
+            tally[0] += ok
+            tally[1] += 1
+
+        for name, value in (result.get("scores") or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stats = self.scores.get(name)
+                if stats is None:
+                    stats = self.scores[name] = RunningStats()
+                stats.add(float(value))
+
+    def summary(self) -> Dict[str, Any]:
+        evaluated = self.cases - self.errors
+        return {
+            "cases": self.cases,
+            "errors": self.errors,
+            "passed": self.passed,
+            "pass_rate": round(self.passed / evaluated, 4) if evaluated else None,
+            "checks": {name: _rate(t) for name, t in sorted(self.checks.items())},
+            "by": {key: {g: _rate(t) for g, t in sorted(groups.items())} for key, groups in self.groups.items()},
+            "scores": {name: stats.summary() for name, stats in sorted(self.scores.items())},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cases": self.cases,
+            "passed": self.passed,
+            "errors": self.errors,
+            "checks": self.checks,
+            "groups": self.groups,
+            "scores": {name: stats.to_dict() for name, stats in self.scores.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "EvalAggregator":
+        agg = cls()
+        agg.cases = state["cases"]
+        agg.passed = state["passed"]
+        agg.errors = state["errors"]
+        agg.checks = {name: list(t) for name, t in state["checks"].items()}
+        agg.groups = {key: {g: list(t) for g, t in groups.items()} for key, groups in state["groups"].items()}
+        agg.scores = {name: RunningStats.from_dict(s) for name, s in state["scores"].items()}
+        return agg
+
+
+def _rate(tally: List[int]) -> Dict[str, Any]:
+    passed, total = tally
+    return {"passed": passed, "total": total, "rate": round(passed / total, 4) if total else None}
@@ -0,0 +1,67 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from prompt_lifecycle.engine.response_cache import SQLiteStore
+
+# Bump when scoring changes (text_eval / kpi_eval) so stored results are not reused
+EVAL_VERSION = 3
+
+
+def scorer_fingerprint(kpi_registry: Dict[str, Any]) -> str:
+    """Everything scoring depends on besides the case itself: eval code version + KPI registry."""
+    h = hashlib.sha256(f"eval-v{EVAL_VERSION}\0".encode("utf-8"))
+    h.update(json.dumps(kpi_registry, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def eval_key(prompt_key: str, scorer: str, section: str, case: Dict[str, Any]) -> str:
+    """
+    Content address of one eval result.
+
+    prompt_key is Runtime.prompt_cache_key(section, assembled prompt), i.e. sha256
+    over the model (or routing cascade) and its params and the exact prompt: every
+    template's content, every variable and the inputs. On top of that go the scorer fingerprint and the case fields that only
+    scoring sees (expected, recorded output). Editing one template therefore only
+    changes the keys of cases whose prompt actually contains that template.
+    """
+    h = hashlib.sha256()
+    for part in (prompt_key, scorer, section):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    scoring_inputs = {"expected": case.get("expected"), "output": case.get("output")}
+    h.update(json.dumps(scoring_inputs, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultStore:
+    """
+    Content-addressed store of eval results (eval_key -> result JSON) on the same
+    SQLite tier as the LLM response cache. Entries are never stale, only orphaned:
+    when a dependency changes, the case gets a new key. Least recently used
+    entries are evicted past max_entries.
+
+    Safe to open from several worker processes at once (WAL mode).
+    """
+
+    def __init__(self, path: str, max_entries: int = 1_000_000):
+        self.path = path
+        self._store = SQLiteStore(path, max_entries=max_entries)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], path: Optional[str] = None) -> Optional["ResultStore"]:
+        eval_cfg = config.get("eval", {}) or {}
+        path = path or eval_cfg.get("result_store")
+        if not path:
+            return None
+        return cls(path, max_entries=int(eval_cfg.get("max_results", 1_000_000)))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        found = self._store.get(key)
+        return json.loads(found[0]) if found is not None else None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        self._store.put(key, json.dumps(result, ensure_ascii=False))
+
+    def close(self) -> None:
+        self._store.close()
@@ -1 +1,357 @@
-# offline eval runner
+"""
+Offline eval runner: streams a JSONL dataset of cases through generation and the
+text / KPI checks on a process pool, writing results incrementally.
+
+    python -m prompt_lifecycle.cli.main eval \\
+        --config src/prompt_lifecycle/config/company_overview.yaml \\
+        --dataset src/prompt_lifecycle/eval/datasets/company_overview.jsonl \\
+        --output .cache/eval_company_overview.jsonl
+
+Dataset lines (every key optional except what the section needs):
+
+  {"id": "...", "section": "...", "industry": "...", "sub_industry": "...",
+   "prompt_version": "...", "kpi_pack": "...", "inputs": {...} | "...",
+   "output": "...",          # recorded model output; if absent the case is generated
+   "expected": {"must_include": [...], "must_not_include": [...], "max_chars": N,
+                "min_evidence_coverage": 1.0, "kpis": [...]}}
+
+Resumability: cases are processed in chunks of chunk_size; after each finished
+chunk its results are appended to the output and a checkpoint is written
+atomically with the set of finished chunks, the output size, and the streaming
+aggregates. On restart the output is truncated back to the checkpointed size (a
+chunk written after the last checkpoint is redone, never duplicated) and
+finished chunks are skipped. A checkpoint from a run that completed is not
+resumed: the next run starts a fresh pass.
+
+Incremental re-evaluation: results are also written to a content-addressed
+ResultStore (eval/result_store.py; config eval.result_store or --store). Each
+case is rendered first (cheap) and keyed on the LLM cache key of its assembled
+prompt for the model(s) that answer it (Runtime.prompt_cache_key), i.e. on the
+template contents, variables, inputs, the model or routing cascade and its params,
+plus the scorer version and the case's expectations. Cases whose key is already in
+the store are reused without generating or scoring, so editing one template
+only re-runs the cases whose prompts contain it.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from prompt_lifecycle.cli.main import add_cache_argument
+from prompt_lifecycle.engine.batch import read_records
+from prompt_lifecycle.engine.guardrails import GuardrailViolation
+from prompt_lifecycle.engine.llm_client import LLMTimeoutError, ProviderError
+from prompt_lifecycle.engine.routing import OVERRIDE_KEYS
+from prompt_lifecycle.engine.runtime import Runtime
+from prompt_lifecycle.eval.kpi_eval import KPIMatcher, evaluate_kpis
+from prompt_lifecycle.eval.metrics import EvalAggregator
+from prompt_lifecycle.eval.result_store import ResultStore, eval_key, scorer_fingerprint
+from prompt_lifecycle.eval.text_eval import evaluate_text
+
+CHECKPOINT_VERSION = 1
+
+Chunk = Tuple[int, List[Tuple[int, Dict[str, Any]]]]
+
+# Per-process state for pool workers (set by _init_worker)
+_WORKER: Dict[str, Any] = {}
+
+
+def evaluate_case(
+    runtime: Runtime,
+    matcher: KPIMatcher,
+    index: int,
+    case: Dict[str, Any],
+    default_section: str,
+    include_output: bool = False,
+    store: Optional[ResultStore] = None,
+    scorer: str = "",
+) -> Dict[str, Any]:
+    section = case.get("section") or default_section
+    overrides = {k: case.get(k) for k in OVERRIDE_KEYS}
+    inputs = case.get("inputs")
+    expected = case.get("expected", {}) or {}
+    result: Dict[str, Any] = {"index": index, "id": case.get("id"), "section": section}
+
+    started = time.perf_counter()
+    try:
+        prompt, manifest = runtime.render(section, overrides=overrides, inputs=inputs)
+        key = None
+        if store is not None:
+            key = eval_key(runtime.prompt_cache_key(section, prompt), scorer, section, case)
+            stored = store.get(key)
+            if stored is not None:
+                if not include_output:
+                    stored.pop("output", None)
+                result.update(stored, eval_key=key, reused=True)
+                return result
+
+        if case.get("output") is not None:
+            output = case["output"]
+            result["output_source"] = "recorded"
+        else:
+            generated = runtime.generate(section, overrides=overrides, inputs=inputs)
+            manifest, output = generated["manifest"], generated["output"]
+            result["output_source"] = "generated"
+    except (KeyError, ValueError, ProviderError, LLMTimeoutError, GuardrailViolation) as exc:
+        # A case the provider failed on (after retries) is an errored case, not a failed run
+        result["error"] = str(exc)
+        return result
+    latency_ms = (time.perf_counter() - started) * 1000.0
+
+    result.update(score_output(runtime, matcher, section, manifest, output, inputs, expected))
+    result["scores"].update(latency_ms=round(latency_ms, 3), input_tokens=manifest["tokens"]["input"])
+    if key is not None:
+        record = {k: v for k, v in result.items() if k not in ("index", "id", "section")}
+        record["output"] = output
+        record["templates"] = {seg["name"]: seg["template_sha256"] for seg in manifest["segments"]}
+        store.put(key, record)
+        result.update(eval_key=key, reused=False)
+    if include_output:
+        result["output"] = output
+    return result
+
+
+def score_output(
+    runtime: Runtime,
+    matcher: KPIMatcher,
+    section: str,
+    manifest: Dict[str, Any],
+    output: str,
+    inputs: Any,
+    expected: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Text + KPI checks on one output: {"route", "passed", "checks", "scores", "kpis_mentioned", "failures"}."""
+    route = manifest["router_manifest"]
+    pack = runtime.router.packs[route["kpi_pack"]]
+    inputs_text = "" if inputs is None else inputs if isinstance(inputs, str) else json.dumps(inputs, ensure_ascii=False)
+
+    text = evaluate_text(section, output, expected)
+    kpis = evaluate_kpis(
+        output,
+        pack.kpi_ids,
+        matcher,
+        expected_kpis=expected.get("kpis"),
+        inputs_text=inputs_text,
+    )
+
+    checks = {**text["checks"], **kpis["checks"]}
+    return {
+        "route": {k: route.get(k) for k in ("industry", "sub_industry", "prompt_version", "kpi_pack")},
+        "passed": all(checks.values()),
+        "checks": checks,
+        "scores": {**text["scores"], **kpis["scores"]},
+        "kpis_mentioned": kpis["mentioned"],
+        "failures": text["failures"] + kpis["failures"],
+    }
+
+
+def _init_worker(config_path: str, cache_mode: Optional[str], use_store: bool, store_path: Optional[str]) -> None:
+    runtime = Runtime(config_path, cache_mode=cache_mode)
+    registry = runtime.config.get("kpi_registry", {}) or {}
+    _WORKER["runtime"] = runtime
+    _WORKER["matcher"] = KPIMatcher(registry)
+    _WORKER["store"] = ResultStore.from_config(runtime.config, path=store_path) if use_store else None
+    _WORKER["scorer"] = scorer_fingerprint(registry)
+
+
+def _run_chunk(chunk: Chunk, default_section: str, include_output: bool) -> Tuple[int, List[Dict[str, Any]]]:
+    chunk_id, items = chunk
+    runtime, matcher, store, scorer = _WORKER["runtime"], _WORKER["matcher"], _WORKER["store"], _WORKER["scorer"]
+    return chunk_id, [
+        evaluate_case(runtime, matcher, index, case, default_section, include_output, store, scorer) for index, case in items
+    ]
+
+
+def _chunks(records: Iterable[Tuple[int, Dict[str, Any]]], chunk_size: int, skip: Set[int]) -> Iterator[Chunk]:
+    current_id: Optional[int] = None
+    items: List[Tuple[int, Dict[str, Any]]] = []
+    for index, case in records:
+        chunk_id = index // chunk_size
+        if chunk_id != current_id:
+            if items and current_id not in skip:
+                yield current_id, items
+            current_id, items = chunk_id, []
+        items.append((index, case))
+    if items and current_id not in skip:
+        yield current_id, items
+
+
+class EvalRunner:
+    """See the module docstring. workers <= 1 runs in-process (handy for debugging)."""
+
+    def __init__(
+        self,
+        config_path: str,
+        dataset_path: str,
+        output_path: str,
+        section: str = "company_overview",
+        workers: Optional[int] = None,
+        chunk_size: int = 64,
+        checkpoint_path: Optional[str] = None,
+        cache_mode: Optional[str] = None,
+        include_output: bool = False,
+        use_store: bool = True,
+        store_path: Optional[str] = None,
+    ):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        self.config_path = config_path
+        self.dataset_path = dataset_path
+        self.output_path = output_path
+        self.section = section
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.checkpoint_path = checkpoint_path or f"{output_path}.checkpoint.json"
+        self.cache_mode = cache_mode
+        self.include_output = include_output
+        self.use_store = use_store
+        self.store_path = store_path
+
+    def _dataset_fingerprint(self) -> Dict[str, Any]:
+        st = os.stat(self.dataset_path)
+        return {"path": os.path.abspath(self.dataset_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported eval checkpoint version in {self.checkpoint_path}; rerun with --no-resume")
+        if state.get("dataset") != self._dataset_fingerprint():
+            raise ValueError(f"Dataset changed since checkpoint {self.checkpoint_path} was written; rerun with --no-resume")
+        return state
+
+    def _save_checkpoint(self, state: Dict[str, Any]) -> None:
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def run(self, resume: bool = True) -> Dict[str, Any]:
+        state = self._load_checkpoint() if resume else None
+        if state is None or state.get("complete"):
+            state = {
+                "version": CHECKPOINT_VERSION,
+                "dataset": self._dataset_fingerprint(),
+                "chunk_size": self.chunk_size,
+                "output_bytes": 0,
+                "done": [],
+                "complete": False,
+                "reused": 0,
+                "aggregate": EvalAggregator().to_dict(),
+            }
+        # Chunk ids are only meaningful for the chunk size they were recorded with
+        chunk_size = state["chunk_size"]
+        done: Set[int] = set(state["done"])
+        aggregator = EvalAggregator.from_dict(state["aggregate"])
+        resumed_chunks = len(done)
+
+        parent = os.path.dirname(os.path.abspath(self.output_path))
+        os.makedirs(parent, exist_ok=True)
+        started = time.perf_counter()
+
+        with open(self.output_path, "a+", encoding="utf-8") as out:
+            # Drop anything written after the last checkpoint
+            out.truncate(state["output_bytes"])
+            out.seek(0, os.SEEK_END)
+
+            def commit(chunk_id: int, results: List[Dict[str, Any]]) -> None:
+                out.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results))
+                out.flush()
+                for r in results:
+                    aggregator.add(r)
+                done.add(chunk_id)
+                state.update(
+                    output_bytes=out.tell(),
+                    done=sorted(done),
+                    reused=state["reused"] + sum(1 for r in results if r.get("reused")),
+                    aggregate=aggregator.to_dict(),
+                )
+                self._save_checkpoint(state)
+
+            chunks = _chunks(read_records(self.dataset_path), chunk_size, done)
+            if self.workers <= 1:
+                _init_worker(self.config_path, self.cache_mode, self.use_store, self.store_path)
+                for chunk in chunks:
+                    commit(*_run_chunk(chunk, self.section, self.include_output))
+            else:
+                self._run_pool(chunks, commit)
+
+        state["complete"] = True
+        self._save_checkpoint(state)
+
+        summary = aggregator.summary()
+        summary["run"] = {
+            "chunks_resumed": resumed_chunks,
+            "chunks_total": len(done),
+            "chunk_size": chunk_size,
+            "reused": state["reused"],
+            "evaluated": aggregator.cases - state["reused"],
+            "workers": self.workers,
+            "elapsed_s": round(time.perf_counter() - started, 3),
+            "output": self.output_path,
+            "checkpoint": self.checkpoint_path,
+        }
+        return summary
+
+    def _run_pool(self, chunks: Iterator[Chunk], commit) -> None:
+        max_in_flight = self.workers * 2
+        pending: Set[Future] = set()
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.config_path, self.cache_mode, self.use_store, self.store_path),
+        ) as pool:
+            for chunk in chunks:
+                pending.add(pool.submit(_run_chunk, chunk, self.section, self.include_output))
+                if len(pending) >= max_in_flight:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        commit(*fut.result())
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    commit(*fut.result())
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="eval", description="Run the offline eval over a JSONL dataset (parallel, resumable)")
+    parser.add_argument("--config", required=True, help="Path to the run-config YAML")
+    parser.add_argument("--dataset", required=True, help="JSONL dataset of eval cases")
+    parser.add_argument("--output", required=True, help="Per-case results JSONL (overwritten by a fresh run; a resumed run keeps what its checkpoint covers)")
+    parser.add_argument("--section", default="company_overview", help="Default section (a case's 'section' wins)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count; 1 = in-process)")
+    parser.add_argument("--chunk-size", dest="chunk_size", type=int, default=64, help="Cases per work unit / checkpoint (default: 64)")
+    parser.add_argument("--checkpoint", help="Checkpoint path (default: <output>.checkpoint.json)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="Ignore any checkpoint and start over")
+    parser.add_argument("--include-output", dest="include_output", action="store_true", help="Store each output in the results")
+    parser.add_argument("--store", help="Eval result store (default: config eval.result_store)")
+    parser.add_argument("--no-store", dest="use_store", action="store_false", help="Re-run every case, ignoring stored results")
+    add_cache_argument(parser)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    runner = EvalRunner(
+        args.config,
+        args.dataset,
+        args.output,
+        section=args.section,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        checkpoint_path=args.checkpoint,
+        cache_mode=args.cache,
+        include_output=args.include_output,
+        use_store=args.use_store,
+        store_path=args.store,
+    )
+    print(json.dumps(runner.run(resume=args.resume), indent=2))
+
+
+if __name__ == "__main__":
+    main()
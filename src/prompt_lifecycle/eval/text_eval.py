@@ -1 +1,87 @@
-# text expectation checks
+from typing import Any, Dict, List, Optional
+
+from prompt_lifecycle.schemas import SECTION_SCHEMAS, SchemaValidationError
+from prompt_lifecycle.schemas.base import EVIDENCE_MARKER
+from prompt_lifecycle.utils.json_utils import JSONParseError, parse_model_json
+
+NOT_FOUND = "not found in provided materials"
+
+
+def evaluate_text(section: str, output: str, expected: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Expectation checks on one section output.
+
+    expected (all optional):
+      must_include:     [str]  case-insensitive substrings that must appear
+      must_not_include: [str]  substrings that must not appear
+      max_chars:        int
+      min_evidence_coverage: float  share of bullets with a non-empty Evidence note (default 1.0)
+
+    Returns {"checks": {name: bool}, "scores": {name: number}, "failures": [str]}.
+    The section schema (schemas.SECTION_SCHEMAS) is always checked when one exists,
+    as JSON when the output starts with '{' or a code fence, else as markdown.
+    """
+    expected = expected or {}
+    checks: Dict[str, bool] = {}
+    failures: List[str] = []
+    lowered = output.lower()
+
+    schema = SECTION_SCHEMAS.get(section)
+    errors: Optional[List[str]] = None
+
+    if output.lstrip().startswith(("{", "```")):
+        # JSON output format (guardrails.output_format: json): parsed once, used for both checks
+        try:
+            doc, _ = parse_model_json(output)
+        except JSONParseError as exc:
+            doc, errors = None, [f"invalid JSON: {exc}"]
+        if doc is not None and schema is not None:
+            errors = schema.validator().errors(doc)
+        items = doc.get("bullets") if isinstance(doc, dict) else None
+        bullets = [b for b in items if isinstance(b, dict)] if isinstance(items, list) else []
+        with_evidence = sum(1 for b in bullets if isinstance(b.get("evidence"), str) and b["evidence"].strip())
+    else:
+        if schema is not None:
+            try:
+                schema.from_markdown(output)
+            except SchemaValidationError as exc:
+                errors = exc.errors
+        bullets = [line.strip() for line in output.splitlines() if line.strip().startswith(("- ", "* "))]
+        with_evidence = sum(
+            1 for b in bullets if EVIDENCE_MARKER in b and b.split(EVIDENCE_MARKER, 1)[1].strip()
+        )
+
+    if schema is not None:
+        checks["schema"] = not errors
+        if errors:
+            failures.extend(f"schema: {e}" for e in errors[:5])
+    evidence_coverage = with_evidence / len(bullets) if bullets else 0.0
+    min_coverage = float(expected.get("min_evidence_coverage", 1.0))
+    checks["evidence_coverage"] = evidence_coverage >= min_coverage
+    if not checks["evidence_coverage"]:
+        failures.append(f"evidence coverage {evidence_coverage:.2f} < {min_coverage:.2f}")
+
+    must_include = expected.get("must_include", []) or []
+    if must_include:
+        missing = [s for s in must_include if s.lower() not in lowered]
+        checks["must_include"] = not missing
+        failures.extend(f"missing '{s}'" for s in missing)
+
+    must_not_include = expected.get("must_not_include", []) or []
+    if must_not_include:
+        present = [s for s in must_not_include if s.lower() in lowered]
+        checks["must_not_include"] = not present
+        failures.extend(f"unexpected '{s}'" for s in present)
+
+    if expected.get("max_chars") is not None:
+        checks["max_chars"] = len(output) <= int(expected["max_chars"])
+        if not checks["max_chars"]:
+            failures.append(f"{len(output)} chars > max_chars {expected['max_chars']}")
+
+    scores = {
+        "output_chars": len(output),
+        "bullets": len(bullets),
+        "evidence_coverage": round(evidence_coverage, 4),
+        "not_found_bullets": lowered.count(NOT_FOUND),
+    }
+    return {"checks": checks, "scores": scores, "failures": failures}
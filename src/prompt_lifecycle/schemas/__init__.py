@@ -1 +1,12 @@
 # schemas init
+from typing import Dict, Type
+
+from prompt_lifecycle.schemas.base import SchemaValidationError, SectionOutput
+from prompt_lifecycle.schemas.company_overview import CompanyOverviewOutput
+
+# Output contract per section key (sections without one are not validated)
+SECTION_SCHEMAS: Dict[str, Type[SectionOutput]] = {
+    "company_overview": CompanyOverviewOutput,
+}
+
+__all__ = ["SECTION_SCHEMAS", "CompanyOverviewOutput", "SchemaValidationError", "SectionOutput"]
@@ -1 +1,186 @@
-# base Pydantic model
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, ClassVar, Dict, Iterable, List, Optional, Type, TypeVar
+
+from prompt_lifecycle.utils.json_utils import JSONParseError, parse_model_json
+
+T = TypeVar("T", bound="SectionOutput")
+
+# "- <text> **Evidence:** <snippet or source label>"
+EVIDENCE_MARKER = "**Evidence:**"
+_BULLET = re.compile(r"^\s*[-*]\s+(?P<body>.*)$")
+
+
+class SchemaValidationError(ValueError):
+    """Raised when model output does not match its section contract. errors lists every problem."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+@dataclass
+class EvidenceBullet:
+    text: str
+    evidence: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"text": self.text, "evidence": self.evidence}
+
+
+@dataclass
+class SectionOutput:
+    """
+    Base for section output contracts: a bold heading followed by bullets, each with
+    an **Evidence:** note (see the "Output format (strict)" block in section prompts).
+
+    Subclasses set HEADING and the bullet bounds.
+    """
+
+    HEADING: ClassVar[str] = ""
+    MIN_BULLETS: ClassVar[int] = 1
+    MAX_BULLETS: ClassVar[int] = 50
+
+    heading: str
+    bullets: List[EvidenceBullet] = field(default_factory=list)
+
+    @classmethod
+    def heading_line(cls) -> str:
+        return f"**{cls.HEADING}**"
+
+    @classmethod
+    def from_markdown(cls: Type[T], text: str) -> T:
+        """Parses the strict markdown format; raises SchemaValidationError listing every problem."""
+        errors: List[str] = []
+        lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+        if not lines:
+            raise SchemaValidationError(["output is empty"])
+
+        heading = lines[0]
+        if heading != cls.heading_line():
+            errors.append(f"first line must be '{cls.heading_line()}', got '{heading[:60]}'")
+
+        bullets: List[EvidenceBullet] = []
+        for n, line in enumerate(lines[1:], start=2):
+            match = _BULLET.match(line)
+            if not match:
+                errors.append(f"line {n} is not a bullet")
+                continue
+            text_part, marker, evidence = match.group("body").partition(EVIDENCE_MARKER)
+            if not marker or not evidence.strip():
+                errors.append(f"line {n} has no {EVIDENCE_MARKER} note")
+            bullets.append(EvidenceBullet(text=text_part.strip(), evidence=evidence.strip()))
+
+        obj = cls(heading=heading.strip("*").strip(), bullets=bullets)
+        errors.extend(obj.validate())
+        if errors:
+            raise SchemaValidationError(errors)
+        return obj
+
+    @classmethod
+    def from_dict(cls: Type[T], doc: Any) -> T:
+        """Builds from {"heading": str, "bullets": [{"text": str, "evidence": str}, ...]}."""
+        errors = cls.validator().errors(doc)
+        if errors:
+            raise SchemaValidationError(errors)
+        obj = cls(
+            heading=doc["heading"],
+            bullets=[EvidenceBullet(text=item["text"], evidence=item["evidence"]) for item in doc["bullets"]],
+        )
+        errors = obj.validate()
+        if errors:
+            raise SchemaValidationError(errors)
+        return obj
+
+    @classmethod
+    def from_json(cls: Type[T], text: str, repair: bool = True) -> T:
+        """Parses model output as JSON (see utils.json_utils.parse_model_json), then from_dict."""
+        try:
+            doc, _ = parse_model_json(text, repair=repair)
+        except JSONParseError as exc:
+            raise SchemaValidationError([f"invalid JSON: {exc}"]) from None
+        return cls.from_dict(doc)
+
+    @classmethod
+    def validator(cls) -> "SchemaValidator":
+        return compile_validator(cls)
+
+    def validate(self) -> List[str]:
+        errors: List[str] = []
+        if not self.MIN_BULLETS <= len(self.bullets) <= self.MAX_BULLETS:
+            errors.append(f"expected {self.MIN_BULLETS}-{self.MAX_BULLETS} bullets, got {len(self.bullets)}")
+        return errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"heading": self.heading, "bullets": [b.to_dict() for b in self.bullets]}
+
+
+class SchemaValidator:
+    """
+    Validation-only view of one SectionOutput subclass, compiled once per class
+    (compile_validator) with the contract's constants bound as attributes.
+
+    errors() checks a parsed document without building any dataclasses and returns
+    None when it is valid, so the common case allocates nothing. Error messages
+    match from_dict.
+    """
+
+    __slots__ = ("schema", "heading", "min_bullets", "max_bullets")
+
+    def __init__(self, schema: Type[SectionOutput]):
+        self.schema = schema
+        self.heading = schema.HEADING
+        self.min_bullets = schema.MIN_BULLETS
+        self.max_bullets = schema.MAX_BULLETS
+
+    def errors(self, doc: Any) -> Optional[List[str]]:
+        if not isinstance(doc, dict):
+            return [f"expected an object, got {type(doc).__name__}"]
+
+        errors: Optional[List[str]] = None
+        heading = doc.get("heading")
+        if heading != self.heading:
+            errors = [f"heading must be '{self.heading}', got {heading!r}"]
+
+        bullets = doc.get("bullets")
+        if not isinstance(bullets, list):
+            return (errors or []) + ["bullets must be a list"]
+
+        count = len(bullets)
+        for n, item in enumerate(bullets):
+            if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+                errors = errors or []
+                errors.append(f"bullets[{n}].text must be a string")
+                count -= 1
+                continue
+            evidence = item.get("evidence")
+            if not isinstance(evidence, str) or not evidence.strip():
+                errors = errors or []
+                errors.append(f"bullets[{n}].evidence is required")
+
+        if not self.min_bullets <= count <= self.max_bullets:
+            errors = errors or []
+            errors.append(f"expected {self.min_bullets}-{self.max_bullets} bullets, got {count}")
+        return errors
+
+    def validate_json(self, text: str, repair: bool = True) -> Optional[List[str]]:
+        """Parse + validate one model output; None when valid."""
+        try:
+            doc, _ = parse_model_json(text, repair=repair)
+        except JSONParseError as exc:
+            return [f"invalid JSON: {exc}"]
+        return self.errors(doc)
+
+    def validate_many(self, texts: Iterable[str], repair: bool = True) -> List[Optional[List[str]]]:
+        """
+        Bulk validate_json: one entry per text, None for valid ones. Only failing
+        items allocate an error list; nothing is built for the valid ones.
+        """
+        validate = self.validate_json
+        return [validate(text, repair) for text in texts]
+
+
+@lru_cache(maxsize=None)
+def compile_validator(schema: Type[SectionOutput]) -> SchemaValidator:
+    return SchemaValidator(schema)
@@ -1 +1,24 @@
-# CompanyOverviewOutput schema
+from dataclasses import dataclass
+from typing import ClassVar
+
+from prompt_lifecycle.schemas.base import SectionOutput
+
+
+@dataclass
+class CompanyOverviewOutput(SectionOutput):
+    """
+    Contract for the company_overview section (both prompt versions):
+
+      **Company Overview**
+      - <bullet> **Evidence:** <short snippet or source label>
+
+    or, with guardrails.output_format: json,
+
+      {"heading": "Company Overview", "bullets": [{"text": "...", "evidence": "..."}, ...]}
+
+    8-12 bullets, every bullet with an Evidence note.
+    """
+
+    HEADING: ClassVar[str] = "Company Overview"
+    MIN_BULLETS: ClassVar[int] = 8
+    MAX_BULLETS: ClassVar[int] = 12
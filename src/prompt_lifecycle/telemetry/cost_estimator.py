@@ -1 +1,182 @@
-# cost estimation
+import string
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+_SPACE = string.whitespace.encode("ascii")
+_WORD_OR_SPACE = (string.ascii_letters + string.digits + "_").encode("ascii") + _SPACE
+
+TRUNCATION_MARKER = "\n[... truncated to fit the prompt token budget]"
+
+
+def approx_tokens(text: str) -> int:
+    """
+    Offline stand-in for a BPE tokenizer (within ~10% of cl100k on English prose and
+    markdown): one token per word, one per punctuation/non-ASCII byte, and extra
+    pieces once words average more than ~8 letters. Only C-level str/bytes calls,
+    ~10us per KB, so it can run on every segment of every request.
+    """
+    raw = text.encode("utf-8")
+    punct = len(raw.translate(None, _WORD_OR_SPACE))
+    space = len(raw) - len(raw.translate(None, _SPACE))
+    words = len(text.split())
+    alnum = len(raw) - punct - space
+    return words + punct + max(0, alnum // 8 - words // 2)
+
+
+@lru_cache(maxsize=1024)
+def static_tokens(text: str) -> int:
+    """
+    approx_tokens memoized on the text itself, for static segments: they repeat
+    across requests, so in the batch hot path only per-request text is scanned.
+    (Not for per-request text, which would only churn the cache.)
+    """
+    return approx_tokens(text)
+
+
+class ModelPricing(NamedTuple):
+    model: Optional[str]
+    input_per_1k: float
+    output_per_1k: float
+    context_window: Optional[int]
+    max_output_tokens: int
+
+
+def model_pricing(config: Dict[str, Any], model_name: Optional[str] = None) -> ModelPricing:
+    """Pricing + size limits of llm.model (or model_name) from the hydrated models.yaml."""
+    models_cfg = config.get("models_cfg", {}) or {}
+    name = model_name or (config.get("llm", {}) or {}).get("model") or models_cfg.get("default_model")
+    entry = (models_cfg.get("models", {}) or {}).get(name, {}) if name else {}
+    pricing = entry.get("pricing", {}) or {}
+    return ModelPricing(
+        model=name,
+        input_per_1k=float(pricing.get("input_per_1k_tokens", 0.0)),
+        output_per_1k=float(pricing.get("output_per_1k_tokens", 0.0)),
+        context_window=entry.get("context_window_tokens"),
+        max_output_tokens=int(entry.get("max_output_tokens", 0) or 0),
+    )
+
+
+class CostEstimator:
+    """Per-request token and dollar estimates from models.yaml prices."""
+
+    def __init__(self, pricing: ModelPricing):
+        self.pricing = pricing
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], model_name: Optional[str] = None) -> "CostEstimator":
+        return cls(model_pricing(config, model_name))
+
+    def estimate(self, input_tokens: int, output_tokens: int) -> Dict[str, Any]:
+        input_usd = input_tokens * self.pricing.input_per_1k / 1000.0
+        output_usd = output_tokens * self.pricing.output_per_1k / 1000.0
+        return {
+            "model": self.pricing.model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "input_usd": round(input_usd, 6),
+            "output_usd": round(output_usd, 6),
+            "total_usd": round(input_usd + output_usd, 6),
+        }
+
+    def estimate_text(self, input_tokens: int, output_text: str) -> Dict[str, Any]:
+        return self.estimate(input_tokens, approx_tokens(output_text))
+
+
+class TokenBudget:
+    """
+    Caps the input prompt at max_input_tokens. When a prompt is over, segments are
+    trimmed in trim_order (segment names, or name prefixes ending in ":"):
+
+      - request-scoped segments (issuer inputs / evidence) are truncated at a line
+        boundary, keeping as much of their head as fits
+      - static segments are dropped whole
+
+    Segments not listed in trim_order are never touched; if the prompt is still
+    over budget after trimming, apply() raises ValueError.
+
+    Config (run-config YAML, all optional):
+      budget:
+        max_input_tokens: 100000   # default: model context window - max_output_tokens
+        trim_order: [inputs, "industry:"]
+    """
+
+    def __init__(self, max_input_tokens: Optional[int], trim_order: Sequence[str] = ("inputs",)):
+        self.max_input_tokens = max_input_tokens
+        self.trim_order = tuple(trim_order)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "TokenBudget":
+        budget_cfg = config.get("budget", {}) or {}
+        limit = budget_cfg.get("max_input_tokens")
+        if limit is None:
+            pricing = model_pricing(config)
+            if pricing.context_window:
+                limit = int(pricing.context_window) - pricing.max_output_tokens
+        return cls(int(limit) if limit is not None else None, budget_cfg.get("trim_order", ("inputs",)))
+
+    def _rank(self, name: str) -> Optional[int]:
+        for rank, pattern in enumerate(self.trim_order):
+            if name == pattern or (pattern.endswith(":") and name.startswith(pattern)):
+                return rank
+        return None
+
+    def apply(
+        self,
+        names: Sequence[str],
+        scopes: Sequence[str],
+        texts: List[str],
+    ) -> Tuple[List[Optional[str]], List[int], List[Dict[str, Any]]]:
+        """
+        Returns (texts, tokens, trimmed). A dropped segment's text is None.
+        trimmed lists {"name", "action": truncated | dropped, "tokens_before", "tokens_after"}.
+        """
+        out: List[Optional[str]] = list(texts)
+        tokens = [approx_tokens(t) if scope == "request" else static_tokens(t) for t, scope in zip(texts, scopes)]
+        total = sum(tokens)  # blank-line separators carry no pieces
+        trimmed: List[Dict[str, Any]] = []
+        if self.max_input_tokens is None or total <= self.max_input_tokens:
+            return out, tokens, trimmed
+
+        candidates = sorted(
+            (rank, i) for i, rank in ((i, self._rank(name)) for i, name in enumerate(names)) if rank is not None
+        )
+        for _, i in candidates:
+            if total <= self.max_input_tokens:
+                break
+            over = total - self.max_input_tokens
+            before = tokens[i]
+            if scopes[i] == "request" and before > over:
+                out[i] = _truncate(texts[i], before - over)
+                tokens[i] = approx_tokens(out[i])
+                action = "truncated"
+            else:
+                out[i] = None
+                tokens[i] = 0
+                action = "dropped"
+            total -= before - tokens[i]
+            trimmed.append({"name": names[i], "action": action, "tokens_before": before, "tokens_after": tokens[i]})
+
+        if total > self.max_input_tokens:
+            raise ValueError(
+                f"Prompt needs ~{total} input tokens, over the budget of {self.max_input_tokens} "
+                f"even after trimming ({', '.join(self.trim_order) or 'nothing trimmable'})"
+            )
+        return out, tokens, trimmed
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Keeps the head of text (cut at a line boundary) within max_tokens, marker included."""
+    budget = max_tokens - approx_tokens(TRUNCATION_MARKER)
+    if budget <= 0:
+        return TRUNCATION_MARKER.lstrip("\n")
+    # Scale by the observed chars/token ratio, then shrink until it fits (1-2 rounds in practice)
+    keep = int(len(text) * budget / max(approx_tokens(text), 1))
+    while keep > 0:
+        head = text[:keep]
+        cut = head.rfind("\n")
+        if cut > keep // 2:
+            head = head[:cut]
+        if approx_tokens(head) <= budget:
+            return head + TRUNCATION_MARKER
+        keep = int(keep * 0.9)
+    return TRUNCATION_MARKER.lstrip("\n")
@@ -1 +1,224 @@
-# log events
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Sequence
+
+
+class Event(NamedTuple):
+    ts_ns: int  # wall clock (time.time_ns)
+    kind: str  # route | render | llm | guardrail | ...
+    fields: Dict[str, Any]
+
+
+class Exporter:
+    """Receives batches of events on the logger's drain thread (never on the hot path)."""
+
+    def export(self, batch: Sequence[Event]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        return None
+
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "sample")
+
+
+class EventLogger:
+    """
+    Non-blocking event pipeline.
+
+    emit() appends a tuple to a bounded deque (append/popleft are atomic under the
+    GIL, so producers never take a lock) and returns; a daemon thread drains the
+    buffer in batches of batch_size to every exporter, at least every
+    flush_interval_s. An exporter that raises is counted, never propagated.
+
+    When the buffer is full:
+      drop_newest: the new event is dropped
+      drop_oldest: the oldest buffered event is dropped to make room
+      sample:      past half capacity only every sample_every-th event is kept,
+                   and the new event is dropped once completely full
+    Every lost event is counted in stats() ("dropped" / "sampled_out").
+    """
+
+    def __init__(
+        self,
+        exporters: Sequence[Exporter],
+        capacity: int = 65536,
+        batch_size: int = 1024,
+        flush_interval_s: float = 0.5,
+        overflow: str = "drop_newest",
+        sample_every: int = 10,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"telemetry.overflow must be one of {', '.join(OVERFLOW_POLICIES)}, got '{overflow}'")
+        self.exporters = list(exporters)
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.overflow = overflow
+        self.sample_every = max(1, sample_every)
+        self._soft_limit = capacity // 2 if overflow == "sample" else capacity
+
+        self._buffer: Deque[Event] = deque()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._drain_lock = threading.Lock()
+
+        self.emitted = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.exported = 0
+        self.export_errors = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "EventLogger":
+        """
+        telemetry:
+          enabled: true
+          capacity: 65536
+          batch_size: 1024
+          flush_interval_s: 0.5
+          overflow: drop_newest   # drop_newest | drop_oldest | sample
+          sample_every: 10
+          exporters:
+            - {type: console}
+            - {type: csv, path: .cache/events.csv}
+            - {type: prometheus, textfile: .cache/prompt_lifecycle.prom}
+        """
+        telemetry_cfg = config.get("telemetry", {}) or {}
+        if not telemetry_cfg.get("enabled", False):
+            return NullEventLogger()
+
+        exporters = [build_exporter(cfg) for cfg in telemetry_cfg.get("exporters", []) or []]
+        if not exporters:
+            return NullEventLogger()
+        return cls(
+            exporters,
+            capacity=int(telemetry_cfg.get("capacity", 65536)),
+            batch_size=int(telemetry_cfg.get("batch_size", 1024)),
+            flush_interval_s=float(telemetry_cfg.get("flush_interval_s", 0.5)),
+            overflow=telemetry_cfg.get("overflow", "drop_newest"),
+            sample_every=int(telemetry_cfg.get("sample_every", 10)),
+        ).start()
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    def start(self) -> "EventLogger":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="event-logger", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def emit(self, kind: str, **fields: Any) -> None:
+        buffer = self._buffer
+        self.emitted += 1
+        size = len(buffer)
+        if size >= self._soft_limit and not self._admit(size):
+            return
+        buffer.append(Event(time.time_ns(), kind, fields))
+        if size == self.batch_size:
+            self._wake.set()
+
+    def _admit(self, size: int) -> bool:
+        if self.overflow == "drop_oldest":
+            if size >= self.capacity:
+                try:
+                    self._buffer.popleft()
+                except IndexError:
+                    pass
+                self.dropped += 1
+            return True
+        if size >= self.capacity:
+            self.dropped += 1
+            return False
+        if self.overflow == "sample" and self.emitted % self.sample_every:
+            self.sampled_out += 1
+            return False
+        return True
+
+    def _run(self) -> None:
+        while not self._stop:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Drains everything buffered right now to the exporters (safe from any thread)."""
+        with self._drain_lock:
+            buffer = self._buffer
+            while buffer:
+                batch: List[Event] = []
+                try:
+                    for _ in range(self.batch_size):
+                        batch.append(buffer.popleft())
+                except IndexError:
+                    pass
+                for exporter in self.exporters:
+                    try:
+                        exporter.export(batch)
+                    except Exception:
+                        self.export_errors += 1
+                self.exported += len(batch)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._stop = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+            atexit.unregister(self.close)
+        self.flush()
+        for exporter in self.exporters:
+            exporter.close()
+        self.exporters = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "exported": self.exported,
+            "export_errors": self.export_errors,
+            "buffered": len(self._buffer),
+        }
+
+
+class NullEventLogger(EventLogger):
+    """Telemetry switched off: emit() is a no-op."""
+
+    def __init__(self):
+        super().__init__([])
+
+    @property
+    def enabled(self) -> bool:
+        return False
+
+    def start(self) -> "EventLogger":
+        return self
+
+    def emit(self, kind: str, **fields: Any) -> None:
+        return None
+
+
+def build_exporter(exporter_cfg: Dict[str, Any]) -> Exporter:
+    # Imported here: the exporters import Event/Exporter from this module
+    kind = exporter_cfg.get("type")
+    options = {k: v for k, v in exporter_cfg.items() if k != "type"}
+    if kind == "console":
+        from prompt_lifecycle.telemetry.exporters.console_exporter import ConsoleExporter
+
+        return ConsoleExporter(**options)
+    if kind == "csv":
+        from prompt_lifecycle.telemetry.exporters.csv_exporter import CSVExporter
+
+        return CSVExporter(**options)
+    if kind == "prometheus":
+        from prompt_lifecycle.telemetry.exporters.prometheus_exporter import PrometheusExporter
+
+        return PrometheusExporter(**options)
+    raise ValueError(f"Unknown telemetry exporter type '{kind}' (expected: console, csv, prometheus)")
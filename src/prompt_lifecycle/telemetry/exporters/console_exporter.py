@@ -1 +1,23 @@
-# console exporter
+import json
+import sys
+from typing import IO, Optional, Sequence
+
+from prompt_lifecycle.telemetry.event_logger import Event, Exporter
+
+
+class ConsoleExporter(Exporter):
+    """One JSON line per event on stderr (or `stream`); `kinds` filters by event kind."""
+
+    def __init__(self, stream: Optional[IO[str]] = None, kinds: Optional[Sequence[str]] = None):
+        self.stream = stream or sys.stderr
+        self.kinds = set(kinds) if kinds else None
+
+    def export(self, batch: Sequence[Event]) -> None:
+        lines = [
+            json.dumps({"ts_ns": event.ts_ns, "kind": event.kind, **event.fields}, default=str)
+            for event in batch
+            if self.kinds is None or event.kind in self.kinds
+        ]
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
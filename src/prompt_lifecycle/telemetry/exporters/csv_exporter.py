@@ -1 +1,44 @@
-# csv exporter
+import csv
+import json
+import os
+from typing import Optional, Sequence
+
+from prompt_lifecycle.telemetry.event_logger import Event, Exporter
+
+DEFAULT_COLUMNS = ("section", "prompt_version", "kpi_pack", "status", "duration_us")
+
+
+class CSVExporter(Exporter):
+    """
+    Appends events to a CSV file: ts_ns, kind, one column per entry in `columns`,
+    and every remaining field as JSON in a trailing "extra" column. The header is
+    written only when the file is new.
+    """
+
+    def __init__(self, path: str, columns: Optional[Sequence[str]] = None):
+        self.path = path
+        self.columns = tuple(columns or DEFAULT_COLUMNS)
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        if is_new:
+            self._writer.writerow(("ts_ns", "kind") + self.columns + ("extra",))
+
+    def export(self, batch: Sequence[Event]) -> None:
+        columns = self.columns
+        rows = []
+        for event in batch:
+            fields = event.fields
+            extra = {k: v for k, v in fields.items() if k not in columns}
+            rows.append(
+                (event.ts_ns, event.kind)
+                + tuple(fields.get(c, "") for c in columns)
+                + (json.dumps(extra, default=str) if extra else "",)
+            )
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
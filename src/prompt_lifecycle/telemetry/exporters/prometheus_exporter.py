@@ -1 +1,137 @@
-# prometheus exporter
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from prompt_lifecycle.telemetry.event_logger import Event, Exporter
+
+# Event fields promoted to metric labels; everything else is ignored here
+LABEL_FIELDS = ("section", "status")
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class PrometheusExporter(Exporter):
+    """
+    Aggregates events into Prometheus counters:
+
+      prompt_lifecycle_events_total{kind, section, status}
+      prompt_lifecycle_llm_tokens_total{direction}      (from "llm" events)
+      prompt_lifecycle_llm_cost_usd_total               (from "llm" events)
+
+    plus whatever registered collectors add (anything with
+    prometheus_lines(namespace), e.g. Runtime's StageTimers histograms and the
+    LLM client's per-model scheduler gauges).
+
+    render() returns the text exposition format. Two ways to publish it:
+      textfile: rewritten atomically (for node_exporter's textfile collector) at
+                most every min_write_interval_s, and once more on close()
+      port:     a scrape endpoint served from a daemon thread (GET /metrics)
+    """
+
+    def __init__(
+        self,
+        textfile: Optional[str] = None,
+        namespace: str = "prompt_lifecycle",
+        min_write_interval_s: float = 5.0,
+        port: Optional[int] = None,
+        host: str = "127.0.0.1",
+    ):
+        self.textfile = textfile
+        self.namespace = namespace
+        self.min_write_interval_s = min_write_interval_s
+        self._events: Dict[Tuple[str, ...], int] = {}
+        self._tokens = {"input": 0, "output": 0}
+        self._cost_usd = 0.0
+        self._collectors: List[Any] = []
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+        self._server: Optional[ThreadingHTTPServer] = None
+        if port is not None:
+            self.serve(port, host)
+
+    def add_collector(self, collector: Any) -> None:
+        self._collectors.append(collector)
+
+    def export(self, batch: Sequence[Event]) -> None:
+        with self._lock:
+            for event in batch:
+                fields = event.fields
+                key = (event.kind,) + tuple(str(fields.get(label, "")) for label in LABEL_FIELDS)
+                self._events[key] = self._events.get(key, 0) + 1
+                if event.kind == "llm":
+                    self._tokens["input"] += int(fields.get("input_tokens", 0) or 0)
+                    self._tokens["output"] += int(fields.get("output_tokens", 0) or 0)
+                    self._cost_usd += float(fields.get("cost_usd", 0.0) or 0.0)
+
+        if self.textfile and time.monotonic() - self._last_write >= self.min_write_interval_s:
+            self.write_textfile()
+
+    def render(self) -> str:
+        ns = self.namespace
+        lines = [
+            f"# HELP {ns}_events_total Telemetry events by kind.",
+            f"# TYPE {ns}_events_total counter",
+        ]
+        with self._lock:
+            for key, count in sorted(self._events.items()):
+                labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(("kind",) + LABEL_FIELDS, key))
+                lines.append(f"{ns}_events_total{{{labels}}} {count}")
+            lines += [
+                f"# HELP {ns}_llm_tokens_total Estimated LLM tokens.",
+                f"# TYPE {ns}_llm_tokens_total counter",
+            ]
+            for direction, count in self._tokens.items():
+                lines.append(f'{ns}_llm_tokens_total{{direction="{direction}"}} {count}')
+            lines += [
+                f"# HELP {ns}_llm_cost_usd_total Estimated LLM spend (models.yaml prices).",
+                f"# TYPE {ns}_llm_cost_usd_total counter",
+                f"{ns}_llm_cost_usd_total {self._cost_usd:.6f}",
+            ]
+        for collector in self._collectors:
+            lines += collector.prometheus_lines(ns)
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """Starts the scrape endpoint; returns the bound port (pass 0 for any free port)."""
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return None
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="prometheus-exporter", daemon=True).start()
+        return self._server.server_address[1]
+
+    def write_textfile(self) -> None:
+        parent = os.path.dirname(os.path.abspath(self.textfile))
+        os.makedirs(parent, exist_ok=True)
+        tmp_path = f"{self.textfile}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.textfile)
+        self._last_write = time.monotonic()
+
+    def close(self) -> None:
+        if self.textfile:
+            self.write_textfile()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
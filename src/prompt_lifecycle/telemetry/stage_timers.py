@@ -0,0 +1,131 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# Fixed histogram bucket upper bounds in microseconds (1-2-5 steps, 1us .. 120s).
+# Fixed buckets keep observe() O(log n) with no allocation, and merge trivially.
+BUCKETS_US: Tuple[int, ...] = tuple(
+    step * 10 ** exp for exp in range(0, 8) for step in (1, 2, 5)
+) + (120_000_000,)
+
+
+class LatencyHistogram:
+    """Cumulative-friendly fixed-bucket histogram; quantiles are bucket-interpolated."""
+
+    __slots__ = ("counts", "count", "sum_ns")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_US) + 1)  # last bucket = +Inf
+        self.count = 0
+        self.sum_ns = 0
+
+    def observe(self, duration_ns: int) -> None:
+        self.counts[bisect_left(BUCKETS_US, duration_ns / 1000.0)] += 1
+        self.count += 1
+        self.sum_ns += duration_ns
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile in milliseconds (linear within the bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS_US[i - 1] if i > 0 else 0
+                upper = BUCKETS_US[i] if i < len(BUCKETS_US) else BUCKETS_US[-1]
+                return (lower + (upper - lower) * (rank - seen) / n) / 1000.0
+            seen += n
+        return BUCKETS_US[-1] / 1000.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.sum_ns / self.count / 1e6 if self.count else 0.0
+
+
+StageKey = Tuple[str, str, str]  # (stage, section, prompt_version)
+
+
+class StageTimers:
+    """
+    Per-stage latency histograms keyed by (stage, section, prompt_version).
+
+    Callers take perf_counter_ns() readings themselves and pass the difference to
+    observe(), so timing adds two clock reads and one bucket increment per stage.
+
+    Stages recorded by Runtime:
+      route        Router.route
+      evidence     evidence retrieval over the issuer inputs (engine/evidence.py; when enabled)
+      load.read    PromptLoader pass 1: template cache lookup (stat / file read + compile on a miss)
+      load.render  PromptLoader passes 2-3: rendering, token accounting, budget
+      llm          LLMClient call (including cache lookup, retries, streaming)
+      map          map step of Runtime.agenerate_long (all chunks, end to end)
+      total        end to end
+    """
+
+    def __init__(self):
+        self._histograms: Dict[StageKey, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, duration_ns: int, section: str = "", prompt_version: Optional[str] = "") -> None:
+        key = (stage, section, prompt_version or "")
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = LatencyHistogram()
+            hist.observe(duration_ns)
+
+    def items(self) -> List[Tuple[StageKey, LatencyHistogram]]:
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def summary(self) -> List[Dict[str, object]]:
+        rows = []
+        for (stage, section, version), hist in self.items():
+            rows.append(
+                {
+                    "stage": stage,
+                    "section": section,
+                    "prompt_version": version,
+                    "count": hist.count,
+                    "p50_ms": round(hist.quantile(0.50), 3),
+                    "p95_ms": round(hist.quantile(0.95), 3),
+                    "p99_ms": round(hist.quantile(0.99), 3),
+                    "mean_ms": round(hist.mean_ms, 3),
+                    "total_ms": round(hist.sum_ns / 1e6, 3),
+                }
+            )
+        return rows
+
+    def format_table(self) -> str:
+        """Human-readable per-stage breakdown (used by --profile)."""
+        rows = self.summary()
+        if not rows:
+            return "(no stage timings recorded)"
+        header = ("stage", "section", "prompt_version", "count", "p50_ms", "p95_ms", "p99_ms", "mean_ms", "total_ms")
+        table = [header] + [tuple(str(row[col]) for col in header) for row in rows]
+        widths = [max(len(r[i]) for r in table) for i in range(len(header))]
+        lines = ["  ".join(cell.ljust(w) if i < 3 else cell.rjust(w) for i, (cell, w) in enumerate(zip(r, widths))) for r in table]
+        lines.insert(1, "  ".join("-" * w for w in widths))
+        return "\n".join(lines)
+
+    def prometheus_lines(self, namespace: str) -> List[str]:
+        name = f"{namespace}_stage_latency_seconds"
+        lines = [
+            f"# HELP {name} Runtime pipeline stage latency.",
+            f"# TYPE {name} histogram",
+        ]
+        for (stage, section, version), hist in self.items():
+            labels = f'stage="{stage}",section="{section}",prompt_version="{version}"'
+            cumulative = 0
+            for bound_us, n in zip(BUCKETS_US, hist.counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{labels},le="{bound_us / 1e6:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"{name}_sum{{{labels}}} {hist.sum_ns / 1e9:.9f}")
+            lines.append(f"{name}_count{{{labels}}} {hist.count}")
+        return lines
@@ -1 +1,113 @@
 # JSON helpers
+import json
+import re
+from typing import Any, List, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib parser is the fallback
+    orjson = None
+
+NO_REPAIRS: Tuple[str, ...] = ()
+
+# ```json ... ``` (the language tag and the closing fence are both optional)
+_FENCE = re.compile(r"```[A-Za-z0-9_-]*[ \t]*\r?\n?(.*?)(?:```|\Z)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",(?=\s*[}\]])")
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+
+
+class JSONParseError(ValueError):
+    def __init__(self, msg: str, pos: int = -1):
+        super().__init__(msg if pos < 0 else f"{msg} (at char {pos})")
+        self.msg = msg
+        self.pos = pos
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """orjson.loads when installed (several times faster on model-sized documents), else json.loads."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as exc:
+            raise JSONParseError(exc.msg, exc.pos) from None
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError as exc:
+        raise JSONParseError(exc.msg, exc.pos) from None
+
+
+def repair_json(text: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Fixes the usual LLM JSON faults with string operations only (no parsing):
+
+      code_fence:        ```json ... ``` wrappers
+      surrounding_text:  prose before the first '{' / '[' or after the last '}' / ']'
+      trailing_comma:    ",}" / ", ]" (string-aware)
+
+    Returns (text, repairs applied).
+    """
+    repairs = []
+    if "```" in text:
+        fence = _FENCE.search(text)
+        if fence is not None:
+            text = fence.group(1)
+            repairs.append("code_fence")
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    end = max(text.rfind("}"), text.rfind("]"))
+    if starts and end >= 0:
+        start = min(starts)
+        if text[:start].strip() or text[end + 1 :].strip():
+            repairs.append("surrounding_text")
+        text = text[start : end + 1]
+
+    commas = [m.start() for m in _TRAILING_COMMA.finditer(text)]
+    if commas:
+        commas = _outside_strings(text, commas)
+        if commas:
+            parts, last = [], 0
+            for pos in commas:
+                parts.append(text[last:pos])
+                last = pos + 1
+            parts.append(text[last:])
+            text = "".join(parts)
+            repairs.append("trailing_comma")
+    return text, tuple(repairs)
+
+
+def _outside_strings(text: str, positions: List[int]) -> List[int]:
+    # One pass over the string literals (escape-aware), walked alongside the sorted
+    # positions, so each candidate costs O(1) instead of a rescan from the start
+    kept = []
+    literals = _STRING.finditer(text)
+    literal = next(literals, None)
+    for pos in positions:
+        while literal is not None and literal.end() <= pos:
+            literal = next(literals, None)
+        if literal is None or pos < literal.start():
+            kept.append(pos)
+    return kept
+
+
+def parse_model_json(text: str, repair: bool = True) -> Tuple[Any, Tuple[str, ...]]:
+    """
+    Parses model output as JSON: returns (document, repairs applied).
+
+    Clean output is parsed exactly once. Output that visibly needs repair (starts
+    with a fence or prose) goes straight to repair_json and is parsed once after
+    it; anything else that fails the first parse is repaired and parsed a second
+    time. Raises JSONParseError if it still does not parse (or repair=False).
+    """
+    first_error = None
+    if not repair or text.lstrip()[:1] in ("{", "["):
+        try:
+            return loads(text), NO_REPAIRS
+        except JSONParseError as exc:
+            if not repair:
+                raise
+            first_error = exc
+
+    fixed, repairs = repair_json(text)
+    if not repairs and first_error is not None:
+        raise first_error  # nothing to fix: the original error stands
+    return loads(fixed), repairs
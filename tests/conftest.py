@@ -0,0 +1,63 @@
+# shared fixtures
+import os
+import shutil
+
+import pytest
+import yaml
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "prompt_lifecycle")
+CONFIG_DIR = os.path.join(PACKAGE_DIR, "config")
+PROMPTS_DIR = os.path.join(PACKAGE_DIR, "prompts")
+
+
+def _merge(base, overrides):
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+@pytest.fixture
+def run_config(tmp_path):
+    """
+    make(**overrides) -> path of a copy of the shipped run config (with its YAML
+    files and prompts) under tmp_path. Every cache / telemetry path points into
+    tmp_path; overrides are merged into the top-level blocks.
+    """
+    config_dir = tmp_path / "config"
+    prompts_dir = tmp_path / "prompts"
+    cache_dir = tmp_path / "cache"
+    shutil.copytree(CONFIG_DIR, config_dir, ignore=shutil.ignore_patterns("*.bundle"))
+    shutil.copytree(PROMPTS_DIR, prompts_dir)
+
+    def make(**overrides):
+        with open(config_dir / "company_overview.yaml", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        _merge(
+            config,
+            {
+                "prompts": {"base_dir": str(prompts_dir)},
+                "evidence": {"index_dir": str(cache_dir / "evidence")},
+                "map_reduce": {"cache_path": str(cache_dir / "map_facts.sqlite")},
+                "response_cache": {"disk_path": str(cache_dir / "llm_responses.sqlite")},
+                "telemetry": {
+                    "exporters": [
+                        {"type": "csv", "path": str(cache_dir / "events.csv")},
+                        {"type": "prometheus", "textfile": str(cache_dir / "prompt_lifecycle.prom")},
+                    ]
+                },
+                "eval": {"result_store": str(cache_dir / "eval_results.sqlite")},
+                "judge": {"cache_path": str(cache_dir / "judge_verdicts.sqlite")},
+            },
+        )
+        _merge(config, overrides)
+        path = config_dir / "company_overview.yaml"
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(config, f, sort_keys=False)
+        return str(path)
+
+    make.prompts_dir = prompts_dir
+    make.cache_dir = cache_dir
+    return make
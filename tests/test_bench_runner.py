@@ -0,0 +1,57 @@
+# tests for the benchmark runner
+import json
+
+from prompt_lifecycle.bench.runner import CASES, compare, format_comparison, measure, run_suite
+from prompt_lifecycle.bench.synthetic import generate_config
+
+TINY = {"packs": 10, "versions": 3, "kpis": 40}
+
+
+def test_run_suite_smoke(tmp_path):
+    cfg = generate_config(str(tmp_path / "synthetic"), subs_per_industry=5, **TINY)
+    assert cfg.routes and len(cfg.versions) == 3
+
+    logged = []
+    results = run_suite(cfg, TINY, min_time_s=0.005, repeat=2, log=logged.append)
+    assert set(results["results"]) == {case.name for case in CASES}
+    assert len(logged) == len(CASES)
+    for stats in results["results"].values():
+        assert stats["repeat"] == 2
+        assert 0 < stats["min_ns"] <= stats["median_ns"] <= stats["max_ns"]
+    assert results["meta"]["scale"] == TINY
+    json.dumps(results)  # written as the baseline file
+
+    only = run_suite(cfg, TINY, only=["route_"], min_time_s=0.005, repeat=2)
+    assert set(only["results"]) == {"route_warm", "route_cold"}
+
+
+def test_measure_calibrates_the_loop_count():
+    stats = measure(lambda: sum(range(100)), min_time_s=0.01, repeat=3)
+    assert stats["number"] > 1
+    assert stats["ops_per_s"] > 0
+
+
+def _results(scale="small", **medians):
+    return {"meta": {"scale": scale}, "results": {name: {"median_ns": ns} for name, ns in medians.items()}}
+
+
+def test_compare_flags_regressions():
+    baseline = _results(route_warm=1000.0, load_warm=2000.0, runtime_run=5000.0)
+
+    rows, regressed = compare(_results(route_warm=1100.0, load_warm=1000.0, runtime_run=5000.0), baseline)
+    assert not regressed
+    assert {row["name"]: row["status"] for row in rows} == {"route_warm": "ok", "load_warm": "faster", "runtime_run": "ok"}
+
+    rows, regressed = compare(_results(route_warm=1300.0, new_case=10.0), baseline)
+    assert regressed
+    statuses = {row["name"]: row["status"] for row in rows}
+    assert statuses == {"route_warm": "REGRESSION", "new_case": "new"}
+    assert next(row for row in rows if row["name"] == "route_warm")["ratio"] == 1.3
+
+    _, regressed = compare(_results(route_warm=1300.0), baseline, threshold=0.5)
+    assert not regressed
+
+    rows, _ = compare(_results("large", route_warm=1000.0), baseline)
+    assert rows[-1]["status"].startswith("warning")
+    table = format_comparison(rows)
+    assert "route_warm" in table and "1.00x" in table and "warning" in table
@@ -1 +1,94 @@
 # tests for CLI
+import json
+
+import pytest
+
+from prompt_lifecycle.cli import main as cli
+from prompt_lifecycle.engine.runtime import Runtime
+
+
+@pytest.fixture
+def closes(monkeypatch):
+    """Counts Runtime.close() calls."""
+    calls = []
+    close = Runtime.close
+
+    def counting_close(self):
+        calls.append(self)
+        close(self)
+
+    monkeypatch.setattr(Runtime, "close", counting_close)
+    return calls
+
+
+def _main(config, *args):
+    cli.main(["--config", config, "--section", "company_overview", *args])
+
+
+def test_generate_prints_manifest_prompt_and_output(run_config, capsys, closes):
+    _main(run_config(), "--industry", "ENERGY", "--sub-industry", "Commodity Traders")
+    out = capsys.readouterr().out
+    manifest = json.loads(out.split("===== PROMPT MANIFEST =====\n")[1].split("\n\n=====")[0])
+    assert manifest["router_manifest"]["industry"] == "ENERGY"
+    assert "===== ASSEMBLED PROMPT TEXT =====" in out
+    assert "===== LLM OUTPUT (stub today) =====" in out
+    assert len(closes) == 1
+
+
+@pytest.mark.parametrize("mode", ["--prompt-only", "--manifest-only", "--stream"])
+def test_every_mode_closes_the_runtime(run_config, capsys, closes, mode):
+    _main(run_config(), mode)
+    out = capsys.readouterr().out
+    if mode == "--prompt-only":
+        assert "Company Overview (v2025_02_15)" in out and "=====" not in out
+    elif mode == "--manifest-only":
+        assert json.loads(out)["router_manifest"]["prompt_version"] == "v2025_02_15"
+    else:
+        assert "===== PROMPT MANIFEST =====" in out
+    assert len(closes) == 1
+
+
+def test_filing_runs_map_reduce(run_config, tmp_path, capsys, closes):
+    filing = tmp_path / "filing.txt"
+    filing.write_text("Revenue grew 12%.\n\nCapex was $3bn.", encoding="utf-8")
+    _main(run_config(), "--filing", str(filing), "--profile")
+    captured = capsys.readouterr()
+    manifest = json.loads(captured.out.split("===== PROMPT MANIFEST =====\n")[1].split("\n\n=====")[0])
+    assert manifest["map_reduce"]["chunks"] == 1
+    assert "===== STAGE PROFILE =====" in captured.err
+    assert len(closes) == 1
+
+
+def test_failed_run_still_closes_the_runtime(run_config, closes):
+    with pytest.raises(ValueError, match="KPI pack 'NOPE' not found"):
+        _main(run_config(), "--kpi-pack", "NOPE")
+    assert len(closes) == 1
+
+
+def _batch(config, tmp_path, records, *args):
+    source = tmp_path / "issuers.jsonl"
+    source.write_text("\n".join(json.dumps(r) for r in records) + "\n", encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+    cli.main(["generate-batch", "--config", config, "--section", "company_overview", "--input", str(source), "--output", str(output), *args])
+    return [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+
+def test_generate_batch_keeps_order_and_reports_errors(run_config, tmp_path, capsys, closes):
+    records = [
+        {"id": f"r{i}", "industry": "TECHNOLOGY", "sub_industry": "IT Services and Software", "inputs": f"Issuer {i}."}
+        for i in range(10)
+    ]
+    records[3]["kpi_pack"] = "NOPE"
+    records[7]["section"] = "nope"
+    lines = _batch(run_config(), tmp_path, records, "--workers", "4", "--max-in-flight", "2")
+
+    assert [line["id"] for line in lines] == [r["id"] for r in records]
+    assert [line["index"] for line in lines] == list(range(10))
+    assert "KPI pack 'NOPE' not found" in lines[3]["error"]
+    assert "Unknown section" in lines[7]["error"]
+    assert all("output" in line for i, line in enumerate(lines) if i not in (3, 7))
+    assert "Issuer 5." in lines[5]["output"]
+
+    stats = json.loads(capsys.readouterr().err.strip().splitlines()[0])
+    assert (stats["records"], stats["errors"]) == (10, 2)
+    assert len(closes) == 1
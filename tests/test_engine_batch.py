@@ -0,0 +1,118 @@
+# tests for the batch runner
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from prompt_lifecycle.engine.batch import BatchRunner
+from prompt_lifecycle.engine.runtime import Runtime
+
+INDUSTRIES = [
+    ("TECHNOLOGY", "IT Services and Software"),
+    ("ENERGY", "Commodity Traders"),
+    ("AUTOS", "OEM"),
+]
+
+
+def _records(n):
+    for i in range(n):
+        industry, sub_industry = INDUSTRIES[i % len(INDUSTRIES)]
+        yield i, {"id": f"r{i}", "industry": industry, "sub_industry": sub_industry, "inputs": f"Issuer {i} filing."}
+
+
+class Tracker:
+    """Wraps BatchRunner.process: slows it down and records the peak number of records in flight."""
+
+    def __init__(self, runner, delay_s=0.01):
+        self.process = runner.process
+        self.delay_s = delay_s
+        self.lock = threading.Lock()
+        self.in_flight = self.peak = self.started = 0
+        runner._work = self
+
+    def __call__(self, index, record):
+        with self.lock:
+            self.in_flight += 1
+            self.started += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay_s * (1 + index % 3))
+            return self.process(index, record)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class RecordingOut(io.StringIO):
+    """Remembers how many records had started when each line was written."""
+
+    def __init__(self, tracker):
+        super().__init__()
+        self.tracker = tracker
+        self.started_at_write = []
+
+    def write(self, text):
+        self.started_at_write.append(self.tracker.started)
+        return super().write(text)
+
+
+def _lines(out):
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+@pytest.fixture
+def runtime(run_config):
+    runtime = Runtime(run_config(), use_bundle=False)
+    yield runtime
+    runtime.close()
+
+
+@pytest.mark.parametrize("order", BatchRunner.ORDERS)
+def test_grouped_windows_respect_max_in_flight(runtime, order):
+    runner = BatchRunner(runtime, "company_overview", workers=8, order=order, max_in_flight=2, group_by_prefix=True, group_window=12)
+    tracker = Tracker(runner)
+    out = RecordingOut(tracker)
+
+    stats = runner.run(_records(24), out)
+    assert (stats["records"], stats["errors"], stats["prefix_groups"]) == (24, 0, 6)  # 3 prefixes x 2 windows
+    assert tracker.peak <= 2
+
+    indexes = [line["index"] for line in _lines(out)]
+    assert sorted(indexes) == list(range(24))
+    if order == "input":
+        assert indexes == list(range(24))
+        # results are written as they become writable, not once the whole window is done
+        assert out.started_at_write[0] < 12
+
+
+def test_grouped_window_dispatches_by_prefix(runtime):
+    runner = BatchRunner(runtime, "company_overview", workers=1, group_by_prefix=True, group_window=9)
+    dispatched = []
+    process = runner.process
+
+    def work(index, record):
+        dispatched.append(record["industry"])
+        return process(index, record)
+
+    runner._work = work
+    runner.run(_records(9), io.StringIO())
+    # one worker: the 3 prefix groups run back to back, not interleaved as in the input
+    assert len(dispatched) == 9
+    assert sum(a != b for a, b in zip(dispatched, dispatched[1:])) == 2
+
+
+@pytest.mark.parametrize("order", BatchRunner.ORDERS)
+def test_max_in_flight_bounds_queued_records(runtime, order):
+    runner = BatchRunner(runtime, "company_overview", workers=8, order=order, max_in_flight=3)
+    tracker = Tracker(runner)
+    out = io.StringIO()
+
+    stats = runner.run(_records(20), out)
+    assert (stats["records"], stats["errors"]) == (20, 0)
+    assert tracker.peak <= 3
+    indexes = [line["index"] for line in _lines(out)]
+    assert sorted(indexes) == list(range(20))
+    if order == "input":
+        assert indexes == list(range(20))
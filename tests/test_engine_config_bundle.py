@@ -0,0 +1,96 @@
+# tests for config bundles
+import os
+
+import pytest
+
+from prompt_lifecycle.engine.config_bundle import (
+    BUNDLE_FORMAT_VERSION,
+    BUNDLE_MAGIC,
+    compile_bundle,
+    default_bundle_path,
+    is_fresh,
+    load_fresh_bundle,
+    load_run_config,
+    read_bundle,
+)
+from prompt_lifecycle.engine.prompt_loader import TemplateCache
+from prompt_lifecycle.engine.runtime import Runtime
+
+
+def _bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_round_trip(run_config):
+    config_path = run_config()
+    compiled = compile_bundle(config_path)
+    bundle_path = default_bundle_path(config_path)
+    assert bundle_path.endswith("company_overview.bundle")
+
+    loaded = read_bundle(bundle_path)
+    assert loaded.hash == compiled.hash
+    assert loaded.config == load_run_config(config_path) == compiled.config
+    assert loaded.sources[0]["path"] == os.path.abspath(config_path)
+    template = os.path.join(str(run_config.prompts_dir), "kpi_pack.md")
+    assert template in loaded.templates
+    assert loaded.templates[template].required_variables == compiled.templates[template].required_variables
+
+    cache = TemplateCache()
+    assert load_fresh_bundle(bundle_path, config_path, cache=cache).hash == compiled.hash
+    assert cache.get(template, "pinned")[1]  # seeded: served without compiling
+
+    for use_bundle, source, hash_ in ((True, "bundle", compiled.hash), (False, "yaml", None)):
+        runtime = Runtime(config_path, use_bundle=use_bundle)
+        try:
+            assert (runtime.snapshot.source["source"], runtime.snapshot.source["hash"]) == (source, hash_)
+        finally:
+            runtime.close()
+
+
+@pytest.mark.parametrize(
+    "damage, error",
+    [
+        (lambda data: b"NOPE" + data[4:], "Not a prompt_lifecycle config bundle"),
+        (lambda data: data[:10], "Not a prompt_lifecycle config bundle"),
+        (lambda data: BUNDLE_MAGIC + bytes([BUNDLE_FORMAT_VERSION + 1]) + data[5:], "format"),
+        (lambda data: data[:-1] + bytes([data[-1] ^ 0xFF]), "hash mismatch"),
+    ],
+)
+def test_corrupt_bundles_are_rejected(run_config, damage, error):
+    config_path = run_config()
+    compile_bundle(config_path)
+    bundle_path = default_bundle_path(config_path)
+    with open(bundle_path, "rb") as f:
+        data = f.read()
+    with open(bundle_path, "wb") as f:
+        f.write(damage(data))
+
+    with pytest.raises(ValueError, match=error):
+        read_bundle(bundle_path)
+    assert load_fresh_bundle(bundle_path, config_path) is None  # callers fall back to YAML
+
+
+def test_staleness(run_config, tmp_path):
+    config_path = run_config()
+    bundle_path = default_bundle_path(config_path)
+    assert load_fresh_bundle(bundle_path, config_path) is None  # no bundle yet
+
+    bundle = compile_bundle(config_path)
+    assert is_fresh(bundle)
+    # built from another run config
+    assert load_fresh_bundle(bundle_path, str(tmp_path / "other.yaml")) is None
+
+    # any referenced YAML file or template going stale makes the whole bundle stale
+    for path in (
+        os.path.join(os.path.dirname(config_path), "kpi_packs.yaml"),
+        os.path.join(str(run_config.prompts_dir), "company_overview", "prompt_v2025_01_10.md"),
+    ):
+        bundle = compile_bundle(config_path)
+        _bump_mtime(path)
+        assert not is_fresh(bundle)
+        assert load_fresh_bundle(bundle_path, config_path) is None
+
+    bundle = compile_bundle(config_path)
+    os.remove(os.path.join(str(run_config.prompts_dir), "evidence.md"))
+    assert not is_fresh(bundle)
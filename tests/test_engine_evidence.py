@@ -0,0 +1,109 @@
+# tests for evidence retrieval
+import pytest
+
+from prompt_lifecycle.engine.evidence import EvidenceIndex, Passage, chunk_documents, input_documents, tokenize
+from prompt_lifecycle.engine.runtime import Runtime
+
+FILLER = "The company was founded decades ago and is headquartered in a mid-sized city with several offices. "
+
+RELEVANT = "Trading revenue rose 12% on stronger gas and power volumes; value at risk (VaR) stayed within limits."
+
+
+def _materials(n_filler=60):
+    """~8k chars of filler paragraphs with one relevant paragraph in the middle."""
+    paragraphs = [f"{FILLER}Paragraph {i}." for i in range(n_filler)]
+    paragraphs.insert(n_filler // 2, RELEVANT)
+    return {"annual_report": "\n\n".join(paragraphs), "notes": "Board composition and governance policies."}
+
+
+def test_tokenize_and_chunk():
+    assert tokenize("The Margins of the business, and ITS Class-A shares") == ["margin", "business", "class", "share"]
+
+    docs = input_documents([{"source": "10-K", "text": "a"}, "b", {"k": 1}])
+    assert docs == [("10-K", "a"), ("doc2", "b"), ("doc3", '{\n  "k": 1\n}')]
+    assert input_documents("plain") == [("inputs", "plain")]
+
+    text = "\n\n".join(["x" * 300] * 5) + "\n\n" + "Long sentence. " * 80
+    passages = chunk_documents([("src", text)], chunk_chars=700)
+    assert all(p.source == "src" for p in passages)
+    assert [p.ordinal for p in passages] == list(range(1, len(passages) + 1))
+    assert all(len(p.text) <= 700 for p in passages)
+    # nothing lost but whitespace
+    assert "".join(p.text for p in passages).replace("\n", "").replace(" ", "") == text.replace("\n", "").replace(" ", "")
+
+
+def test_bm25_ranking():
+    index = EvidenceIndex.build(
+        [
+            Passage("a", 1, "revenue revenue revenue grew"),
+            Passage("a", 2, "revenue margin " + "filler " * 30),
+            Passage("a", 3, "governance board"),
+            Passage("a", 4, "margin expanded"),
+        ]
+    )
+    ranked = [doc_id for _, doc_id in index.search(["revenue"], top_k=10)]
+    assert ranked == [0, 1]  # higher tf and shorter passage first; non-matching passages excluded
+    # a rarer term outweighs a common one
+    ranked = [doc_id for _, doc_id in index.search(["revenue", "margin", "board"], top_k=10)]
+    assert ranked[0] in (1, 2) and set(ranked) == {0, 1, 2, 3}
+    assert [doc_id for _, doc_id in index.search(["revenue", "margin", "board"], top_k=2)] == ranked[:2]
+    assert index.search(["unknown"], top_k=3) == []
+
+
+def test_index_persistence(tmp_path):
+    index = EvidenceIndex.build(chunk_documents(input_documents(_materials()), 400))
+    path = str(tmp_path / "ab" / "index.bm25")
+    index.dump(path)
+    loaded = EvidenceIndex.load(path)
+    assert loaded.passages == index.passages
+    assert loaded.search(["trading", "var"], 3) == index.search(["trading", "var"], 3)
+
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-1] + bytes([data[-1] ^ 0xFF]))
+    with pytest.raises(ValueError, match="checksum mismatch"):
+        EvidenceIndex.load(path)
+
+
+def test_runtime_injects_top_passages(run_config):
+    runtime = Runtime(run_config(evidence={"chunk_chars": 400, "top_k": 2}), use_bundle=False)
+    try:
+        retriever = runtime.snapshot.evidence
+        prompt, manifest = runtime.render("company_overview", inputs=_materials())
+        evidence = manifest["router_manifest"]["evidence"]
+        # only the passage matching the pack's KPI terms, though top_k allows two
+        assert (evidence["status"], evidence["index"], evidence["passages"]) == ("retrieved", "built", 1)
+        assert evidence["of_passages"] > 10
+        assert RELEVANT in prompt and "[annual_report §" in prompt
+        assert prompt.count(FILLER) <= 2
+
+        # every section of one issuer shares the index; it is also on disk
+        _, manifest = runtime.render("company_overview", inputs=_materials())
+        assert manifest["router_manifest"]["evidence"]["index"] == "memory"
+        retriever._indexes.clear()
+        _, manifest = runtime.render("company_overview", inputs=_materials())
+        assert manifest["router_manifest"]["evidence"]["index"] == "disk"
+        assert retriever.stats == {"memory": 1, "disk": 1, "built": 1}
+
+        # small inputs are pasted whole
+        prompt, manifest = runtime.render("company_overview", inputs={"annual_report": RELEVANT})
+        assert manifest["router_manifest"]["evidence"]["status"] == "passthrough"
+        assert RELEVANT in prompt
+    finally:
+        runtime.close()
+
+
+def test_budget_keeps_document_order(run_config):
+    runtime = Runtime(run_config(evidence={"chunk_chars": 400, "top_k": 8, "max_chars": 900}), use_bundle=False)
+    try:
+        retriever = runtime.snapshot.evidence
+        index, _ = retriever.index_for(_materials())
+        passages = retriever.select(index, retriever.query_terms("company_overview", "ENERGY__Commodity_Traders"))
+        assert passages and sum(len(p.text) for p in passages) <= 900
+        assert any(RELEVANT in p.text for p in passages)
+        assert passages == sorted(passages, key=lambda p: (p.source, p.ordinal))
+        # no matching term: the head of the materials
+        assert retriever.select(index, ["zzz"])[0] == index.passages[0]
+    finally:
+        runtime.close()
@@ -1 +1,114 @@
 # tests for guardrails
+import json
+
+import pytest
+
+from prompt_lifecycle.engine.guardrails import (
+    GuardrailViolation,
+    JSONStructureGuardrail,
+    MarkdownSectionGuardrail,
+    StreamingGuardrail,
+    guardrail_for_section,
+)
+from prompt_lifecycle.schemas import CompanyOverviewOutput
+
+HEADING = "**Company Overview**"
+
+
+def _markdown(n=8):
+    return HEADING + "\n" + "".join(f"- Fact {i} **Evidence:** 10-K p.{i}\n" for i in range(n))
+
+
+def _json(n=8):
+    return json.dumps(
+        {"heading": "Company Overview", "bullets": [{"text": f"Fact {i}", "evidence": "10-K"} for i in range(n)]}
+    )
+
+
+def _feed(guardrail, text, size=3):
+    """Feeds text in small chunks, like a stream, then finishes."""
+    for i in range(0, len(text), size):
+        guardrail.feed(text[i : i + size])
+    guardrail.finish()
+
+
+def test_markdown_valid_stream_passes():
+    guardrail = MarkdownSectionGuardrail.for_schema(CompanyOverviewOutput)
+    _feed(guardrail, _markdown())
+    assert guardrail.bullets == 8
+
+
+def test_markdown_wrong_heading_aborts_early():
+    guardrail = MarkdownSectionGuardrail.for_schema(CompanyOverviewOutput)
+    text = "Sure! Here is the overview...\n" + _markdown()
+    with pytest.raises(GuardrailViolation) as info:
+        _feed(guardrail, text)
+    assert info.value.reason == "missing_heading"
+    # the first chunk ("Sur") can already never become the heading
+    assert info.value.at_chars == 3
+
+
+@pytest.mark.parametrize(
+    "text, reason",
+    [
+        (HEADING + "\nNot a bullet\n", "not_a_bullet"),
+        (HEADING + "\n- Fact without a note\n", "missing_evidence"),
+        (_markdown(13), "too_many_bullets"),
+        (_markdown(3), "too_few_bullets"),
+        ("", "missing_heading"),
+    ],
+)
+def test_markdown_violations(text, reason):
+    violation = MarkdownSectionGuardrail.for_schema(CompanyOverviewOutput).check(text)
+    assert violation is not None
+    assert violation.reason == reason
+
+
+def test_max_chars():
+    violation = StreamingGuardrail(max_chars=10).check("x" * 11)
+    assert violation.to_dict() == {"reason": "too_long", "detail": "output exceeds 10 chars", "at_chars": 11}
+    assert StreamingGuardrail(max_chars=10).check("x" * 10) is None
+
+
+def test_json_valid_stream_passes_with_fence():
+    guardrail = JSONStructureGuardrail(CompanyOverviewOutput)
+    _feed(guardrail, "```json\n" + _json() + "\n```")
+
+
+@pytest.mark.parametrize(
+    "text, reason",
+    [
+        ("Here it is: {}", "not_an_object"),
+        ('{"heading": ["x"}', "mismatched_bracket"),
+        ('{"a": 1} trailing', "trailing_content"),
+        ('{"heading": "Company', "truncated"),
+        ('{"a": 1 "b": 2}', "invalid_json"),
+        (_json(3), "schema"),
+    ],
+)
+def test_json_violations(text, reason):
+    violation = JSONStructureGuardrail(CompanyOverviewOutput).check(text)
+    assert violation is not None
+    assert violation.reason == reason
+
+
+def test_json_brackets_inside_strings_are_ignored():
+    text = json.dumps({"heading": "Company Overview", "bullets": [{"text": 'a "}] b', "evidence": "{["}] * 8})
+    assert JSONStructureGuardrail(CompanyOverviewOutput).check(text) is None
+
+
+def test_guardrail_for_section():
+    assert guardrail_for_section("company_overview", {}) is None
+    assert guardrail_for_section("company_overview", {"guardrails": {"enabled": False}}) is None
+
+    markdown = guardrail_for_section("company_overview", {"guardrails": {"enabled": True, "max_chars": 500}})
+    assert isinstance(markdown, MarkdownSectionGuardrail)
+    assert markdown.max_chars == 500
+
+    as_json = guardrail_for_section("company_overview", {"guardrails": {"enabled": True, "output_format": "json"}})
+    assert isinstance(as_json, JSONStructureGuardrail)
+    assert as_json.schema is CompanyOverviewOutput
+
+    # sections without an output contract only get the length check
+    plain = guardrail_for_section("risks", {"guardrails": {"enabled": True}})
+    assert type(plain) is StreamingGuardrail
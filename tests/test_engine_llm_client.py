@@ -0,0 +1,171 @@
+# tests for the LLM client, against the mock provider
+import asyncio
+import threading
+
+import pytest
+
+from prompt_lifecycle.engine.llm_client import EchoTransport, HTTPTransport, LLMClient, LLMTimeoutError, ProviderError, build_transport
+from prompt_lifecycle.engine.mock_provider import MockProvider
+
+MODELS = {"default_model": "fast", "models": {"fast": {"provider_model": "mock-mini"}, "large": {"provider_model": "mock-xl"}}}
+
+
+def _client(url, cache=None, **llm):
+    config = {
+        "llm": {
+            "transport": "http",
+            "url": url,
+            "max_connections": 4,
+            "retry": {"max_attempts": 3, "base_delay_s": 0.001, "max_delay_s": 0.05},
+            "concurrency": {"initial": 8, "cooldown_s": 0},
+            **llm,
+        },
+        "models_cfg": MODELS,
+    }
+    if cache:
+        config["response_cache"] = {"mode": cache}
+    return LLMClient(config)
+
+
+async def _closing(client, coro):
+    try:
+        return await coro
+    finally:
+        await client.transport.aclose()
+        client.close()
+
+
+def test_calls_reuse_pooled_connections():
+    async def main():
+        async with MockProvider(latency_ms=5, jitter_ms=0) as provider:
+            client = _client(provider.url)
+            prompts = [f"prompt {i} ✓" for i in range(20)]
+            outputs = await _closing(client, client.call_many(prompts))
+            assert outputs == prompts  # echoed, in input order
+            assert provider.stats["ok"] == 20
+            assert provider.stats["connections"] <= 4  # max_connections, kept alive
+
+    asyncio.run(main())
+
+
+def test_lanes_send_their_provider_model():
+    async def main():
+        seen = []
+        async with MockProvider(latency_ms=0, jitter_ms=0) as provider:
+            respond = provider._respond
+
+            async def recording(payload):
+                seen.append(payload.get("model"))
+                return await respond(payload)
+
+            provider._respond = recording
+            client = _client(provider.url)
+
+            async def calls():
+                await client.acall("a")
+                await client.acall("b", model="large")
+                with pytest.raises(ValueError, match="Unknown model 'huge'"):
+                    await client.acall("c", model="huge")
+
+            await _closing(client, calls())
+        assert seen == ["mock-mini", "mock-xl"]
+
+    asyncio.run(main())
+
+
+def test_throttling_is_retried_after_retry_after():
+    async def main():
+        async with MockProvider(latency_ms=20, jitter_ms=0, max_in_flight=2, retry_after_s=0.01) as provider:
+            client = _client(provider.url, retry={"max_attempts": 20, "base_delay_s": 0.001, "max_delay_s": 0.05})
+            prompts = [f"p{i}" for i in range(12)]
+            outputs = await _closing(client, client.call_many(prompts))
+            assert outputs == prompts
+            assert provider.stats["throttled"] > 0
+            counters = client.metrics()["fast"]
+            assert counters["throttled"] == provider.stats["throttled"]
+            assert counters["successes"] == 12
+            assert counters["concurrency_limit"] < 8  # the window shrank
+
+    asyncio.run(main())
+
+
+def test_errors_and_timeouts():
+    async def main():
+        async with MockProvider(latency_ms=200, jitter_ms=0) as provider:
+            client = _client(provider.url, timeout_s=0.02, retry={"max_attempts": 2, "base_delay_s": 0.001})
+            with pytest.raises(LLMTimeoutError):
+                await client.acall("slow")
+            assert client.metrics()["fast"]["timeouts"] == 2
+            await client.transport.aclose()
+            client.close()
+
+        async with MockProvider(latency_ms=0, jitter_ms=0, rate_429=1.0, retry_after_s=0) as provider:
+            client = _client(provider.url, retry={"max_attempts": 2, "base_delay_s": 0.001})
+            with pytest.raises(ProviderError) as info:
+                await _closing(client, client.acall("throttled"))
+            assert info.value.status == 429
+            assert provider.stats["requests"] == 2
+
+    asyncio.run(main())
+
+
+def test_stream_and_response_cache():
+    async def main():
+        async with MockProvider(latency_ms=0, jitter_ms=0, chunk_chars=8, chunk_delay_ms=0) as provider:
+            client = _client(provider.url, cache="readwrite")
+            prompt = "A prompt long enough to arrive in several chunks: ünïcode included."
+
+            async def calls():
+                meta = {}
+                chunks = [chunk async for chunk in client.astream(prompt, meta=meta)]
+                assert len(chunks) > 1 and "".join(chunks) == prompt
+                assert meta["cache_status"] == "miss"
+
+                # the complete stream was cached
+                output, meta = await client.acall_with_meta(prompt)
+                assert (output, meta["cache_status"]) == (prompt, "hit:memory")
+                output, meta = await client.acall_with_meta(prompt, model="large")
+                assert meta["cache_status"] == "miss"  # per-model keys
+
+            await _closing(client, calls())
+            assert (provider.stats["streamed"], provider.stats["ok"]) == (1, 2)
+
+    asyncio.run(main())
+
+
+def test_sync_calls_run_on_the_background_loop():
+    async def serve(ready, stop):
+        async with MockProvider(latency_ms=0, jitter_ms=0) as provider:
+            ready.set_result(provider.url)
+            await stop
+
+    loop = asyncio.new_event_loop()
+    ready, stop = loop.create_future(), loop.create_future()
+    task = loop.create_task(serve(ready, stop))
+    url = loop.run_until_complete(ready)
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        client = _client(url)
+        try:
+            assert client.call("sync") == "sync"
+            assert client.call_with_meta("sync", model="large") == ("sync", {"model": "large"})
+        finally:
+            client.close()
+    finally:
+        loop.call_soon_threadsafe(stop.set_result, None)
+        asyncio.run_coroutine_threadsafe(asyncio.wait_for(asyncio.shield(task), 5), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def test_build_transport():
+    assert isinstance(build_transport({}), EchoTransport)
+    assert isinstance(build_transport({"transport": "http", "url": "http://127.0.0.1:1/v1"}), HTTPTransport)
+    with pytest.raises(ValueError, match="requires llm.url"):
+        build_transport({"transport": "http"})
+    with pytest.raises(ValueError, match="http"):
+        build_transport({"transport": "http", "url": "ftp://x"})
+    with pytest.raises(ValueError, match="Unknown llm.transport"):
+        build_transport({"transport": "grpc"})
@@ -0,0 +1,99 @@
+# tests for map-reduce
+import io
+
+import pytest
+
+from prompt_lifecycle.engine.map_reduce import MapReducer, iter_chunks, iter_documents
+from prompt_lifecycle.engine.runtime import Runtime
+
+
+def _chunks(text, chunk_chars, overlap_chars):
+    return list(iter_chunks(io.StringIO(text), "doc", chunk_chars, overlap_chars))
+
+
+def test_short_and_empty_documents():
+    assert _chunks("", 100, 10) == []
+    assert _chunks("  \n\n ", 100, 10) == []
+    chunks = _chunks("  one short paragraph \n", 100, 10)
+    assert [(c.source, c.ordinal, c.text) for c in chunks] == [("doc", 1, "one short paragraph")]
+
+
+def test_chunks_end_on_paragraph_breaks():
+    paragraphs = [f"Paragraph {i}. " + "word " * 30 for i in range(20)]
+    chunks = _chunks("\n\n".join(paragraphs), 500, 50)
+
+    assert [c.ordinal for c in chunks] == list(range(1, len(chunks) + 1))
+    for chunk in chunks[:-1]:
+        assert len(chunk.text) <= 500
+        assert chunk.text.endswith("word")  # cut at the break after a paragraph, not mid-way
+    assert chunks[-1].text.endswith(paragraphs[-1].strip())
+
+
+def test_chunks_overlap_on_word_boundaries():
+    words = [f"w{i:04d}" for i in range(2000)]
+    chunks = _chunks(" ".join(words), 1000, 100)
+
+    for prev, chunk in zip(chunks, chunks[1:]):
+        first = chunk.text.split()[0]
+        assert first in words  # starts on a whole word ...
+        # ... inside the last overlap_chars of the previous chunk
+        assert first in prev.text.split()
+        assert len(prev.text) - prev.text.index(first) <= 100
+
+    seen = []
+    for chunk in chunks:
+        seen += chunk.text.split()
+    assert set(words) <= set(seen)  # nothing lost (hard cuts can leave partial words too)
+    assert seen[-1] == words[-1]
+
+
+def test_chunking_always_makes_progress():
+    # No word breaks at all, cuts land just past the middle of each chunk
+    text = ("x" * 500 + "\n\n") * 20
+    chunks = _chunks(text, 1000, 400)
+    assert sum(len(c.text) for c in chunks) < 2 * len(text)
+    assert len(chunks) <= 20
+
+    for overlap in (500, 800, 1000):
+        with pytest.raises(ValueError, match="half of chunk_chars"):
+            _chunks(text, 1000, overlap)
+
+
+def test_iter_documents_sources(tmp_path):
+    path = tmp_path / "filing.txt"
+    path.write_text("from a file", encoding="utf-8")
+    docs = [str(path), {"path": str(path), "source": "10-K"}, {"text": "inline"}, "plain text"]
+
+    chunks = list(iter_documents(docs, 100, 10))
+    assert [(c.source, c.text) for c in chunks] == [
+        ("filing.txt", "from a file"),
+        ("10-K", "from a file"),
+        ("doc3", "inline"),
+        ("doc4", "plain text"),
+    ]
+
+
+def test_reduce_inputs_drops_repeated_lines():
+    facts = ["- Revenue 10\n- Capex 3\n", "- Capex 3\n\n- Debt 5", "  - Revenue 10  "]
+    assert MapReducer.reduce_inputs(facts) == "- Revenue 10\n- Capex 3\n- Debt 5"
+
+
+def test_new_prompt_version_reuses_map_results(run_config, tmp_path):
+    filing = tmp_path / "filing.txt"
+    filing.write_text("\n\n".join(f"Segment {i} revenue grew {i}%. " + "detail " * 40 for i in range(40)), encoding="utf-8")
+    runtime = Runtime(run_config(map_reduce={"chunk_chars": 2000, "overlap_chars": 200}), use_bundle=False)
+    try:
+        first = runtime.generate_long("company_overview", [str(filing)])["manifest"]
+        stats = first["map_reduce"]
+        assert stats["chunks"] > 1
+        assert (stats["mapped"], stats["cached"]) == (stats["chunks"], 0)
+        assert first["router_manifest"]["prompt_version"] == "v2025_02_15"
+
+        second = runtime.generate_long("company_overview", [str(filing)], overrides={"prompt_version": "v2025_01_10"})
+        stats = second["manifest"]["map_reduce"]
+        assert (stats["mapped"], stats["cached"]) == (0, stats["chunks"])
+        assert stats["cost_usd"] == 0
+        assert second["manifest"]["router_manifest"]["prompt_version"] == "v2025_01_10"
+        assert "Segment 39 revenue grew 39%" in second["output"]  # echo: the reduced facts reach the prompt
+    finally:
+        runtime.close()
@@ -0,0 +1,140 @@
+# tests for the model router / cascade
+import pytest
+
+from prompt_lifecycle.engine.llm_client import ProviderError, Transport
+from prompt_lifecycle.engine.model_router import ModelRouter
+from prompt_lifecycle.engine.runtime import Runtime
+
+MODELS_CFG = {
+    "default_model": "fast",
+    "models": {
+        "fast": {"context_window_tokens": 8000, "max_output_tokens": 1000},
+        "large": {"context_window_tokens": 128000, "max_output_tokens": 1000},
+        "local": {},
+    },
+}
+
+GOOD = "**Company Overview**\n" + "".join(f"- Fact {i} **Evidence:** 10-K p.{i}\n" for i in range(8))
+
+
+def _router(**routing):
+    return ModelRouter({"llm": {"routing": dict({"enabled": True, "cascade": ["fast", "large"]}, **routing)}, "models_cfg": MODELS_CFG})
+
+
+def test_plan_skips_models_the_prompt_does_not_fit():
+    router = _router(cascade=["fast", "large", "local"], max_input_tokens={"large": 50000})
+    assert router.plan("company_overview", 1000).models == ("fast", "large", "local")
+
+    plan = router.plan("company_overview", 60000)
+    assert plan.models == ("local",)  # no context window: no limit
+    assert plan.skipped == {"fast": "prompt_too_large (60000 > 7000 tokens)", "large": "prompt_too_large (60000 > 50000 tokens)"}
+
+    with pytest.raises(ValueError, match="fits none of the models in the cascade \\(fast, large\\)"):
+        _router().plan("company_overview", 200000)
+
+
+def test_section_cascades_and_defaults():
+    router = _router(sections={"key_credit_considerations": {"cascade": ["large"]}})
+    assert router.cascade_for("key_credit_considerations") == ("large",)
+    assert router.cascade_for("company_overview") == ("fast", "large")
+    assert router.plan("key_credit_considerations", 10).models == ("large",)
+
+    off = ModelRouter({"llm": {"model": "large"}, "models_cfg": MODELS_CFG})
+    assert not off.enabled and off.cascade == ("large",)
+
+    with pytest.raises(ValueError, match="references models not in models.yaml: huge"):
+        _router(cascade=["fast", "huge"])
+    with pytest.raises(ValueError, match="unknown reason\\(s\\) timeout"):
+        _router(escalate_on=["guardrail", "timeout"])
+
+
+def test_unhealthy_models_are_skipped_after_min_samples():
+    router = _router(min_samples=10, max_error_rate=0.2, latency_slo_ms=500)
+    for _ in range(9):
+        router.observe("fast", 0.1, ok=False)
+    assert router.plan("company_overview", 10).models == ("fast", "large")  # too few samples to judge
+
+    router.observe("fast", 0.1, ok=False)
+    plan = router.plan("company_overview", 10)
+    assert plan.models == ("large",) and plan.skipped["fast"].startswith("error_rate (1.00 > 0.20)")
+
+    for _ in range(10):
+        router.observe("large", 2.0, ok=True, escalated=True)
+    # everything degraded: better a slow answer than none
+    assert router.plan("company_overview", 10) == (("fast", "large"), {})
+
+    snapshot = router.snapshot()
+    assert snapshot["fast"] == {"calls": 10, "p95_ms": None, "error_rate": 1.0, "escalation_rate": None}
+    assert snapshot["large"] == {"calls": 10, "p95_ms": 2000.0, "error_rate": 0.0, "escalation_rate": 1.0}
+
+
+def test_window_rolls_old_calls_out():
+    router = _router(min_samples=5, window=5)
+    for _ in range(5):
+        router.observe("fast", 0.1, ok=False)
+    assert "fast" in router.plan("company_overview", 10).skipped
+    for _ in range(5):
+        router.observe("fast", 0.1, ok=True)
+    assert router.plan("company_overview", 10).models == ("fast", "large")
+    assert router.snapshot()["fast"]["calls"] == 10
+
+
+class ByModel(Transport):
+    """Answers per provider model: an output, or an exception to raise."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    async def send(self, prompt_text, params):
+        self.calls.append(params["model"])
+        answer = self.answers[params["model"]]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def _generate(run_config, answers, **routing):
+    routing = dict({"enabled": True, "cascade": ["fast", "large"], "escalate_on": ["guardrail", "error"]}, **routing)
+    runtime = Runtime(run_config(llm={"routing": routing, "retry": {"max_attempts": 1}}), use_bundle=False)
+    transport = runtime.llm.transport = ByModel(answers)
+    try:
+        return runtime.generate("company_overview"), transport, runtime.model_router.snapshot()
+    finally:
+        runtime.close()
+
+
+def test_runtime_escalates_on_guardrail_failures(run_config):
+    result, transport, stats = _generate(run_config, {"gpt-4o-mini": "no heading, no bullets", "gpt-4o": GOOD})
+    routing = result["manifest"]["model_routing"]
+    assert result["output"] == GOOD and transport.calls == ["gpt-4o-mini", "gpt-4o"]
+    assert (routing["chosen"], routing["escalations"]) == ("large", 1)
+    assert [(step["model"], step["status"]) for step in routing["path"]] == [("fast", "escalated"), ("large", "accepted")]
+    assert routing["path"][0]["violation"]["reason"]
+    assert (stats["fast"]["escalation_rate"], stats["large"]["escalation_rate"]) == (1.0, 0.0)
+
+    # the first model's output passes: no escalation
+    result, transport, _ = _generate(run_config, {"gpt-4o-mini": GOOD, "gpt-4o": GOOD})
+    assert transport.calls == ["gpt-4o-mini"] and result["manifest"]["model_routing"]["escalations"] == 0
+
+    # the last model's output is returned even when it fails its checks
+    result, _, _ = _generate(run_config, {"gpt-4o-mini": "bad", "gpt-4o": "also bad"})
+    assert result["output"] == "also bad"
+    assert [step["status"] for step in result["manifest"]["model_routing"]["path"]] == ["escalated", "violated"]
+
+    # guardrail escalation switched off
+    result, transport, _ = _generate(run_config, {"gpt-4o-mini": "bad", "gpt-4o": GOOD}, escalate_on=["error"])
+    assert transport.calls == ["gpt-4o-mini"] and result["output"] == "bad"
+
+
+def test_runtime_escalates_on_provider_errors(run_config):
+    result, transport, stats = _generate(run_config, {"gpt-4o-mini": ProviderError(500, "boom"), "gpt-4o": GOOD})
+    path = result["manifest"]["model_routing"]["path"]
+    assert result["output"] == GOOD
+    assert (path[0]["status"], path[0]["detail"]) == ("error", "ProviderError: Provider returned HTTP 500: boom")
+    assert stats["fast"]["error_rate"] == 1.0
+
+    with pytest.raises(ProviderError):
+        _generate(run_config, {"gpt-4o-mini": ProviderError(500, "boom"), "gpt-4o": GOOD}, escalate_on=["guardrail"])
+    with pytest.raises(ProviderError):
+        _generate(run_config, {"gpt-4o-mini": ProviderError(500, "boom"), "gpt-4o": ProviderError(500, "boom")})
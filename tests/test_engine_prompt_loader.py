@@ -1 +1,136 @@
 # tests for prompt loader
+import os
+
+import pytest
+
+from prompt_lifecycle.engine.prompt_loader import SCOPE_REQUEST, CompiledTemplate, PromptLoader, TemplateCache
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_compiled_template_renders_like_format():
+    text = "{issuer.name} ({ticker!r}) leads {kpis[0]} at {share:{width}.1f}%"
+    compiled = CompiledTemplate("t.md", text, 0, len(text))
+    variables = {"issuer": type("Issuer", (), {"name": "Acme"})(), "ticker": "ACM", "kpis": ["revenue"], "share": 12.345, "width": 6}
+
+    assert compiled.required_variables == frozenset({"issuer", "ticker", "kpis", "share", "width"})
+    assert compiled.render(variables) == text.format(**variables)
+    assert compiled.missing_variables({"issuer": None}) == ["kpis", "share", "ticker", "width"]
+
+
+@pytest.mark.parametrize("text", ["{0}", "{}", "unclosed {name"])
+def test_compiled_template_rejects_bad_templates(text):
+    with pytest.raises(ValueError):
+        CompiledTemplate("t.md", text, 0, len(text))
+
+
+def test_cache_recompiles_only_when_the_file_changes(tmp_path):
+    path = _write(tmp_path / "a.md", "Hello {name}")
+    cache = TemplateCache()
+
+    first, hit = cache.get(path)
+    assert not hit
+    again, hit = cache.get(path)
+    assert hit and again is first
+
+    _write(tmp_path / "a.md", "Bye {who}")
+    _bump_mtime(path)
+    changed, hit = cache.get(path)
+    assert not hit
+    assert changed.required_variables == frozenset({"who"})
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_hash_validation_catches_same_stat_edits(tmp_path):
+    path = _write(tmp_path / "a.md", "Hello {name}")
+    cache = TemplateCache()
+    first, _ = cache.get(path)
+    st = os.stat(path)
+
+    # Same size and mtime, different content: "stat" trusts it, "hash" does not
+    _write(tmp_path / "a.md", "Hello {nama}")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert cache.get(path)[0] is first
+    recompiled, hit = cache.get(path, "hash")
+    assert not hit
+    assert recompiled.required_variables == frozenset({"nama"})
+
+
+def test_pinned_and_seeded_entries(tmp_path):
+    path = _write(tmp_path / "a.md", "Hello {name}")
+    cache = TemplateCache()
+    first, _ = cache.get(path)
+
+    os.remove(path)
+    assert cache.get(path, "pinned") == (first, True)  # no stat
+
+    # seed() never replaces a live entry
+    cache.seed([CompiledTemplate(path, "Other {x}", 0, 9)])
+    assert cache.get(path, "pinned")[0] is first
+
+
+def _loader(tmp_path, **prompts):
+    return PromptLoader({"prompts": {"base_dir": str(tmp_path), **prompts}}, cache=TemplateCache())
+
+
+def test_load_puts_static_segments_first(tmp_path):
+    _write(tmp_path / "base.md", "You are an analyst.")
+    _write(tmp_path / "inputs.md", "Materials: {text}")
+    _write(tmp_path / "section.md", "Write about {issuer}.")
+    spec = {
+        "segments": [
+            {"name": "base", "template_path": "base.md"},
+            {"name": "inputs", "template_path": "inputs.md", "variables": {"text": "10-K"}, "scope": SCOPE_REQUEST},
+            {"name": "section", "template_path": "section.md", "variables": {"issuer": "Acme"}},
+        ]
+    }
+    loader = _loader(tmp_path)
+
+    prompt, manifest = loader.load(spec)
+    assert prompt == "You are an analyst.\n\nWrite about Acme.\n\nMaterials: 10-K"
+    assert [s["name"] for s in manifest["segments"]] == ["base", "section", "inputs"]
+    assert manifest["prefix"]["segments"] == 2
+    assert manifest["prefix"]["chars"] == len("You are an analyst.\n\nWrite about Acme.\n\n")
+    assert manifest["template_cache"] == {"hits": 0, "misses": 3}
+
+    _, manifest = loader.load(spec)
+    assert manifest["template_cache"] == {"hits": 3, "misses": 0}
+
+
+def test_load_memoizes_static_segments_across_calls(tmp_path):
+    _write(tmp_path / "base.md", "Base for {industry}.")
+    _write(tmp_path / "inputs.md", "{text}")
+    loader = _loader(tmp_path)
+    rendered = {}
+
+    def spec(text):
+        return {
+            "segments": [
+                {"name": "base", "template_path": "base.md", "variables": {"industry": "autos"}},
+                {"name": "inputs", "template_path": "inputs.md", "variables": {"text": text}, "scope": SCOPE_REQUEST},
+            ]
+        }
+
+    first, manifest = loader.load(spec("a"), rendered=rendered)
+    assert manifest["shared_segments"] == {"reused": 0}
+    second, manifest = loader.load(spec("b"), rendered=rendered)
+    assert manifest["shared_segments"] == {"reused": 1}
+    assert (first, second) == ("Base for autos.\n\na", "Base for autos.\n\nb")
+
+
+def test_load_fails_up_front_on_missing_variables(tmp_path):
+    _write(tmp_path / "a.md", "Hi {name}")
+    with pytest.raises(KeyError, match="missing variable 'name'"):
+        _loader(tmp_path).load({"segments": [{"name": "a", "template_path": "a.md"}]})
+    with pytest.raises(ValueError):
+        _loader(tmp_path).load({"segments": []})
+    with pytest.raises(ValueError):
+        _loader(tmp_path, cache_validation="never")
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+
+from prompt_lifecycle.engine.response_cache import ResponseCache
+
+
+def test_concurrent_identical_requests_call_the_model_once():
+    cache = ResponseCache()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "out"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_call("k", call) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == ["coalesced"] * 4 + ["miss"]
+    assert all(value == "out" for value, _ in results)
+
+
+def test_lookup_is_repeated_after_the_claim():
+    cache = ResponseCache()
+    cache.store("k", "stored")
+    lookup = cache._alookup
+    misses = []
+
+    async def racy_lookup(key):
+        # The first lookup runs just before the previous leader stored the value
+        if not misses:
+            misses.append(key)
+            return None, "miss"
+        return await lookup(key)
+
+    cache._alookup = racy_lookup
+
+    async def call():
+        raise AssertionError("must not call the model again")
+
+    assert asyncio.run(cache.aget_or_call("k", call)) == ("stored", "hit:memory")
+    assert cache._inflight == {}
+
+
+def test_cancelled_leader_hands_over_to_a_follower():
+    cache = ResponseCache()
+    calls = []
+
+    async def slow():
+        calls.append("leader")
+        await asyncio.sleep(10)
+        return "never"
+
+    async def fast():
+        calls.append("follower")
+        return "out"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.aget_or_call("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.aget_or_call("k", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == ("out", "miss")
+    assert calls == ["leader", "follower"]
+
+
+def test_cancelled_follower_does_not_fail_the_others():
+    cache = ResponseCache()
+
+    async def call():
+        await asyncio.sleep(0.02)
+        return "out"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.aget_or_call("k", call))
+        await asyncio.sleep(0)
+        quitter = asyncio.ensure_future(cache.aget_or_call("k", call))
+        stayer = asyncio.ensure_future(cache.aget_or_call("k", call))
+        await asyncio.sleep(0)
+        quitter.cancel()
+        return await leader, await stayer
+
+    assert asyncio.run(main()) == (("out", "miss"), ("out", "coalesced"))
+
+
+def test_leader_error_reaches_followers():
+    cache = ResponseCache()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_call("k", call) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_sqlite_runs_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    threads = []
+
+    def tracked(cache):
+        get, put = cache.disk.get, cache.disk.put
+
+        def tracking_get(key):
+            threads.append(threading.get_ident())
+            return get(key)
+
+        def tracking_put(key, value):
+            threads.append(threading.get_ident())
+            put(key, value)
+
+        cache.disk.get, cache.disk.put = tracking_get, tracking_put
+        return cache
+
+    async def call():
+        return "out"
+
+    async def main():
+        loop_thread = threading.get_ident()
+        first = tracked(ResponseCache(disk_path=path))
+        assert await first.aget_or_call("k", call) == ("out", "miss")
+        assert await first.aget_or_call("k", call) == ("out", "hit:memory")
+        first.disk.close()
+
+        second = tracked(ResponseCache(disk_path=path))  # cold memory: served from SQLite
+        assert await second.aget_or_call("k", call) == ("out", "hit:disk")
+        second.disk.close()
+        return loop_thread
+
+    loop_thread = asyncio.run(main())
+    assert len(threads) == 4  # miss: 2 gets (before / after the claim) + 1 put; then 1 get
+    assert loop_thread not in threads
@@ -0,0 +1,229 @@
+# tests for retry policies
+import asyncio
+
+import pytest
+
+from prompt_lifecycle.engine.llm_client import EchoTransport, LLMClient, ProviderError
+from prompt_lifecycle.engine.retry_policies import (
+    AIMDConcurrency,
+    BackoffPolicy,
+    RateLimiter,
+    RetryScheduler,
+    TokenBucket,
+    prometheus_lines,
+)
+
+
+def test_token_bucket_debt_and_non_blocking_take():
+    bucket = TokenBucket(rate_per_min=60, capacity=10)  # 1 token/s
+
+    assert bucket.reserve(4) == 0.0
+    assert bucket.try_take(6)
+    assert not bucket.try_take(1)  # empty: try_take never goes into debt
+    assert bucket.reserve(3) == pytest.approx(3.0, abs=0.05)  # reserve does, and says how long to wait
+    bucket.give_back(3)
+    assert bucket.available() == pytest.approx(0.0, abs=0.05)
+
+    bucket.give_back(100)
+    assert bucket.available() == 10  # capped at capacity
+    assert bucket.reserve(50) == 0.0  # amounts are capped at capacity too
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_rate_limiter_try_acquire_is_all_or_nothing():
+    limiter = RateLimiter(requests_per_min=10, tokens_per_min=100)
+    assert limiter.try_acquire(100)
+    assert not limiter.try_acquire(1)  # no tokens left: the request token is given back
+    assert limiter.snapshot()["requests_available"] == pytest.approx(9, abs=0.01)
+    assert RateLimiter().try_acquire(10**6)  # no limits configured
+
+
+def test_backoff_is_jittered_and_honours_retry_after():
+    backoff = BackoffPolicy(base_delay_s=1.0, max_delay_s=8.0, seed=7)
+    for attempt in range(1, 8):
+        assert 0 <= backoff.delay(attempt) <= min(8.0, 2 ** (attempt - 1))
+
+    assert backoff.delay(1, retry_after_s=5.0) >= 5.0  # a floor, above the jittered ceiling of 1s
+    assert backoff.delay(1, retry_after_s=60.0) == 8.0  # ... but never past max_delay_s
+
+
+def test_aimd_decreases_once_per_cooldown_and_grows_additively():
+    window = AIMDConcurrency(initial=16, minimum=2, maximum=20, cooldown_s=60)
+    window.on_congestion()
+    window.on_congestion()  # same burst of throttles: one decrease
+    assert window.limit == 8
+
+    window.cooldown_s = 0
+    for _ in range(5):
+        window.on_congestion()
+    assert window.limit == 2  # floored at minimum
+
+    for _ in range(2):
+        window.on_success()
+    assert window.limit == pytest.approx(2.9)  # 2 + 1/2 + 1/2.5: about +1 per `limit` successes
+    for _ in range(1000):
+        window.on_success()
+    assert window.limit == 20
+
+
+def test_aimd_window_bounds_concurrent_calls():
+    async def main():
+        window = AIMDConcurrency(initial=2, maximum=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            await window.acquire()
+            try:
+                peak = max(peak, window.in_flight)
+                await asyncio.sleep(0.01)
+            finally:
+                window.release()
+
+        await asyncio.gather(*(call() for _ in range(10)))
+        assert peak == 2
+        assert window.in_flight == 0
+
+    asyncio.run(main())
+
+
+def _scheduler(**kwargs):
+    kwargs.setdefault("backoff", BackoffPolicy(base_delay_s=0.001, max_delay_s=0.01, max_attempts=3, seed=1))
+    return RetryScheduler(**kwargs)
+
+
+def test_retries_throttles_then_gives_up_on_client_errors():
+    async def main():
+        scheduler = _scheduler(concurrency=AIMDConcurrency(initial=8, cooldown_s=0))
+        errors = [ProviderError(429, retry_after=0.001), ProviderError(503)]
+
+        async def flaky():
+            if errors:
+                raise errors.pop(0)
+            return "ok"
+
+        assert await scheduler.run(flaky) == "ok"
+        counters = scheduler.counters
+        assert (counters["attempts"], counters["retries"], counters["throttled"], counters["successes"]) == (3, 2, 1, 1)
+        assert scheduler.concurrency.limit < 8  # the 429 shrank the window
+
+        async def bad_request():
+            raise ProviderError(400)
+
+        with pytest.raises(ProviderError):
+            await scheduler.run(bad_request)
+        assert counters["failures"] == 1
+        assert counters["attempts"] == 4  # a 400 is not retried
+
+        async def always_throttled():
+            raise ProviderError(429)
+
+        with pytest.raises(ProviderError):
+            await scheduler.run(always_throttled)
+        assert counters["attempts"] == 7  # max_attempts
+        assert scheduler.concurrency.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_hedge_wins_when_the_first_copy_is_slow():
+    async def main():
+        scheduler = _scheduler(hedge_after_s=0.02)
+        delays = [1.0, 0.0]
+        cancelled = []
+
+        async def send():
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return f"slept {delay}"
+
+        assert await scheduler.run(send) == "slept 0.0"
+        assert (scheduler.counters["hedges"], scheduler.counters["hedge_wins"]) == (1, 1)
+        await asyncio.sleep(0)
+        assert cancelled == [1.0]  # the losing copy is cancelled
+        assert scheduler.concurrency.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_hedge_skipped_without_quota():
+    async def main():
+        limiter = RateLimiter(requests_per_min=1)
+        scheduler = _scheduler(limiter=limiter, hedge_after_s=0.01)
+
+        async def send():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        assert await scheduler.run(send) == "ok"  # the only request token went to the first copy
+        assert (scheduler.counters["hedges"], scheduler.counters["hedges_skipped"]) == (0, 1)
+        assert scheduler.concurrency.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_cancelling_the_caller_cancels_every_copy():
+    async def main():
+        scheduler = _scheduler(hedge_after_s=0.01)
+        started, cancelled = [], []
+
+        async def send():
+            started.append(1)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "never"
+
+        for wait_s in (0.005, 0.05):  # before the hedge starts / with both copies in flight
+            started.clear()
+            cancelled.clear()
+            task = asyncio.ensure_future(scheduler.run(send))
+            await asyncio.sleep(wait_s)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0)
+            assert started and len(cancelled) == len(started)
+            assert scheduler.concurrency.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_metrics_per_model_and_prometheus_lines():
+    config = {
+        "llm": {"model": "fast", "retry": {"enabled": True}},
+        "models_cfg": {
+            "models": {
+                "fast": {"limits": {"requests_per_min": 500}},
+                "large": {"limits": {"requests_per_min": 300, "tokens_per_min": 1000}},
+            }
+        },
+    }
+    client = LLMClient(config, transport=EchoTransport())
+    try:
+        assert client.run_sync(client.acall("hello")) == "hello"
+        metrics = client.metrics()
+        assert set(metrics) == {"fast", "large"}
+        assert (metrics["fast"]["successes"], metrics["large"]["successes"]) == (1, 0)
+        assert metrics["fast"]["tokens_available"] is None
+
+        lines = client.prometheus_lines("ns")
+        assert "# TYPE ns_llm_successes_total counter" in lines
+        assert 'ns_llm_successes_total{model="fast"} 1' in lines
+        assert 'ns_llm_successes_total{model="large"} 0' in lines
+        assert "# TYPE ns_llm_concurrency_limit gauge" in lines
+        assert "# TYPE ns_llm_limiter_wait_seconds_total counter" in lines
+        # series with no value (no tokens/min limit on "fast") are left out
+        assert [line for line in lines if line.startswith("ns_llm_tokens_available")] == ['ns_llm_tokens_available{model="large"} 1000.0']
+    finally:
+        client.close()
+
+    assert LLMClient({"llm": {}}, transport=EchoTransport()).metrics() == {}
+    assert prometheus_lines("ns", {}) == []
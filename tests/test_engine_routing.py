@@ -0,0 +1,59 @@
+# tests for routing
+import pytest
+
+from prompt_lifecycle.engine.runtime import Runtime
+
+
+@pytest.fixture
+def router(run_config):
+    runtime = Runtime(run_config(), use_bundle=False)
+    yield runtime.router
+    runtime.close()
+
+
+def _route(router, **overrides):
+    manifest = router.route("company_overview", overrides=overrides or None)["manifest"]
+    return manifest["industry"], manifest["sub_industry"], manifest["kpi_pack"], manifest["kpi_pack_source"]
+
+
+def test_partial_overrides(router):
+    assert _route(router) == ("ENERGY", "Commodity Traders", "ENERGY__Commodity_Traders", "industry+sub")
+    # industry alone: the section's sub_industry belonged to ENERGY, so the industry default applies
+    assert _route(router, industry="TECHNOLOGY") == ("TECHNOLOGY", None, "TECHNOLOGY__IT_Services_and_Software", "industry_default")
+    # sub_industry alone stays within the section's industry
+    assert _route(router, sub_industry="Commodity Traders", prompt_version="v2025_01_10")[:3] == (
+        "ENERGY",
+        "Commodity Traders",
+        "ENERGY__Commodity_Traders",
+    )
+    assert _route(router, industry="TECHNOLOGY", sub_industry="Hardware, Equipment, And Semiconductors")[2] == (
+        "TECHNOLOGY__Hardware_Equipment_and_Semiconductors"
+    )
+    # None means "not overridden"
+    assert _route(router, industry=None, sub_industry=None) == _route(router)
+    # the shared section config is never touched
+    assert router.sections_cfg["company_overview"]["sub_industry"] == "Commodity Traders"
+
+
+def test_override_errors(router):
+    with pytest.raises(ValueError, match="Unsupported route overrides: colour"):
+        router.route("company_overview", overrides={"colour": "red"})
+    with pytest.raises(ValueError, match="Unknown section"):
+        router.route("nope")
+
+
+def test_runtime_overrides_follow_the_same_rules(run_config):
+    for overrides in ({"industry": "TECHNOLOGY"}, {"sub_industry": "Commodity Traders"}, {"industry": "AUTOS", "kpi_pack": "AUTOS__OEM"}):
+        runtime = Runtime(run_config(), overrides={"section": "company_overview", **overrides}, use_bundle=False)
+        try:
+            baked = runtime.router.route("company_overview")["manifest"]
+        finally:
+            runtime.close()
+        runtime = Runtime(run_config(), use_bundle=False)
+        try:
+            assert baked == runtime.router.route("company_overview", overrides=overrides)["manifest"]
+        finally:
+            runtime.close()
+
+    with pytest.raises(ValueError, match="prompt_version 'v1' not defined"):
+        Runtime(run_config(), overrides={"section": "company_overview", "prompt_version": "v1"}, use_bundle=False)
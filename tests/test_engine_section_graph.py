@@ -0,0 +1,101 @@
+# tests for section dependency graphs (generate_all)
+import asyncio
+import time
+
+import pytest
+
+from prompt_lifecycle.engine.llm_client import ProviderError, Transport
+from prompt_lifecycle.engine.runtime import Runtime
+
+TITLES = {"# Financial Profile (": "financial_profile", "# Key Credit Considerations (": "key_credit_considerations"}
+
+
+def _section_of(prompt):
+    return next((section for title, section in TITLES.items() if title in prompt), "company_overview")
+
+
+class Timed(Transport):
+    """Answers "answer:<section>" after delay_s, recording when each section's call ran."""
+
+    def __init__(self, delay_s=0.05, fail=()):
+        self.delay_s = delay_s
+        self.fail = set(fail)
+        self.calls = {}
+
+    async def send(self, prompt_text, params):
+        section = _section_of(prompt_text)
+        started = time.perf_counter()
+        await asyncio.sleep(self.delay_s)
+        self.calls[section] = (started, time.perf_counter(), prompt_text)
+        if section in self.fail:
+            raise ProviderError(500, f"{section} failed")
+        return f"answer:{section}"
+
+
+@pytest.fixture
+def runtime(run_config):
+    runtime = Runtime(run_config(), use_bundle=False)
+    yield runtime
+    runtime.close()
+
+
+def test_graph_order_and_selection(runtime):
+    graph = runtime.section_graph()
+    assert list(graph) == ["company_overview", "financial_profile", "key_credit_considerations"]
+    assert graph["key_credit_considerations"] == ("company_overview", "financial_profile")
+    assert runtime.section_graph(["financial_profile"]) == {"financial_profile": ()}
+    # upstream sections are pulled in
+    assert list(runtime.section_graph(["key_credit_considerations"])) == list(graph)
+    with pytest.raises(ValueError, match="Unknown section 'nope'. Available sections: company_overview"):
+        runtime.section_graph(["nope"])
+
+
+@pytest.mark.parametrize(
+    "sections, error",
+    [
+        ({"financial_profile": {"depends_on": ["nope"]}}, "Section 'financial_profile' depends on unknown section\\(s\\): nope"),
+        (
+            {"company_overview": {"depends_on": "key_credit_considerations"}},
+            "Section dependency cycle: company_overview -> key_credit_considerations -> company_overview",
+        ),
+    ],
+)
+def test_bad_graphs_are_rejected(run_config, sections, error):
+    runtime = Runtime(run_config(sections=sections), use_bundle=False)
+    try:
+        with pytest.raises(ValueError, match=error):
+            runtime.section_graph()
+    finally:
+        runtime.close()
+
+
+def test_independent_sections_run_concurrently(runtime):
+    transport = runtime.llm.transport = Timed()
+    results = runtime.generate_all()
+    assert list(results) == ["company_overview", "financial_profile", "key_credit_considerations"]
+    assert {section: result["output"] for section, result in results.items()} == {s: f"answer:{s}" for s in results}
+
+    overview, financial, credit = (transport.calls[s] for s in results)
+    assert financial[0] < overview[1] and overview[0] < financial[1]  # overlapped
+    assert credit[0] >= max(overview[1], financial[1])  # waited for both upstream sections
+
+    # upstream outputs reach the dependent section's prompt, and only that one
+    assert "answer:company_overview" in credit[2] and "answer:financial_profile" in credit[2]
+    assert "Sections already written for this issuer" not in overview[2]
+    manifest = results["key_credit_considerations"]["manifest"]
+    assert manifest["graph"] == {"depends_on": ["company_overview", "financial_profile"]}
+    # static segments shared with the first section are rendered once
+    assert manifest["shared_segments"]["reused"]
+
+
+def test_failures_propagate_downstream_only(runtime):
+    runtime.llm.transport = Timed(delay_s=0, fail={"financial_profile"})
+    results = runtime.generate_all()
+    assert results["company_overview"]["output"] == "answer:company_overview"
+    assert isinstance(results["financial_profile"], ProviderError)
+    assert isinstance(results["key_credit_considerations"], ProviderError)  # its upstream failed
+
+    # a subset only runs what it needs
+    transport = runtime.llm.transport = Timed(delay_s=0)
+    assert list(runtime.generate_all(["financial_profile"])) == ["financial_profile"]
+    assert list(transport.calls) == ["financial_profile"]
@@ -0,0 +1,132 @@
+# tests for the generation server
+import asyncio
+import json
+import os
+import threading
+
+from prompt_lifecycle.engine.mock_provider import MockProvider
+from prompt_lifecycle.engine.runtime import Runtime
+from prompt_lifecycle.engine.server import GenerationServer
+
+REQUEST = {"section": "company_overview", "inputs": "Acme trades crude oil and refined products in 30 countries."}
+
+
+async def _request(port, method, path, body=None, content_length=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body).encode("utf-8")
+    length = len(data) if content_length is None else content_length
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {length}\r\n\r\n".encode("latin-1") + data)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    payload = json.loads(await reader.readexactly(int(headers["content-length"])))
+    writer.close()
+    return int(status_line.split()[1]), payload
+
+
+def _touch_later(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_concurrent_generate_and_hot_reload(run_config):
+    async def main():
+        async with MockProvider(latency_ms=20, jitter_ms=0) as provider:
+            runtime = Runtime(run_config(llm={"transport": "http", "url": provider.url}), use_bundle=False, pin_templates=True)
+            render_threads = set()
+            render = runtime._render
+
+            def tracking_render(*args, **kwargs):
+                render_threads.add(threading.get_ident())
+                return render(*args, **kwargs)
+
+            runtime._render = tracking_render
+            try:
+                async with GenerationServer(runtime, port=0, watch_interval_s=0.02) as server:
+                    calls = [_request(server.port, "POST", "/generate", REQUEST) for _ in range(8)]
+                    *generated, health = await asyncio.gather(*calls, _request(server.port, "GET", "/health"))
+
+                    assert health[0] == 200
+                    for status, payload in generated:
+                        assert status == 200
+                        assert "Company Overview (v2025_02_15)" in payload["output"]  # the mock echoes the prompt
+                        assert "Acme trades crude oil" in payload["output"]
+                    # rendering never ran on the server's event loop
+                    assert render_threads and threading.get_ident() not in render_threads
+                    assert provider.stats["ok"] == 8
+
+                    template = run_config.prompts_dir / "company_overview" / "prompt_v2025_02_15.md"
+                    template.write_text(template.read_text(encoding="utf-8") + "\nRELOAD-MARKER\n", encoding="utf-8")
+                    _touch_later(template)
+                    for _ in range(250):
+                        _, health = await _request(server.port, "GET", "/health")
+                        if health["reload"]["reloads"]:
+                            break
+                        await asyncio.sleep(0.02)
+                    assert health["reload"]["reloads"] == 1
+                    assert health["snapshot"]["version"] == 2
+
+                    status, payload = await _request(server.port, "POST", "/generate", REQUEST)
+                    assert status == 200
+                    assert "RELOAD-MARKER" in payload["output"]
+
+                    status, payload = await _request(server.port, "POST", "/reload")
+                    assert status == 200
+                    assert payload["reloaded"] is True
+                    assert payload["snapshot"]["version"] == 3
+            finally:
+                runtime.close()
+
+    asyncio.run(main())
+
+
+def test_broken_reload_keeps_serving(run_config):
+    async def main():
+        runtime = Runtime(run_config(), use_bundle=False, pin_templates=True)
+        try:
+            async with GenerationServer(runtime, port=0, watch_interval_s=0) as server:
+                os.remove(run_config.prompts_dir / "company_overview" / "prompt_v2025_02_15.md")
+                status, payload = await _request(server.port, "POST", "/reload")
+                assert status == 200
+                assert payload["reloaded"] is False
+                assert payload["last_error"].startswith("FileNotFoundError")
+
+                # the pinned snapshot still has the deleted template
+                status, payload = await _request(server.port, "POST", "/prompt", REQUEST)
+                assert status == 200
+                assert "Company Overview (v2025_02_15)" in payload["prompt"]
+        finally:
+            runtime.close()
+
+    asyncio.run(main())
+
+
+def test_request_errors(run_config):
+    async def main():
+        runtime = Runtime(run_config(), use_bundle=False)
+        try:
+            async with GenerationServer(runtime, port=0, watch_interval_s=0, max_body_bytes=1024) as server:
+                port = server.port
+                assert (await _request(port, "POST", "/nope", {}))[0] == 404
+                assert (await _request(port, "GET", "/generate"))[0] == 405
+                assert (await _request(port, "POST", "/prompt", {"inputs": "x"}))[0] == 400
+                assert (await _request(port, "POST", "/prompt", {"section": "nope"}))[0] == 400
+                assert (await _request(port, "POST", "/prompt", dict(REQUEST, inputs="x" * 2000)))[0] == 413
+                assert (await _request(port, "POST", "/prompt", REQUEST, content_length="abc"))[0] == 400
+
+                status, payload = await _request(
+                    port, "POST", "/manifest", dict(REQUEST, overrides={"prompt_version": "v2025_01_10"})
+                )
+                assert status == 200
+                assert payload["manifest"]["router_manifest"]["prompt_version"] == "v2025_01_10"
+        finally:
+            runtime.close()
+
+    asyncio.run(main())
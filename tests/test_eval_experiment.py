@@ -0,0 +1,60 @@
+from collections import Counter
+
+import pytest
+
+from prompt_lifecycle.eval.experiment import SequentialSignTest, judge_order
+
+
+def test_clear_winner_is_decided_better():
+    test = SequentialSignTest(min_pairs=5)
+    decisions = [test.add(1.0) for _ in range(30)]
+    assert test.decision == "better"
+    assert decisions.index("better") + 1 == test.decided_at < 30
+
+
+def test_clear_loser_is_decided_worse():
+    test = SequentialSignTest(min_pairs=5)
+    for _ in range(30):
+        test.add(-0.5)
+    assert test.decision == "worse"
+
+
+def test_balanced_outcomes_are_no_difference():
+    test = SequentialSignTest(min_pairs=5)
+    for i in range(200):
+        test.add(1.0 if i % 2 else -1.0)
+        if test.decision:
+            break
+    assert test.decision == "no_difference"
+
+
+def test_no_decision_before_min_pairs_and_ties_carry_no_evidence():
+    test = SequentialSignTest(min_pairs=50)
+    for _ in range(49):
+        assert test.add(1.0) is None
+    ties = SequentialSignTest(min_pairs=1)
+    for _ in range(100):
+        ties.add(0.0)
+    assert ties.decision is None
+    assert ties.llr() == (0.0, 0.0)
+
+
+def test_decision_is_final():
+    test = SequentialSignTest(min_pairs=1)
+    while test.decision is None:
+        test.add(1.0)
+    for _ in range(100):
+        assert test.add(-1.0) == "better"
+
+
+def test_min_effect_must_be_below_half():
+    with pytest.raises(ValueError):
+        SequentialSignTest(min_effect=0.5)
+
+
+def test_judge_order_is_reproducible_and_spreads_positions():
+    versions = ["v2025_01_10", "v2025_02_15"]
+    assert judge_order("case-1", versions) == judge_order("case-1", versions)
+    first = Counter(judge_order(f"case-{i}", versions)[0] for i in range(400))
+    assert 150 < first["v2025_01_10"] < 250
+    assert sorted(judge_order("case-1", versions)) == sorted(versions)
@@ -1 +1,120 @@
 # tests for KPI eval
+import pytest
+
+from prompt_lifecycle.eval.kpi_eval import KPIMatcher, corpus_kpi_report, evaluate_kpis, kpi_terms
+
+REGISTRY = {
+    "revenue": {"label": "Revenue"},
+    "revenue_growth_yoy": {"label": "Revenue growth (YoY)"},
+    "capex": {"label": "Capital expenditures (CapEx)"},
+    "free_cash_flow": {"label": "Free cash flow (FCF)"},
+    "ebitda_margin": {"label": "EBITDA margin"},
+}
+
+
+def test_kpi_terms_include_label_parts():
+    assert kpi_terms("free_cash_flow", REGISTRY) == [
+        "free_cash_flow",
+        "free cash flow",
+        "free cash flow (fcf)",
+        "fcf",
+    ]
+
+
+def test_longest_term_wins():
+    matcher = KPIMatcher(REGISTRY)
+    assert matcher.mentioned("Revenue growth (YoY) was 12%.") == ["revenue_growth_yoy"]
+    assert matcher.mentioned("Revenue rose; revenue growth (yoy) slowed.") == ["revenue", "revenue_growth_yoy"]
+
+    spans = list(matcher.finditer("Revenue growth (YoY) of 12%"))
+    assert spans == [(matcher.column["revenue_growth_yoy"], 0, len("revenue growth (yoy)"))]
+
+
+def test_terms_match_on_word_boundaries():
+    matcher = KPIMatcher(REGISTRY)
+    assert matcher.mentioned("capex_intensity rose to 9%") == []
+    assert matcher.mentioned("prerevenue stage, fcfs unknown") == []
+    assert matcher.mentioned("CapEx of $3.1B; FCF positive") == ["capex", "free_cash_flow"]
+
+
+def test_claim_numbers_ignore_evidence_notes():
+    matcher = KPIMatcher(REGISTRY)
+    text = (
+        "**Company Overview**\n"
+        "- Revenue of $1,200M and CapEx of 90 **Evidence:** 10-K 2023 p.45\n"
+        "- Operates in 14 countries **Evidence:** annual report\n"
+        "- EBITDA margin stable **Evidence:** 18% per Q4 call\n"
+    )
+    found = matcher.claim_numbers(text)
+    assert found == {
+        matcher.column["revenue"]: {"1200", "90"},
+        matcher.column["capex"]: {"1200", "90"},
+    }
+
+
+def test_evaluate_kpis_checks():
+    matcher = KPIMatcher(REGISTRY)
+    output = "- Revenue of 1,200 **Evidence:** 10-K\n- FCF of 75 **Evidence:** 10-K\n"
+    inputs = "Revenue was 1,200. Capital expenditures were 90."
+    result = evaluate_kpis(output, ["revenue", "capex"], matcher, expected_kpis=["revenue", "capex"], inputs_text=inputs)
+
+    assert result["mentioned"] == ["revenue", "free_cash_flow"]  # registry (column) order
+    assert result["checks"] == {
+        "kpis_in_pack": False,
+        "kpis_supported": False,
+        "numbers_supported": False,
+        "kpis_expected": False,
+    }
+    assert result["scores"] == {
+        "kpis_mentioned": 2,
+        "kpi_coverage": 0.5,
+        "kpi_recall": 0.5,
+        "kpi_precision": 0.5,
+    }
+    assert "KPI 'free_cash_flow' states figures not in the materials: 75" in result["failures"]
+
+
+def test_corpus_report_agrees_with_evaluate_kpis():
+    pytest.importorskip("numpy")
+    matcher = KPIMatcher(REGISTRY)
+    outputs = [
+        "- Revenue of 1,200 **Evidence:** 10-K",
+        "- Revenue of 1,300 and CapEx of 90 **Evidence:** 10-K",
+        "- FCF of 75 **Evidence:** 10-K",
+        "- No KPIs here **Evidence:** 10-K",
+        "- EBITDA margin of 18% **Evidence:** Q4 call",
+    ]
+    packs = [
+        ["revenue", "capex"],
+        ["revenue", "capex"],
+        ["revenue"],
+        ["revenue"],
+        ["ebitda_margin", "revenue"],
+    ]
+    inputs = [
+        "Revenue was 1,200. Capital expenditures were 90.",
+        "Revenue was 1,200. CapEx 90.",
+        "Revenue was 1,200.",
+        "Revenue was 1,200.",
+        "EBITDA margin of 18%.",
+    ]
+    report = corpus_kpi_report(matcher, outputs, packs, inputs)
+    per_output = [evaluate_kpis(o, p, matcher, inputs_text=i) for o, p, i in zip(outputs, packs, inputs)]
+
+    def rate(values):
+        return round(sum(values) / len(values), 4)
+
+    rates = report["rates"]
+    assert rates["pack_compliance"] == rate([r["checks"]["kpis_in_pack"] for r in per_output])
+    assert rates["hallucinated_kpi"] == rate([not r["checks"]["kpis_supported"] for r in per_output])
+    assert rates["invented_number"] == rate([not r["checks"]["numbers_supported"] for r in per_output])
+    assert rates["coverage"] == rate([r["scores"]["kpi_coverage"] for r in per_output if "kpi_coverage" in r["scores"]])
+    assert report["per_kpi"]["off_pack"] == {"free_cash_flow": 1}
+    # 1,300 shares a claim with CapEx, so both are charged with it
+    assert report["per_kpi"]["invented_number"] == {"capex": 1, "free_cash_flow": 1, "revenue": 1}
+
+
+def test_corpus_report_rejects_mismatched_lengths():
+    pytest.importorskip("numpy")
+    with pytest.raises(ValueError):
+        corpus_kpi_report(KPIMatcher(REGISTRY), ["a", "b"], [["revenue"]])
@@ -0,0 +1,98 @@
+# tests for the LLM judge
+import json
+import re
+
+from prompt_lifecycle.engine.llm_client import ProviderError, Transport
+from prompt_lifecycle.engine.runtime import Runtime
+from prompt_lifecycle.eval.llm_judge import JudgeCandidate, LLMJudge
+
+SCORES = {"faithfulness": 5, "coverage": 4, "kpi_usage": 3, "format": 4}
+
+
+class ScriptedJudge(Transport):
+    """Scores every candidate it is shown; candidates whose output says BAD-JSON / FAIL break their call."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def send(self, prompt_text, params):
+        self.prompts.append(prompt_text)
+        if "FAIL" in prompt_text:
+            raise ProviderError(400, "bad request")
+        count = int(re.search(r"## Candidates \((\d+)\)", prompt_text).group(1))
+        if count > 1 and "BAD-JSON" in prompt_text:
+            return "Sorry, here are my thoughts instead of JSON."
+        verdicts = [{"candidate": f"c{i}", "scores": SCORES, "rationale": "ok"} for i in range(1, count + 1)]
+        return "```json\n" + json.dumps({"verdicts": verdicts}) + "\n```"
+
+
+def _judge(run_config):
+    runtime = Runtime(run_config(), use_bundle=False)
+    transport = ScriptedJudge()
+    runtime.llm.transport = transport
+    return runtime, LLMJudge(runtime), transport
+
+
+def _candidate(case_id, label, output, inputs="Acme refines crude oil."):
+    return JudgeCandidate(case_id, label, "company_overview", inputs, output)
+
+
+def test_batches_candidates_per_case_and_caches_verdicts(run_config):
+    runtime, judge, transport = _judge(run_config)
+    try:
+        candidates = [
+            _candidate("1", "a", "Acme is a refiner."),
+            _candidate("1", "b", "Acme refines crude."),
+            _candidate("2", "a", "Beta makes cars.", inputs="Beta builds cars."),
+        ]
+        verdicts, stats = judge.judge(candidates)
+        assert (stats["judge_calls"], stats["batched"], stats["single"], stats["errors"]) == (2, 2, 1, 0)
+        assert [v["source"] for v in verdicts] == ["batch", "batch", "single"]
+        assert verdicts[0]["scores"] == SCORES
+        assert verdicts[0]["overall"] == 4.0
+        assert "Acme is a refiner." in transport.prompts[0] and "Acme refines crude." in transport.prompts[0]
+        assert "## Candidates (2)" in transport.prompts[0]
+
+        # Same outputs under another label: judged once, served from the verdict store
+        again, stats = judge.judge([c._replace(label="c") for c in candidates])
+        assert (stats["cached"], stats["judge_calls"]) == (3, 0)
+        assert [v["source"] for v in again] == ["cache"] * 3
+        assert again[2]["scores"] == SCORES
+    finally:
+        judge.close()
+        runtime.close()
+
+
+def test_unparseable_batch_falls_back_to_single_calls(run_config):
+    runtime, judge, _ = _judge(run_config)
+    try:
+        candidates = [_candidate("1", "a", "Acme is a refiner."), _candidate("1", "b", "BAD-JSON Acme refines.")]
+        verdicts, stats = judge.judge(candidates)
+        assert (stats["fallback_batches"], stats["single"], stats["judge_calls"]) == (1, 2, 3)
+        assert [v["source"] for v in verdicts] == ["single", "single"]
+        assert all(v["scores"] == SCORES for v in verdicts)
+    finally:
+        judge.close()
+        runtime.close()
+
+
+def test_provider_errors_only_fail_their_candidates(run_config):
+    runtime, judge, _ = _judge(run_config)
+    try:
+        candidates = [
+            _candidate("1", "a", "Acme is a refiner."),
+            _candidate("1", "b", "FAIL"),
+            _candidate("2", "a", "FAIL", inputs="Beta builds cars."),
+            _candidate("3", "a", "Gamma mines copper.", inputs="Gamma mines copper."),
+        ]
+        verdicts, stats = judge.judge(candidates)
+        assert stats["errors"] == 3
+        assert [v["error"].startswith("judge call failed: ProviderError") for v in verdicts[:3]] == [True] * 3
+        assert verdicts[3]["scores"] == SCORES
+
+        # Failures are not stored: the next run judges them again
+        _, stats = judge.judge(candidates)
+        assert (stats["cached"], stats["errors"]) == (1, 3)
+    finally:
+        judge.close()
+        runtime.close()
@@ -0,0 +1,166 @@
+# tests for the eval runner
+import json
+import os
+import shutil
+
+import pytest
+
+from prompt_lifecycle.eval import run_tests
+from prompt_lifecycle.eval.result_store import ResultStore, eval_key, scorer_fingerprint
+from prompt_lifecycle.eval.run_tests import EvalRunner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET = os.path.join(ROOT, "src", "prompt_lifecycle", "eval", "datasets", "company_overview.jsonl")
+
+
+def _run(config, tmp_path, resume=True, **kwargs):
+    dataset = tmp_path / "dataset.jsonl"
+    if not dataset.exists():
+        shutil.copy(DATASET, dataset)
+    output = tmp_path / "results.jsonl"
+    summary = EvalRunner(config, str(dataset), str(output), workers=1, chunk_size=3, **kwargs).run(resume=resume)
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    return summary, rows
+
+
+def _rerun_ids(rows):
+    return sorted(row["id"] for row in rows if not row.get("reused"))
+
+
+def _append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _without_run(summary):
+    """The aggregates, minus run info and timings."""
+    summary = {key: value for key, value in summary.items() if key != "run"}
+    summary["scores"] = {name: stats for name, stats in summary["scores"].items() if name != "latency_ms"}
+    return summary
+
+
+def test_interrupted_run_resumes_from_the_checkpoint(run_config, tmp_path, monkeypatch):
+    config = run_config()
+    (tmp_path / "fresh").mkdir()
+    (tmp_path / "resumed").mkdir()
+    fresh, fresh_rows = _run(config, tmp_path / "fresh", use_store=False)
+    assert fresh["run"]["chunks_total"] == 3  # 8 cases, chunks of 3
+
+    run_chunk = run_tests._run_chunk
+
+    def crash_on_second_chunk(chunk, *args):
+        if chunk[0] == 1:
+            raise KeyboardInterrupt
+        return run_chunk(chunk, *args)
+
+    monkeypatch.setattr(run_tests, "_run_chunk", crash_on_second_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        _run(config, tmp_path / "resumed", use_store=False)
+    output = tmp_path / "resumed" / "results.jsonl"
+    checkpoint = json.loads((tmp_path / "resumed" / "results.jsonl.checkpoint.json").read_text(encoding="utf-8"))
+    assert (checkpoint["done"], checkpoint["complete"]) == ([0], False)
+    assert checkpoint["output_bytes"] == output.stat().st_size
+    # a chunk half-written after the last checkpoint
+    _append(output, '{"id": "partial"')
+
+    monkeypatch.setattr(run_tests, "_run_chunk", run_chunk)
+    resumed, rows = _run(config, tmp_path / "resumed", use_store=False)
+    assert (resumed["run"]["chunks_resumed"], resumed["run"]["chunks_total"]) == (1, 3)
+    assert [row["id"] for row in rows] == [row["id"] for row in fresh_rows]  # nothing lost or duplicated
+    assert _without_run(resumed) == _without_run(fresh)  # aggregates carried over
+
+    # a completed run is not resumed
+    again, _ = _run(config, tmp_path / "resumed", use_store=False)
+    assert again["run"]["chunks_resumed"] == 0 and _without_run(again) == _without_run(fresh)
+
+
+def test_stale_checkpoints_are_rejected(run_config, tmp_path):
+    config = run_config()
+    _run(config, tmp_path, use_store=False)
+    checkpoint = tmp_path / "results.jsonl.checkpoint.json"
+    state = json.loads(checkpoint.read_text(encoding="utf-8"))
+    checkpoint.write_text(json.dumps(dict(state, complete=False, version=0)), encoding="utf-8")
+    with pytest.raises(ValueError, match="Unsupported eval checkpoint version"):
+        _run(config, tmp_path, use_store=False)
+
+    checkpoint.write_text(json.dumps(dict(state, complete=False)), encoding="utf-8")
+    _append(tmp_path / "dataset.jsonl", "\n")
+    with pytest.raises(ValueError, match="Dataset changed since checkpoint"):
+        _run(config, tmp_path, use_store=False)
+    summary, rows = _run(config, tmp_path, use_store=False, resume=False)
+    assert summary["run"]["chunks_resumed"] == 0 and len(rows) == 8
+
+
+def test_result_store_round_trip(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    try:
+        assert store.get("k") is None
+        store.put("k", {"passed": True, "scores": {"kpi_coverage": 0.5}, "output": "ünïcode"})
+        assert store.get("k") == {"passed": True, "scores": {"kpi_coverage": 0.5}, "output": "ünïcode"}
+    finally:
+        store.close()
+    assert ResultStore.from_config({}) is None
+    assert ResultStore.from_config({"eval": {}}, path=str(tmp_path / "other.sqlite")) is not None
+
+
+def test_eval_key_covers_prompt_scorer_and_scoring_inputs():
+    case = {"id": "a", "inputs": "x", "expected": {"must_include": ["ARR"]}, "output": "ARR up"}
+    scorer = scorer_fingerprint({"arr": {"label": "ARR"}})
+    base = eval_key("prompt", scorer, "company_overview", case)
+
+    assert eval_key("prompt", scorer, "company_overview", dict(case, id="b", inputs="ignored")) == base
+    variants = [
+        eval_key("other prompt", scorer, "company_overview", case),
+        eval_key("prompt", scorer_fingerprint({}), "company_overview", case),
+        eval_key("prompt", scorer, "financial_profile", case),
+        eval_key("prompt", scorer, "company_overview", dict(case, expected={})),
+        eval_key("prompt", scorer, "company_overview", dict(case, output="ARR down")),
+    ]
+    assert len(set(variants + [base])) == len(variants) + 1
+
+
+def test_template_edits_rerun_only_affected_cases(run_config, tmp_path):
+    config = run_config()
+    summary, rows = _run(config, tmp_path)
+    assert (summary["run"]["reused"], summary["run"]["evaluated"]) == (0, 8)
+    errored = [row["id"] for row in rows if "error" in row]
+    assert errored == ["unknown-pack-error"]
+
+    # Nothing changed: every case is reused except the errored one (errors are not stored)
+    _, rows = _run(config, tmp_path)
+    assert _rerun_ids(rows) == errored
+    reused = [row for row in rows if row.get("reused")]
+    assert all("passed" in row and "eval_key" in row for row in reused)
+
+    # One prompt version's template: only the case pinned to that version
+    _append(run_config.prompts_dir / "company_overview" / "prompt_v2025_01_10.md", "\nBe brief.\n")
+    _, rows = _run(config, tmp_path)
+    assert _rerun_ids(rows) == sorted(errored + ["tech-saas-unsupported-kpi"])
+
+    # kpi_pack.md is in every routed prompt: every case that renders is re-run ...
+    _append(run_config.prompts_dir / "kpi_pack.md", "\nCite the period of every KPI.\n")
+    _, rows = _run(config, tmp_path)
+    assert _rerun_ids(rows) == sorted(row["id"] for row in rows)
+    # ... once
+    _, rows = _run(config, tmp_path)
+    assert _rerun_ids(rows) == errored
+
+
+def test_model_changes_rerun_cases(run_config, tmp_path):
+    _run(run_config(), tmp_path)
+    all_ids = sorted(json.loads(line)["id"] for line in open(DATASET, encoding="utf-8"))
+
+    # Routing on: the answer may come from any model of the cascade
+    routed = run_config(llm={"routing": {"enabled": True, "cascade": ["fast", "large"]}})
+    _, rows = _run(routed, tmp_path)
+    assert _rerun_ids(rows) == all_ids
+    _, rows = _run(routed, tmp_path)
+    assert _rerun_ids(rows) == ["unknown-pack-error"]
+
+    _, rows = _run(run_config(llm={"routing": {"enabled": True, "cascade": ["large"]}}), tmp_path)
+    assert _rerun_ids(rows) == all_ids
+    # Routing off again: answered by llm.model alone
+    _, rows = _run(run_config(llm={"model": "large", "routing": {"enabled": False}}), tmp_path)
+    assert _rerun_ids(rows) == all_ids
+    _, rows = _run(run_config(llm={"model": "fast"}), tmp_path)
+    assert _rerun_ids(rows) == ["unknown-pack-error"]  # the first run's results
@@ -1 +1,101 @@
 # tests for schema
+import json
+
+import pytest
+
+from prompt_lifecycle.schemas import CompanyOverviewOutput, SchemaValidationError
+from prompt_lifecycle.utils.json_utils import JSONParseError, parse_model_json, repair_json
+
+
+def _doc(n=8, heading="Company Overview"):
+    return {
+        "heading": heading,
+        "bullets": [{"text": f"Fact {i}", "evidence": f"10-K p.{i}"} for i in range(n)],
+    }
+
+
+def test_clean_json_needs_no_repairs():
+    doc, repairs = parse_model_json(json.dumps(_doc()))
+    assert doc == _doc()
+    assert repairs == ()
+
+
+def test_fenced_json_with_surrounding_prose():
+    text = "Here you go:\n```json\n" + json.dumps(_doc()) + "\n```\nLet me know!"
+    doc, repairs = parse_model_json(text)
+    assert doc == _doc()
+    assert repairs == ("code_fence",)
+
+    # prose outside an unfenced object
+    doc, repairs = parse_model_json("Sure: " + json.dumps(_doc()) + " Done.")
+    assert doc == _doc()
+    assert repairs == ("surrounding_text",)
+
+
+def test_trailing_commas_are_removed():
+    doc, repairs = parse_model_json('{"a": [1, 2, ], "b": {"c": 3,\n},}')
+    assert doc == {"a": [1, 2], "b": {"c": 3}}
+    assert repairs == ("trailing_comma",)
+
+
+def test_commas_inside_strings_are_kept():
+    text = '{"a": "x,}", "b": "y, ]", "c": [1,],}'
+    fixed, repairs = repair_json(text)
+    assert fixed == '{"a": "x,}", "b": "y, ]", "c": [1]}'
+    assert repairs == ("trailing_comma",)
+
+    # nothing outside the strings to fix: the text is untouched
+    assert repair_json('{"a": "x,}"}') == ('{"a": "x,}"}', ())
+
+
+def test_escaped_quotes_do_not_end_strings():
+    text = r'{"a": "say \"hi,\" ]", "b": "back\\", "c": [1,],}'
+    doc, repairs = parse_model_json(text)
+    assert doc == {"a": 'say "hi," ]', "b": "back\\", "c": [1]}
+    assert repairs == ("trailing_comma",)
+
+
+def test_unrepairable_json_raises():
+    with pytest.raises(JSONParseError):
+        parse_model_json('{"a": 1')
+    with pytest.raises(JSONParseError):
+        parse_model_json('{"a": 1,}', repair=False)
+
+
+def test_validator_accepts_valid_output():
+    validator = CompanyOverviewOutput.validator()
+    assert validator.errors(_doc()) is None
+    assert validator.validate_json("```json\n" + json.dumps(_doc(12)) + "\n```") is None
+
+
+def test_validator_error_messages():
+    validator = CompanyOverviewOutput.validator()
+
+    assert validator.errors([]) == ["expected an object, got list"]
+    assert validator.errors({"heading": "Company Overview"}) == ["bullets must be a list"]
+    assert validator.errors(_doc(3, heading="Overview")) == [
+        "heading must be 'Company Overview', got 'Overview'",
+        "expected 8-12 bullets, got 3",
+    ]
+
+    doc = _doc()
+    doc["bullets"][1]["evidence"] = "  "
+    doc["bullets"][2] = {"evidence": "x"}
+    assert validator.errors(doc) == [
+        "bullets[1].evidence is required",
+        "bullets[2].text must be a string",
+        "expected 8-12 bullets, got 7",
+    ]
+
+    errors = validator.validate_json('{"heading": ')
+    assert len(errors) == 1 and errors[0].startswith("invalid JSON: ")
+
+
+def test_from_dict_errors_match_validator():
+    doc = _doc(13)
+    with pytest.raises(SchemaValidationError) as info:
+        CompanyOverviewOutput.from_dict(doc)
+    assert info.value.errors == CompanyOverviewOutput.validator().errors(doc)
+
+    obj = CompanyOverviewOutput.from_json(json.dumps(_doc()))
+    assert obj.to_dict() == _doc()
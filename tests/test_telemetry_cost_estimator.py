@@ -0,0 +1,100 @@
+# tests for token counting, pricing and the token budget
+import pytest
+
+from prompt_lifecycle.engine.runtime import Runtime
+from prompt_lifecycle.telemetry.cost_estimator import TRUNCATION_MARKER, CostEstimator, TokenBudget, approx_tokens
+
+MODELS_CFG = {
+    "default_model": "fast",
+    "models": {
+        "fast": {
+            "context_window_tokens": 8000,
+            "max_output_tokens": 1000,
+            "pricing": {"input_per_1k_tokens": 0.5, "output_per_1k_tokens": 1.5},
+        }
+    },
+}
+
+
+def _lines(n, word="revenue"):
+    return "\n".join(f"Line {i}: {word} grew by {i}% year over year." for i in range(n))
+
+
+def test_approx_tokens():
+    assert approx_tokens("") == 0
+    assert approx_tokens("one two three") == 3
+    assert approx_tokens("Hello, world!") == 4
+    assert approx_tokens("é") == 3  # one word + one per non-ASCII byte
+    # long words split into several pieces
+    assert approx_tokens("internationalization") > 1
+    prose = _lines(100)
+    assert 0.9 < approx_tokens(prose * 2) / (2 * approx_tokens(prose)) < 1.1
+
+
+def test_pricing_and_default_limit():
+    estimate = CostEstimator.from_config({"models_cfg": MODELS_CFG}).estimate(2000, 1000)
+    assert (estimate["model"], estimate["input_usd"], estimate["output_usd"], estimate["total_usd"]) == ("fast", 1.0, 1.5, 2.5)
+
+    assert TokenBudget.from_config({"models_cfg": MODELS_CFG}).max_input_tokens == 7000
+    assert TokenBudget.from_config({"models_cfg": MODELS_CFG, "budget": {"max_input_tokens": 50}}).max_input_tokens == 50
+    assert TokenBudget.from_config({}).max_input_tokens is None
+
+
+def test_under_budget_is_untouched():
+    texts = ["system prompt", _lines(10)]
+    out, tokens, trimmed = TokenBudget(10_000).apply(["base", "inputs"], ["static", "request"], texts)
+    assert (out, trimmed) == (texts, [])
+    assert tokens == [approx_tokens(t) for t in texts]
+    # no limit at all
+    assert TokenBudget(None).apply(["inputs"], ["request"], [_lines(1000)])[2] == []
+
+
+def test_request_segments_are_truncated_at_a_line_boundary():
+    inputs = _lines(200)
+    texts = ["Summarize the issuer.", inputs, "Output format: markdown."]
+    names, scopes = ["base", "inputs", "output"], ["static", "request", "static"]
+    limit = sum(approx_tokens(t) for t in texts) // 2
+
+    out, tokens, trimmed = TokenBudget(limit).apply(names, scopes, texts)
+    assert sum(tokens) <= limit
+    assert tokens == [approx_tokens(t) for t in out]
+    assert out[0] == texts[0] and out[2] == texts[2]
+    assert out[1].endswith(TRUNCATION_MARKER)
+    head = out[1][: -len(TRUNCATION_MARKER)]
+    assert inputs.startswith(head) and inputs[len(head)] == "\n"  # whole lines kept
+    assert trimmed == [{"name": "inputs", "action": "truncated", "tokens_before": approx_tokens(inputs), "tokens_after": tokens[1]}]
+
+
+def test_trim_order_and_prefix_patterns():
+    texts = ["base", _lines(50, "margin"), _lines(50, "capex"), _lines(50)]
+    names = ["base", "industry:ENERGY", "industry:ENERGY__Traders", "inputs"]
+    scopes = ["static", "static", "static", "request"]
+    budget = TokenBudget(approx_tokens(texts[3]) + 10, trim_order=["industry:", "inputs"])
+
+    out, tokens, trimmed = budget.apply(names, scopes, texts)
+    # static segments are dropped whole, in trim_order, until the prompt fits
+    assert [t["name"] for t in trimmed] == ["industry:ENERGY", "industry:ENERGY__Traders"]
+    assert {t["action"] for t in trimmed} == {"dropped"}
+    assert out[1] is None and out[2] is None and tokens[1:3] == [0, 0]
+    assert out[3] == texts[3]  # already fits: inputs untouched
+
+
+def test_over_budget_after_trimming_raises():
+    texts = [_lines(50), _lines(50)]
+    with pytest.raises(ValueError, match="over the budget of 10 even after trimming \\(inputs\\)"):
+        TokenBudget(10).apply(["base", "inputs"], ["static", "request"], texts)
+    with pytest.raises(ValueError, match="nothing trimmable"):
+        TokenBudget(10, trim_order=()).apply(["inputs"], ["request"], texts[:1])
+
+
+def test_runtime_trims_inputs_into_the_budget(run_config):
+    inputs = {"annual_report": _lines(2000)}
+    runtime = Runtime(run_config(evidence={"enabled": False}, budget={"max_input_tokens": 3000}), use_bundle=False)
+    try:
+        prompt, manifest = runtime.render("company_overview", inputs=inputs)
+    finally:
+        runtime.close()
+    tokens = manifest["tokens"]
+    assert tokens["budget"] == 3000 and tokens["input"] <= 3000
+    assert [(t["name"], t["action"]) for t in tokens["trimmed"]] == [("inputs", "truncated")]
+    assert TRUNCATION_MARKER in prompt
@@ -0,0 +1,116 @@
+# tests for the telemetry event pipeline
+import threading
+
+import pytest
+
+from prompt_lifecycle.telemetry.event_logger import EventLogger, Exporter, NullEventLogger
+
+
+class Collect(Exporter):
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def export(self, batch):
+        self.batches.append(list(batch))
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def seqs(self):
+        return [event.fields["seq"] for batch in self.batches for event in batch]
+
+
+class Broken(Exporter):
+    def export(self, batch):
+        raise RuntimeError("disk full")
+
+
+def _fill(logger, n):
+    for seq in range(n):
+        logger.emit("route", seq=seq)
+
+
+def test_drop_newest_keeps_the_first_events():
+    out = Collect()
+    logger = EventLogger([out], capacity=10, batch_size=4)  # not started: nothing drains
+    _fill(logger, 25)
+    assert logger.stats() == {"emitted": 25, "dropped": 15, "sampled_out": 0, "exported": 0, "export_errors": 0, "buffered": 10}
+    logger.close()
+    assert out.seqs == list(range(10))
+    assert [len(batch) for batch in out.batches] == [4, 4, 2]
+    assert out.closed
+
+
+def test_drop_oldest_keeps_the_latest_events():
+    out = Collect()
+    logger = EventLogger([out], capacity=10, overflow="drop_oldest")
+    _fill(logger, 25)
+    assert (logger.stats()["dropped"], logger.stats()["buffered"]) == (15, 10)
+    logger.close()
+    assert out.seqs == list(range(15, 25))
+
+
+def test_sample_thins_past_half_capacity():
+    out = Collect()
+    logger = EventLogger([out], capacity=10, overflow="sample", sample_every=3)
+    _fill(logger, 40)
+    stats = logger.stats()
+    assert stats["buffered"] == 10
+    assert stats["emitted"] == stats["buffered"] + stats["dropped"] + stats["sampled_out"]
+    assert stats["sampled_out"] > 0 and stats["dropped"] > 0
+    logger.close()
+    seqs = out.seqs
+    assert seqs[:5] == list(range(5))  # everything up to half capacity
+    assert all((seq + 1) % 3 == 0 for seq in seqs[5:])  # then every sample_every-th event
+
+
+def test_export_errors_are_counted_not_raised():
+    out = Collect()
+    logger = EventLogger([Broken(), out], capacity=100, batch_size=10)
+    _fill(logger, 25)
+    logger.flush()
+    assert (logger.exported, logger.export_errors) == (25, 3)
+    assert out.seqs == list(range(25))  # the other exporters still get every batch
+    logger.close()
+
+
+def test_drain_thread_and_concurrent_producers():
+    out = Collect()
+    logger = EventLogger([out], capacity=100_000, batch_size=64, flush_interval_s=0.01).start()
+
+    def produce(worker):
+        for seq in range(2000):
+            logger.emit("llm", seq=seq, worker=worker)
+
+    threads = [threading.Thread(target=produce, args=(w,)) for w in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    logger.close()
+    assert logger.stats()["exported"] == 8000 and logger.stats()["buffered"] == 0
+    assert all(len(batch) <= 64 for batch in out.batches)
+    for worker in range(4):
+        # per-producer order is preserved
+        assert [e.fields["seq"] for batch in out.batches for e in batch if e.fields["worker"] == worker] == list(range(2000))
+
+
+def test_from_config():
+    assert isinstance(EventLogger.from_config({}), NullEventLogger)
+    assert isinstance(EventLogger.from_config({"telemetry": {"enabled": True}}), NullEventLogger)  # no exporters
+    null = NullEventLogger()
+    null.emit("route", seq=1)
+    assert not null.enabled and null.stats()["emitted"] == 0
+
+    logger = EventLogger.from_config({"telemetry": {"enabled": True, "overflow": "drop_oldest", "capacity": 8, "exporters": [{"type": "console"}]}})
+    try:
+        assert logger.enabled and (logger.overflow, logger.capacity) == ("drop_oldest", 8)
+    finally:
+        logger.close()
+
+    with pytest.raises(ValueError, match="telemetry.overflow must be one of"):
+        EventLogger([], overflow="block")
+    with pytest.raises(ValueError, match="Unknown telemetry exporter type 'kafka'"):
+        EventLogger.from_config({"telemetry": {"enabled": True, "exporters": [{"type": "kafka"}]}})
@@ -0,0 +1,116 @@
+# tests for stage timers and the Prometheus exporter
+import re
+import urllib.request
+
+from prompt_lifecycle.telemetry.event_logger import Event
+from prompt_lifecycle.telemetry.exporters.prometheus_exporter import PrometheusExporter
+from prompt_lifecycle.telemetry.stage_timers import BUCKETS_US, LatencyHistogram, StageTimers
+
+# name{labels} value, per the text exposition format
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? -?[0-9.e+-]+$')
+
+
+def _check_exposition(text):
+    assert text.endswith("\n")
+    typed = set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            name, kind = line.split()[2:]
+            assert kind in ("counter", "gauge", "histogram") and name not in typed
+            typed.add(name)
+        elif not line.startswith("# HELP "):
+            assert SAMPLE.match(line), line
+            base = re.sub(r"_(bucket|sum|count)$", "", line.split("{")[0].split()[0])
+            assert base in typed or line.split("{")[0].split()[0] in typed, line
+
+
+def test_histogram_buckets_and_quantiles():
+    assert list(BUCKETS_US) == sorted(BUCKETS_US) and BUCKETS_US[0] == 1 and BUCKETS_US[-1] == 120_000_000
+
+    hist = LatencyHistogram()
+    assert hist.quantile(0.5) == 0.0 and hist.mean_ms == 0.0
+    for _ in range(100):
+        hist.observe(1_000_000)  # 1ms: the (500us, 1000us] bucket
+    assert hist.quantile(0.5) == 0.75  # interpolated within the bucket
+    assert hist.quantile(1.0) == 1.0
+    assert hist.mean_ms == 1.0
+
+    hist.observe(10 ** 12)  # beyond the last bound: +Inf
+    assert hist.counts[-1] == 1 and hist.quantile(1.0) == BUCKETS_US[-1] / 1000.0
+
+
+def test_stage_timers_summary_and_table():
+    timers = StageTimers()
+    assert timers.format_table() == "(no stage timings recorded)"
+    for ms in (1, 2, 3):
+        timers.observe("route", ms * 1_000_000, "company_overview", "v2025_02_01")
+    timers.observe("total", 5_000_000, "company_overview", None)
+
+    rows = timers.summary()
+    assert [(r["stage"], r["prompt_version"], r["count"]) for r in rows] == [
+        ("route", "v2025_02_01", 3),
+        ("total", "", 1),
+    ]
+    assert rows[0]["mean_ms"] == 2.0 and rows[0]["total_ms"] == 6.0
+    assert rows[0]["p50_ms"] <= rows[0]["p95_ms"] <= rows[0]["p99_ms"]
+
+    table = timers.format_table().splitlines()
+    assert table[0].split()[:3] == ["stage", "section", "prompt_version"] and set(table[1]) == {"-", " "}
+    assert len(table) == 4
+
+    timers.reset()
+    assert timers.summary() == []
+
+
+def test_stage_timers_prometheus_histogram():
+    timers = StageTimers()
+    timers.observe("route", 3_000, "company_overview", "v1")  # 3us
+    timers.observe("route", 40_000_000, "company_overview", "v1")  # 40ms
+    lines = timers.prometheus_lines("pl")
+    assert lines[:2] == ["# HELP pl_stage_latency_seconds Runtime pipeline stage latency.", "# TYPE pl_stage_latency_seconds histogram"]
+    _check_exposition("\n".join(lines) + "\n")
+
+    labels = 'stage="route",section="company_overview",prompt_version="v1"'
+    buckets = [line for line in lines if line.startswith("pl_stage_latency_seconds_bucket")]
+    assert len(buckets) == len(BUCKETS_US) + 1
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)  # cumulative
+    assert f'pl_stage_latency_seconds_bucket{{{labels},le="5e-06"}} 1' in lines
+    assert f'pl_stage_latency_seconds_bucket{{{labels},le="0.05"}} 2' in lines
+    assert f'pl_stage_latency_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f"pl_stage_latency_seconds_sum{{{labels}}} 0.040003000" in lines
+    assert f"pl_stage_latency_seconds_count{{{labels}}} 2" in lines
+
+
+def test_exporter_render_textfile_and_scrape(tmp_path):
+    textfile = tmp_path / "metrics" / "pl.prom"
+    exporter = PrometheusExporter(textfile=str(textfile), min_write_interval_s=3600)
+    timers = StageTimers()
+    timers.observe("llm", 2_000_000, "company_overview", "v1")
+    exporter.add_collector(timers)
+    try:
+        exporter.export(
+            [
+                Event(0, "llm", {"section": "company_overview", "status": "ok", "input_tokens": 100, "output_tokens": 20, "cost_usd": 0.0015}),
+                Event(0, "guardrail", {"section": 'quote"d\nline', "status": "fail"}),
+            ]
+        )
+        text = exporter.render()
+        _check_exposition(text)
+        assert 'prompt_lifecycle_events_total{kind="llm",section="company_overview",status="ok"} 1' in text
+        assert 'prompt_lifecycle_events_total{kind="guardrail",section="quote\\"d\\nline",status="fail"} 1' in text
+        assert 'prompt_lifecycle_llm_tokens_total{direction="input"} 100' in text
+        assert "prompt_lifecycle_llm_cost_usd_total 0.001500" in text
+        assert "prompt_lifecycle_stage_latency_seconds_count{" in text
+
+        assert textfile.read_text(encoding="utf-8") == text  # first export writes at once
+        exporter.export([Event(0, "route", {"section": "company_overview"})])
+        assert "route" not in textfile.read_text(encoding="utf-8")  # then at most every min_write_interval_s
+
+        port = exporter.serve(0)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode("utf-8") == exporter.render()
+    finally:
+        exporter.close()
+    assert 'kind="route"' in textfile.read_text(encoding="utf-8")  # written once more on close